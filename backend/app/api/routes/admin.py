@@ -3,11 +3,39 @@ Admin routes for database management
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, text, delete
 from app.database import get_db
+from app.core.cache import cache_get, cache_set, cache_invalidate
 from app.models import Patient, Control, Alert, Upload, Exam
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+DATABASE_STATS_CACHE_TTL = 30  # seconds
+
+
+def _count_rows(db: Session, tables: dict) -> dict:
+    """Count rows of several tables in a single round-trip (one scalar subquery per table)"""
+    row = db.execute(select(*[
+        select(func.count()).select_from(model).scalar_subquery().label(name)
+        for name, model in tables.items()
+    ])).one()
+    return dict(row._mapping)
+
+
+def _bulk_delete(db: Session, model, *criteria) -> int:
+    """Core DELETE without ORM session synchronization; returns the deleted row count"""
+    result = db.execute(
+        delete(model).where(*criteria),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount
+
+
+def _invalidate_stats_cache():
+    """Drop cached counters that change when patients or uploads are deleted"""
+    cache_invalidate("admin")
+    cache_invalidate("alerts")
+
 
 @router.delete("/clear-database")
 def clear_database(
@@ -30,24 +58,23 @@ def clear_database(
         )
 
     try:
-        # Delete in correct order (respecting foreign keys)
-        deleted_alerts = db.query(Alert).delete()
-        deleted_controls = db.query(Control).delete()
-        deleted_exams = db.query(Exam).delete()
-        deleted_patients = db.query(Patient).delete()
-        deleted_uploads = db.query(Upload).delete()
+        deleted = _count_rows(db, {
+            "alerts": Alert,
+            "controls": Control,
+            "exams": Exam,
+            "patients": Patient,
+            "uploads": Upload
+        })
+
+        # Single TRUNCATE; CASCADE also empties tables referencing these (e.g. medications)
+        db.execute(text("TRUNCATE TABLE alerts, controls, exams, patients, uploads CASCADE"))
 
         db.commit()
+        _invalidate_stats_cache()
 
         return {
             "message": "Base de datos limpiada exitosamente",
-            "deleted": {
-                "alerts": deleted_alerts,
-                "controls": deleted_controls,
-                "exams": deleted_exams,
-                "patients": deleted_patients,
-                "uploads": deleted_uploads
-            }
+            "deleted": deleted
         }
     except Exception as e:
         db.rollback()
@@ -75,22 +102,21 @@ def delete_all_patients(
         )
 
     try:
-        # Delete in correct order (respecting foreign keys)
-        deleted_alerts = db.query(Alert).delete()
-        deleted_controls = db.query(Control).delete()
-        deleted_exams = db.query(Exam).delete()
-        deleted_patients = db.query(Patient).delete()
+        deleted = _count_rows(db, {
+            "controls": Control,
+            "alerts": Alert,
+            "exams": Exam
+        })
+
+        # Controls, alerts, exams and medications are removed by ON DELETE CASCADE
+        deleted["patients"] = _bulk_delete(db, Patient)
 
         db.commit()
+        _invalidate_stats_cache()
 
         return {
             "message": "Todos los pacientes fueron eliminados exitosamente",
-            "deleted": {
-                "patients": deleted_patients,
-                "controls": deleted_controls,
-                "alerts": deleted_alerts,
-                "exams": deleted_exams
-            }
+            "deleted": deleted
         }
     except Exception as e:
         db.rollback()
@@ -117,11 +143,11 @@ def delete_patients_by_upload(
         raise HTTPException(status_code=404, detail=f"Upload {upload_id} no encontrado")
 
     try:
-        # Get patients from this upload
-        patients = db.query(Patient).filter(Patient.upload_id == upload_id).all()
-        patient_ids = [p.id for p in patients]
+        # Patients from this upload, resolved inside each DELETE (no IDs loaded in Python)
+        patient_ids = select(Patient.id).where(Patient.upload_id == upload_id)
 
-        if not patient_ids:
+        has_patients = db.query(patient_ids.exists()).scalar()
+        if not has_patients:
             return {
                 "message": f"No hay pacientes asociados al upload {upload_id}",
                 "deleted": {
@@ -133,12 +159,13 @@ def delete_patients_by_upload(
             }
 
         # Delete related data
-        deleted_alerts = db.query(Alert).filter(Alert.patient_id.in_(patient_ids)).delete(synchronize_session=False)
-        deleted_controls = db.query(Control).filter(Control.patient_id.in_(patient_ids)).delete(synchronize_session=False)
-        deleted_exams = db.query(Exam).filter(Exam.patient_id.in_(patient_ids)).delete(synchronize_session=False)
-        deleted_patients = db.query(Patient).filter(Patient.upload_id == upload_id).delete(synchronize_session=False)
+        deleted_alerts = _bulk_delete(db, Alert, Alert.patient_id.in_(patient_ids))
+        deleted_controls = _bulk_delete(db, Control, Control.patient_id.in_(patient_ids))
+        deleted_exams = _bulk_delete(db, Exam, Exam.patient_id.in_(patient_ids))
+        deleted_patients = _bulk_delete(db, Patient, Patient.upload_id == upload_id)
 
         db.commit()
+        _invalidate_stats_cache()
 
         return {
             "message": f"Pacientes del upload {upload_id} ({upload.original_filename}) eliminados exitosamente",
@@ -165,11 +192,21 @@ def list_uploads(db: Session = Depends(get_db)):
     List all uploads with patient counts
     """
     try:
-        uploads = db.query(Upload).order_by(Upload.created_at.desc()).all()
+        # Patient count per upload in a single grouped query
+        patient_counts = db.query(
+            Patient.upload_id,
+            func.count(Patient.id).label("patient_count")
+        ).group_by(Patient.upload_id).subquery()
+
+        uploads = db.query(
+            Upload,
+            func.coalesce(patient_counts.c.patient_count, 0)
+        ).outerjoin(
+            patient_counts, patient_counts.c.upload_id == Upload.id
+        ).order_by(Upload.created_at.desc()).all()
 
         uploads_data = []
-        for upload in uploads:
-            patient_count = db.query(Patient).filter(Patient.upload_id == upload.id).count()
+        for upload, patient_count in uploads:
             uploads_data.append({
                 "id": upload.id,
                 "filename": upload.original_filename,
@@ -195,13 +232,18 @@ def get_database_stats(db: Session = Depends(get_db)):
     Get current database statistics
     """
     try:
-        stats = {
-            "patients": db.query(Patient).count(),
-            "controls": db.query(Control).count(),
-            "alerts": db.query(Alert).count(),
-            "uploads": db.query(Upload).count(),
-            "exams": db.query(Exam).count()
-        }
+        stats = cache_get("admin:database_stats")
+        if stats is not None:
+            return stats
+
+        stats = _count_rows(db, {
+            "patients": Patient,
+            "controls": Control,
+            "alerts": Alert,
+            "uploads": Upload,
+            "exams": Exam
+        })
+        cache_set("admin:database_stats", stats, ttl=DATABASE_STATS_CACHE_TTL)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
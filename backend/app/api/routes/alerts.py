@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import date, datetime
 
 from app.database import get_db
+from app.core.cache import cache_get, cache_set, cache_invalidate
 from app.models.alert import Alert, AlertTypeEnum, AlertPriorityEnum, AlertStatusEnum
-from app.models.patient import Patient
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, computed_field
 
 
 router = APIRouter(tags=["alerts"])
 
+ALERT_STATS_CACHE_TTL = 30  # seconds
+
+# SQL sort key for alert priority (urgente first, then alta, media, baja).
+# PostgreSQL sorts enum values by declaration order (baja < media < alta <
+# urgente), so DESC gives the priority order on the plain column and
+# idx_alerts_priority_desc_created can return rows already ordered
+PRIORITY_ORDER = Alert.priority.desc().nulls_last()
+
 
 # ============================================================================
 # SCHEMAS
@@ -25,15 +33,25 @@ class AlertUpdate(BaseModel):
     notes: Optional[str] = Field(None, max_length=500)
 
 
+class AlertPatientInfo(BaseModel):
+    """Patient fields embedded in alert responses"""
+    first_name: str
+    last_name: str
+    document_number: str
+
+    class Config:
+        from_attributes = True
+
+
 class AlertResponse(BaseModel):
     """Schema for alert response"""
     id: int
     patient_id: int
-    alert_type: str
+    alert_type: AlertTypeEnum
     alert_name: str
     description: str
-    priority: str
-    status: str
+    priority: AlertPriorityEnum
+    status: AlertStatusEnum
     reason: Optional[str]
     criteria: Optional[str]
     created_date: date
@@ -41,12 +59,26 @@ class AlertResponse(BaseModel):
     completed_date: Optional[date]
     notes: Optional[str]
 
-    # Patient info
-    patient_name: Optional[str] = None
-    patient_document: Optional[str] = None
+    # Patient info (read from the alert's patient relationship, not serialized)
+    patient: Optional[AlertPatientInfo] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def patient_name(self) -> Optional[str]:
+        return f"{self.patient.first_name} {self.patient.last_name}" if self.patient else None
+
+    @computed_field
+    @property
+    def patient_document(self) -> Optional[str]:
+        return self.patient.document_number if self.patient else None
 
     class Config:
         from_attributes = True
+        use_enum_values = True  # Store enum members as their plain string values
+
+
+# Serializes alert lists straight to JSON bytes (no response_model re-validation)
+alert_list_adapter = TypeAdapter(List[AlertResponse])
 
 
 class AlertStats(BaseModel):
@@ -61,7 +93,7 @@ class AlertStats(BaseModel):
 # ENDPOINTS
 # ============================================================================
 
-@router.get("/alerts/", response_model=List[AlertResponse])
+@router.get("/alerts/", responses={200: {"model": List[AlertResponse]}})
 async def get_alerts(
     alert_type: Optional[AlertTypeEnum] = None,
     priority: Optional[AlertPriorityEnum] = None,
@@ -81,7 +113,7 @@ async def get_alerts(
     - **limit**: Maximum number of results
     - **offset**: Number of results to skip
     """
-    query = db.query(Alert).join(Patient)
+    query = db.query(Alert).options(joinedload(Alert.patient, innerjoin=True))
 
     if alert_type:
         query = query.filter(Alert.alert_type == alert_type)
@@ -96,52 +128,25 @@ async def get_alerts(
         query = query.filter(Alert.patient_id == patient_id)
 
     # Order by priority (urgente first, then alta, media, baja)
-    priority_order = {
-        AlertPriorityEnum.URGENTE: 1,
-        AlertPriorityEnum.ALTA: 2,
-        AlertPriorityEnum.MEDIA: 3,
-        AlertPriorityEnum.BAJA: 4
-    }
-
-    alerts = query.offset(offset).limit(limit).all()
-
-    # Sort by priority
-    alerts_sorted = sorted(
-        alerts,
-        key=lambda a: (priority_order.get(a.priority, 5), a.created_date)
+    alerts = query.order_by(
+        PRIORITY_ORDER,
+        Alert.created_date
+    ).offset(offset).limit(limit).all()
+
+    return Response(
+        content=alert_list_adapter.dump_json(
+            [AlertResponse.model_validate(alert) for alert in alerts]
+        ),
+        media_type="application/json"
     )
 
-    # Add patient info to response
-    result = []
-    for alert in alerts_sorted[offset:offset+limit]:
-        alert_dict = {
-            "id": alert.id,
-            "patient_id": alert.patient_id,
-            "alert_type": alert.alert_type.value,
-            "alert_name": alert.alert_name,
-            "description": alert.description,
-            "priority": alert.priority.value,
-            "status": alert.status.value,
-            "reason": alert.reason,
-            "criteria": alert.criteria,
-            "created_date": alert.created_date,
-            "due_date": alert.due_date,
-            "completed_date": alert.completed_date,
-            "notes": alert.notes,
-            "patient_name": f"{alert.patient.first_name} {alert.patient.last_name}" if alert.patient else None,
-            "patient_document": alert.patient.document_number if alert.patient else None
-        }
-        result.append(AlertResponse(**alert_dict))
-
-    return result
-
 
 @router.get("/alerts/{alert_id}", response_model=AlertResponse)
 async def get_alert(alert_id: int, db: Session = Depends(get_db)):
     """
     Get a specific alert by ID.
     """
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = db.query(Alert).options(joinedload(Alert.patient)).filter(Alert.id == alert_id).first()
 
     if not alert:
         raise HTTPException(
@@ -149,25 +154,7 @@ async def get_alert(alert_id: int, db: Session = Depends(get_db)):
             detail=f"Alert with id {alert_id} not found"
         )
 
-    alert_dict = {
-        "id": alert.id,
-        "patient_id": alert.patient_id,
-        "alert_type": alert.alert_type.value,
-        "alert_name": alert.alert_name,
-        "description": alert.description,
-        "priority": alert.priority.value,
-        "status": alert.status.value,
-        "reason": alert.reason,
-        "criteria": alert.criteria,
-        "created_date": alert.created_date,
-        "due_date": alert.due_date,
-        "completed_date": alert.completed_date,
-        "notes": alert.notes,
-        "patient_name": f"{alert.patient.first_name} {alert.patient.last_name}" if alert.patient else None,
-        "patient_document": alert.patient.document_number if alert.patient else None
-    }
-
-    return AlertResponse(**alert_dict)
+    return AlertResponse.model_validate(alert)
 
 
 @router.put("/alerts/{alert_id}", response_model=AlertResponse)
@@ -184,7 +171,7 @@ async def update_alert(
     - **completed_date**: Date when the alert was resolved
     - **notes**: Additional notes about the alert
     """
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = db.query(Alert).options(joinedload(Alert.patient)).filter(Alert.id == alert_id).first()
 
     if not alert:
         raise HTTPException(
@@ -214,26 +201,9 @@ async def update_alert(
 
     db.commit()
     db.refresh(alert)
+    cache_invalidate("alerts")
 
-    alert_dict = {
-        "id": alert.id,
-        "patient_id": alert.patient_id,
-        "alert_type": alert.alert_type.value,
-        "alert_name": alert.alert_name,
-        "description": alert.description,
-        "priority": alert.priority.value,
-        "status": alert.status.value,
-        "reason": alert.reason,
-        "criteria": alert.criteria,
-        "created_date": alert.created_date,
-        "due_date": alert.due_date,
-        "completed_date": alert.completed_date,
-        "notes": alert.notes,
-        "patient_name": f"{alert.patient.first_name} {alert.patient.last_name}" if alert.patient else None,
-        "patient_document": alert.patient.document_number if alert.patient else None
-    }
-
-    return AlertResponse(**alert_dict)
+    return AlertResponse.model_validate(alert)
 
 
 @router.delete("/alerts/{alert_id}")
@@ -251,6 +221,7 @@ async def dismiss_alert(alert_id: int, db: Session = Depends(get_db)):
 
     alert.status = AlertStatusEnum.IGNORADA
     db.commit()
+    cache_invalidate("alerts")
 
     return {"message": "Alert dismissed successfully", "alert_id": alert_id}
 
@@ -260,42 +231,45 @@ async def get_alerts_stats(db: Session = Depends(get_db)):
     """
     Get statistics about alerts.
     """
-    # Total alerts
-    total = db.query(Alert).count()
+    cached = cache_get("alerts:stats")
+    if cached is not None:
+        return cached
 
-    # By status
-    by_status = {}
-    status_counts = db.query(
+    # Single pass over alerts: one grouping set per dimension
+    rows = db.query(
         Alert.status,
-        func.count(Alert.id)
-    ).group_by(Alert.status).all()
-
-    for status_enum, count in status_counts:
-        by_status[status_enum.value] = count
-
-    # By priority
-    by_priority = {}
-    priority_counts = db.query(
         Alert.priority,
-        func.count(Alert.id)
-    ).group_by(Alert.priority).all()
-
-    for priority_enum, count in priority_counts:
-        by_priority[priority_enum.value] = count
-
-    # By type
-    by_type = {}
-    type_counts = db.query(
         Alert.alert_type,
+        func.grouping(Alert.status).label("by_status"),
+        func.grouping(Alert.priority).label("by_priority"),
         func.count(Alert.id)
-    ).group_by(Alert.alert_type).all()
+    ).group_by(
+        func.grouping_sets(Alert.status, Alert.priority, Alert.alert_type)
+    ).all()
 
-    for type_enum, count in type_counts:
-        by_type[type_enum.value] = count
+    total = 0
+    by_status = {}
+    by_priority = {}
+    by_type = {}
 
-    return AlertStats(
+    for status_enum, priority_enum, type_enum, grouping_status, grouping_priority, count in rows:
+        if grouping_status == 0:
+            # Every alert falls into exactly one status group
+            total += count
+            if status_enum is not None:
+                by_status[status_enum.value] = count
+        elif grouping_priority == 0:
+            if priority_enum is not None:
+                by_priority[priority_enum.value] = count
+        elif type_enum is not None:
+            by_type[type_enum.value] = count
+
+    stats = AlertStats(
         total=total,
         by_status=by_status,
         by_priority=by_priority,
         by_type=by_type
     )
+    cache_set("alerts:stats", stats, ttl=ALERT_STATS_CACHE_TTL)
+
+    return stats
@@ -13,11 +13,14 @@ Endpoints:
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, delete, union, union_all, literal, cast, null, String, Text, Integer, BigInteger, DateTime
 from typing import Optional
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.dependencies.auth import require_admin, require_medical_staff, get_current_active_user
+from app.core.cache import cache_get, cache_set, cache_invalidate
+from app.dependencies.auth import require_admin, require_medical_staff_token, get_current_active_user
+from app.utils import paginate_with_total
 from app.models.user import User
 from app.models.audit_log import AuditLog
 
@@ -35,6 +38,46 @@ router = APIRouter(
     }
 )
 
+AUDIT_STATS_CACHE_TTL = 60  # segundos
+AUDIT_METADATA_CACHE_TTL = 60  # segundos
+CLEANUP_BATCH_SIZE = 10_000  # logs eliminados por transacción
+
+
+# ============================================================================
+# COLUMNAS PROYECTADAS
+# ============================================================================
+
+# Los listados seleccionan solo estas columnas (sin hidratar objetos ORM)
+AUDIT_LOG_COLUMNS = (
+    AuditLog.id,
+    AuditLog.user_id,
+    AuditLog.username,
+    AuditLog.action,
+    AuditLog.category,
+    AuditLog.resource_type,
+    AuditLog.resource_id,
+    AuditLog.resource_name,
+    AuditLog.timestamp,
+    AuditLog.ip_address,
+    AuditLog.user_agent,
+    AuditLog.details,
+    AuditLog.status,
+    AuditLog.error_message,
+)
+
+USER_AUDIT_LOG_COLUMNS = (
+    AuditLog.id,
+    AuditLog.action,
+    AuditLog.category,
+    AuditLog.resource_type,
+    AuditLog.resource_id,
+    AuditLog.resource_name,
+    AuditLog.timestamp,
+    AuditLog.ip_address,
+    AuditLog.status,
+    AuditLog.details,
+)
+
 
 # ============================================================================
 # LIST AUDIT LOGS
@@ -45,7 +88,7 @@ router = APIRouter(
     summary="Listar logs de auditoría",
     description="Obtiene logs de auditoría con filtros. Admin y Médicos."
 )
-async def list_audit_logs(
+def list_audit_logs(
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     user_id: Optional[int] = Query(None, description="Filtrar por usuario"),
@@ -55,11 +98,12 @@ async def list_audit_logs(
     resource_type: Optional[str] = Query(None, description="Filtrar por tipo de recurso"),
     date_from: Optional[datetime] = Query(None, description="Fecha desde"),
     date_to: Optional[datetime] = Query(None, description="Fecha hasta"),
+    include_total: bool = Query(True, description="Si es False, no calcula el total de registros"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_medical_staff)
+    claims: dict = Depends(require_medical_staff_token)
 ):
     """Lista logs de auditoría con filtros."""
-    query = db.query(AuditLog)
+    query = db.query(*AUDIT_LOG_COLUMNS)
 
     # Filtros
     if user_id:
@@ -86,30 +130,18 @@ async def list_audit_logs(
     # Ordenar por timestamp descendente (más reciente primero)
     query = query.order_by(AuditLog.timestamp.desc())
 
-    # Total count
-    total = query.count()
-
-    # Paginación
-    logs = query.offset(offset).limit(limit).all()
+    total = None
+    if include_total:
+        # Total calculado con función de ventana en la misma consulta de la página
+        rows, total = paginate_with_total(query, offset, limit)
+    else:
+        rows = query.offset(offset).limit(limit).all()
 
     items = []
-    for log in logs:
-        items.append({
-            "id": log.id,
-            "user_id": log.user_id,
-            "username": log.username,
-            "action": log.action,
-            "category": log.category,
-            "resource_type": log.resource_type,
-            "resource_id": log.resource_id,
-            "resource_name": log.resource_name,
-            "timestamp": log.timestamp,
-            "ip_address": log.ip_address,
-            "user_agent": log.user_agent,
-            "details": log.details,
-            "status": log.status,
-            "error_message": log.error_message
-        })
+    for row in rows:
+        item = row._asdict()
+        item.pop("total", None)
+        items.append(item)
 
     return {
         "total": total,
@@ -128,10 +160,10 @@ async def list_audit_logs(
     summary="Obtener log específico",
     description="Obtiene información detallada de un log. Admin y Médicos."
 )
-async def get_audit_log(
+def get_audit_log(
     log_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_medical_staff)
+    claims: dict = Depends(require_medical_staff_token)
 ):
     """Obtiene un log por ID."""
     log = db.query(AuditLog).filter(AuditLog.id == log_id).first()
@@ -169,16 +201,16 @@ async def get_audit_log(
     summary="Logs de un usuario",
     description="Obtiene logs de auditoría de un usuario específico. Admin y Médicos."
 )
-async def get_user_audit_logs(
+def get_user_audit_logs(
     user_id: int,
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_medical_staff)
+    claims: dict = Depends(require_medical_staff_token)
 ):
     """Obtiene logs de un usuario."""
     # Verificar que el usuario existe
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -186,26 +218,13 @@ async def get_user_audit_logs(
         )
 
     # Obtener logs
-    query = db.query(AuditLog).filter(AuditLog.user_id == user_id)
+    query = db.query(*USER_AUDIT_LOG_COLUMNS).filter(AuditLog.user_id == user_id)
     query = query.order_by(AuditLog.timestamp.desc())
 
     total = query.count()
     logs = query.offset(offset).limit(limit).all()
 
-    items = []
-    for log in logs:
-        items.append({
-            "id": log.id,
-            "action": log.action,
-            "category": log.category,
-            "resource_type": log.resource_type,
-            "resource_id": log.resource_id,
-            "resource_name": log.resource_name,
-            "timestamp": log.timestamp,
-            "ip_address": log.ip_address,
-            "status": log.status,
-            "details": log.details
-        })
+    items = [log._asdict() for log in logs]
 
     return {
         "user_id": user_id,
@@ -221,73 +240,130 @@ async def get_user_audit_logs(
 # AUDIT STATS
 # ============================================================================
 
+def _stats_columns(kind, key=None, count=None, log_id=None, username=None, timestamp=None, error_message=None):
+    """
+    Columnas comunes de cada rama del UNION ALL de estadísticas.
+
+    Las columnas que no aplican a una rama se rellenan con NULL tipado
+    para que todas las ramas tengan la misma forma.
+    """
+    return (
+        literal(kind).label("kind"),
+        (key if key is not None else cast(null(), String)).label("key"),
+        (count if count is not None else cast(null(), BigInteger)).label("log_count"),
+        (log_id if log_id is not None else cast(null(), Integer)).label("log_id"),
+        (username if username is not None else cast(null(), String)).label("username"),
+        (timestamp if timestamp is not None else cast(null(), DateTime(timezone=True))).label("timestamp"),
+        (error_message if error_message is not None else cast(null(), Text)).label("error_message"),
+    )
+
+
+def _top(stmt):
+    """Envuelve un SELECT con ORDER BY/LIMIT para usarlo como rama de un UNION ALL"""
+    return select(stmt.subquery())
+
+
 @router.get(
     "/stats",
     summary="Estadísticas de auditoría",
     description="Obtiene estadísticas de logs de auditoría. Admin y Médicos."
 )
-async def get_audit_stats(
+def get_audit_stats(
     days: int = Query(7, ge=1, le=365, description="Días a consultar"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_medical_staff)
+    claims: dict = Depends(require_medical_staff_token)
 ):
     """Obtiene estadísticas de auditoría."""
-    since_date = datetime.now() - timedelta(days=days)
-
-    query = db.query(AuditLog).filter(AuditLog.timestamp >= since_date)
-
-    total_logs = query.count()
-
-    # Por categoría
-    from sqlalchemy import func
-    category_stats = db.query(
-        AuditLog.category,
-        func.count(AuditLog.id).label('count')
-    ).filter(AuditLog.timestamp >= since_date).group_by(AuditLog.category).all()
-
-    # Por acción
-    action_stats = db.query(
+    cache_key = f"audit:stats:{days}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Fecha de corte calculada por la BD: now() es constante dentro de la
+    # transacción, así que todas las agregaciones usan exactamente el mismo corte
+    since_date = func.now() - timedelta(days=days)
+
+    # Una sola consulta: el CTE filtra por fecha una vez y cada agregación es
+    # una rama del UNION ALL, identificada por la columna "kind"
+    filtered = select(
+        AuditLog.id,
         AuditLog.action,
-        func.count(AuditLog.id).label('count')
-    ).filter(AuditLog.timestamp >= since_date).group_by(AuditLog.action).order_by(func.count(AuditLog.id).desc()).limit(10).all()
-
-    # Por status
-    status_stats = db.query(
+        AuditLog.category,
         AuditLog.status,
-        func.count(AuditLog.id).label('count')
-    ).filter(AuditLog.timestamp >= since_date).group_by(AuditLog.status).all()
-
-    # Por usuario (top 10)
-    user_stats = db.query(
         AuditLog.username,
-        func.count(AuditLog.id).label('count')
-    ).filter(AuditLog.timestamp >= since_date).filter(AuditLog.username.isnot(None)).group_by(AuditLog.username).order_by(func.count(AuditLog.id).desc()).limit(10).all()
-
-    # Logs recientes con errores
-    error_logs = db.query(AuditLog).filter(
-        AuditLog.timestamp >= since_date,
-        AuditLog.status == 'error'
-    ).order_by(AuditLog.timestamp.desc()).limit(10).all()
-
-    return {
+        AuditLog.timestamp,
+        AuditLog.error_message
+    ).where(AuditLog.timestamp >= since_date).cte("filtered")
+    f = filtered.c
+    count = func.count()
+
+    stmt = union_all(
+        # Total y fecha de corte
+        select(*_stats_columns("total", count=count, timestamp=since_date)).select_from(filtered),
+        # Por categoría
+        select(*_stats_columns("category", key=f.category, count=count)).group_by(f.category),
+        # Por acción (top 10)
+        _top(select(*_stats_columns("action", key=f.action, count=count))
+             .group_by(f.action).order_by(count.desc()).limit(10)),
+        # Por status
+        select(*_stats_columns("status", key=f.status, count=count)).group_by(f.status),
+        # Por usuario (top 10)
+        _top(select(*_stats_columns("user", key=f.username, count=count))
+             .where(f.username.isnot(None)).group_by(f.username).order_by(count.desc()).limit(10)),
+        # Logs recientes con errores
+        _top(select(*_stats_columns(
+            "error",
+            key=f.action,
+            log_id=f.id,
+            username=f.username,
+            timestamp=f.timestamp,
+            error_message=f.error_message
+        )).where(f.status == 'error').order_by(f.timestamp.desc()).limit(10))
+    )
+
+    total_logs = 0
+    since_value = None
+    by_category, by_action, by_status, top_users, recent_errors = [], [], [], [], []
+
+    for row in db.execute(stmt):
+        if row.kind == "total":
+            total_logs = row.log_count
+            since_value = row.timestamp
+        elif row.kind == "category":
+            by_category.append({"category": row.key, "count": row.log_count})
+        elif row.kind == "action":
+            by_action.append({"action": row.key, "count": row.log_count})
+        elif row.kind == "status":
+            by_status.append({"status": row.key, "count": row.log_count})
+        elif row.kind == "user":
+            top_users.append({"username": row.key, "count": row.log_count})
+        elif row.kind == "error":
+            recent_errors.append({
+                "id": row.log_id,
+                "action": row.key,
+                "username": row.username,
+                "timestamp": row.timestamp,
+                "error_message": row.error_message
+            })
+
+    # UNION ALL no garantiza el orden de cada rama: reordenar los top 10
+    by_action.sort(key=lambda item: item["count"], reverse=True)
+    top_users.sort(key=lambda item: item["count"], reverse=True)
+    recent_errors.sort(key=lambda item: item["timestamp"], reverse=True)
+
+    stats = {
         "period_days": days,
-        "since_date": since_date.isoformat(),
+        "since_date": since_value.isoformat(),
         "total_logs": total_logs,
-        "by_category": [{"category": cat, "count": count} for cat, count in category_stats],
-        "by_action": [{"action": action, "count": count} for action, count in action_stats],
-        "by_status": [{"status": st, "count": count} for st, count in status_stats],
-        "top_users": [{"username": user, "count": count} for user, count in user_stats],
-        "recent_errors": [
-            {
-                "id": log.id,
-                "action": log.action,
-                "username": log.username,
-                "timestamp": log.timestamp,
-                "error_message": log.error_message
-            }
-            for log in error_logs
-        ]
+        "by_category": by_category,
+        "by_action": by_action,
+        "by_status": by_status,
+        "top_users": top_users,
+        "recent_errors": recent_errors
     }
+    cache_set(cache_key, stats, ttl=AUDIT_STATS_CACHE_TTL)
+
+    return stats
 
 
 # ============================================================================
@@ -299,20 +375,22 @@ async def get_audit_stats(
     summary="Limpiar logs antiguos",
     description="Elimina logs de auditoría antiguos. Solo Admin."
 )
-async def cleanup_old_logs(
+def cleanup_old_logs(
     days: int = Query(90, ge=30, le=365, description="Eliminar logs más antiguos que X días"),
     dry_run: bool = Query(True, description="Si es True, solo muestra cuántos se eliminarían"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Limpia logs antiguos."""
-    cutoff_date = datetime.now() - timedelta(days=days)
-
-    # Contar logs a eliminar
-    query = db.query(AuditLog).filter(AuditLog.timestamp < cutoff_date)
-    count = query.count()
+    # Fecha de corte calculada por la BD (misma referencia de reloj que los timestamps)
+    cutoff_expr = func.now() - timedelta(days=days)
 
     if dry_run:
+        # Contar logs a eliminar (COUNT directo, sin subconsulta envolvente)
+        count, cutoff_date = db.execute(
+            select(func.count(), cutoff_expr).select_from(AuditLog).where(AuditLog.timestamp < cutoff_expr)
+        ).one()
+
         return {
             "dry_run": True,
             "cutoff_date": cutoff_date.isoformat(),
@@ -320,9 +398,26 @@ async def cleanup_old_logs(
             "message": f"Se eliminarían {count} logs más antiguos que {days} días"
         }
     else:
-        # Eliminar logs
-        query.delete(synchronize_session=False)
-        db.commit()
+        # Corte fijo para todos los lotes (cada lote abre una transacción nueva)
+        cutoff_date = db.execute(select(cutoff_expr)).scalar()
+
+        # Eliminar logs por lotes: cada lote es una transacción corta
+        count = 0
+        while True:
+            batch_ids = select(AuditLog.id).where(
+                AuditLog.timestamp < cutoff_date
+            ).limit(CLEANUP_BATCH_SIZE)
+            deleted = db.execute(
+                delete(AuditLog).where(AuditLog.id.in_(batch_ids)),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            db.commit()
+
+            count += deleted
+            if deleted < CLEANUP_BATCH_SIZE:
+                break
+
+        cache_invalidate("audit")
 
         # Registrar en audit log
         AuditLog.log_action(
@@ -356,28 +451,39 @@ async def cleanup_old_logs(
     summary="Obtener metadatos de auditoría",
     description="Obtiene categorías y acciones disponibles para filtros. Admin y Médicos."
 )
-async def get_audit_metadata(
+def get_audit_metadata(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_medical_staff)
+    claims: dict = Depends(require_medical_staff_token)
 ):
     """Obtiene categorías y acciones disponibles."""
-    from sqlalchemy import func
-
-    # Categorías únicas
-    categories = db.query(AuditLog.category).distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
-
-    # Acciones únicas
-    actions = db.query(AuditLog.action).distinct().all()
-    actions = [action[0] for action in actions if action[0]]
-
-    # Tipos de recursos únicos
-    resource_types = db.query(AuditLog.resource_type).distinct().all()
-    resource_types = [rt[0] for rt in resource_types if rt[0]]
-
-    return {
-        "categories": sorted(categories),
-        "actions": sorted(actions),
-        "resource_types": sorted(resource_types),
+    cache_key = "audit:metadata"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Valores únicos de las tres columnas en una sola consulta
+    kinds = {
+        "categories": AuditLog.category,
+        "actions": AuditLog.action,
+        "resource_types": AuditLog.resource_type,
+    }
+    distinct_values = union(*[
+        select(literal(kind).label("kind"), column.label("value")).where(column.isnot(None))
+        for kind, column in kinds.items()
+    ]).order_by("kind", "value")
+
+    # Las filas llegan ordenadas desde PostgreSQL: solo se reparten por tipo
+    values = {kind: [] for kind in kinds}
+    for kind, value in db.execute(distinct_values):
+        if value:
+            values[kind].append(value)
+
+    result = {
+        "categories": values["categories"],
+        "actions": values["actions"],
+        "resource_types": values["resource_types"],
         "statuses": ["success", "error", "failed", "blocked"]
     }
+    cache_set(cache_key, result, AUDIT_METADATA_CACHE_TTL)
+
+    return result
@@ -11,12 +11,14 @@ Endpoints:
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, text
 from typing import Optional
+from datetime import datetime
 
 from app.database import get_db
 from app.dependencies.auth import get_current_active_user, get_current_user
 from app.models.user import User
-from app.models.audit_log import AuditLog
+from app.models.role import Role
 from app.schemas.auth import (
     UserLogin,
     LoginResponse,
@@ -28,8 +30,9 @@ from app.schemas.auth import (
     TokenValidationResponse,
 )
 from app.schemas.user import UserResponse, PasswordChange
-from app.services import auth_service
+from app.services import auth_service, audit_queue
 from app.core.security import get_password_hash, verify_password
+from app.core.cache import cache_get, cache_set
 
 
 # ============================================================================
@@ -45,6 +48,8 @@ router = APIRouter(
     }
 )
 
+AUTH_HEALTH_CACHE_TTL = 30  # segundos
+
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -96,7 +101,7 @@ def get_user_agent(request: Request) -> Optional[str]:
     - op.lopez / Operador123!
     """
 )
-async def login(
+def login(
     credentials: UserLogin,
     request: Request,
     db: Session = Depends(get_db)
@@ -122,16 +127,15 @@ async def login(
         raise
     except Exception as e:
         # Log error inesperado
-        AuditLog.log_action(
-            db=db,
-            user_id=None,
-            username=credentials.username,
-            action="auth.login.error",
-            category="authentication",
-            status="error",
-            details={"error": str(e)},
-            ip_address=ip_address
-        )
+        audit_queue.enqueue({
+            "user_id": None,
+            "username": credentials.username,
+            "action": "auth.login.error",
+            "category": "authentication",
+            "status": "error",
+            "details": {"error": str(e)},
+            "ip_address": ip_address
+        })
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
@@ -164,7 +168,7 @@ async def login(
     - Verifica que el refresh token no esté en blacklist
     """
 )
-async def refresh_token(
+def refresh_token(
     token_data: TokenRefresh,
     request: Request,
     db: Session = Depends(get_db)
@@ -216,7 +220,7 @@ async def refresh_token(
     - El usuario debe hacer login nuevamente
     """
 )
-async def logout(
+def logout(
     request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -282,22 +286,32 @@ async def logout(
     - Mostrar perfil del usuario
     """
 )
-async def get_current_user_info(
+def get_current_user_info(
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Endpoint para obtener información del usuario actual.
     """
+    cache_key = auth_service.user_info_cache_key(current_user)
+    user_info = cache_get(cache_key)
+    if user_info is None:
+        user_info = {
+            "id": current_user.id,
+            "username": current_user.username,
+            "email": current_user.email,
+            "full_name": current_user.full_name,
+            "is_active": current_user.is_active,
+            "is_superuser": current_user.is_superuser,
+            "roles": [role.name for role in current_user.roles],
+            "permissions": current_user.get_permissions(),
+            "created_at": current_user.created_at
+        }
+        cache_set(cache_key, user_info, auth_service.USER_INFO_CACHE_TTL)
+
+    # Campos de login/bloqueo fuera de la caché: cambian con cada intento de
+    # login y el usuario ya está cargado (sin consultas extra)
     return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email,
-        "full_name": current_user.full_name,
-        "is_active": current_user.is_active,
-        "is_superuser": current_user.is_superuser,
-        "roles": [role.name for role in current_user.roles],
-        "permissions": current_user.get_permissions(),
-        "created_at": current_user.created_at,
+        **user_info,
         "last_login": current_user.last_login,
         "failed_login_attempts": current_user.failed_login_attempts,
         "is_locked": current_user.is_locked()
@@ -333,7 +347,7 @@ async def get_current_user_info(
     - Usuario debe hacer login nuevamente
     """
 )
-async def change_password(
+def change_password(
     password_data: PasswordChange,
     request: Request,
     current_user: User = Depends(get_current_active_user),
@@ -347,44 +361,42 @@ async def change_password(
     # Verificar contraseña actual
     if not verify_password(password_data.current_password, current_user.hashed_password):
         # Registrar intento fallido
-        AuditLog.log_action(
-            db=db,
-            user_id=current_user.id,
-            username=current_user.username,
-            action="auth.password.change.failed",
-            category="authentication",
-            status="failed",
-            details={"reason": "invalid_current_password"},
-            ip_address=ip_address
-        )
+        audit_queue.enqueue({
+            "user_id": current_user.id,
+            "username": current_user.username,
+            "action": "auth.password.change.failed",
+            "category": "authentication",
+            "status": "failed",
+            "details": {"reason": "invalid_current_password"},
+            "ip_address": ip_address
+        })
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
 
     # Actualizar contraseña
-    from datetime import datetime
     current_user.hashed_password = get_password_hash(password_data.new_password)
     current_user.password_changed_at = datetime.now()
 
     # Limpiar refresh token (forzar re-login)
     current_user.refresh_token = None
 
+    # Invalidar todos los tokens emitidos (logout global)
+    current_user.token_version += 1
+
     db.commit()
+    auth_service.invalidate_user_info(current_user.id)
 
     # Registrar cambio exitoso
-    AuditLog.log_action(
-        db=db,
-        user_id=current_user.id,
-        username=current_user.username,
-        action="auth.password.changed",
-        category="authentication",
-        status="success",
-        ip_address=ip_address
-    )
-
-    # TODO: Invalidar todos los tokens del usuario
-    # Esto requeriría agregar los JTIs a la blacklist
+    audit_queue.enqueue({
+        "user_id": current_user.id,
+        "username": current_user.username,
+        "action": "auth.password.changed",
+        "category": "authentication",
+        "status": "success",
+        "ip_address": ip_address
+    })
 
     return {
         "message": "Contraseña actualizada exitosamente",
@@ -419,7 +431,7 @@ async def change_password(
     - Debugging de problemas de autenticación
     """
 )
-async def validate_token(
+def validate_token(
     token_data: TokenValidationRequest,
     db: Session = Depends(get_db)
 ):
@@ -440,26 +452,36 @@ async def validate_token(
     summary="Health check del sistema de autenticación",
     description="Verifica que el sistema de autenticación esté funcionando"
 )
-async def auth_health_check(db: Session = Depends(get_db)):
+def auth_health_check(db: Session = Depends(get_db)):
     """
     Health check del sistema de autenticación.
+
+    Los conteos son COUNT(*) exactos (roles y users son tablas pequeñas) en
+    una sola consulta, cacheados 30 s: el endpoint se consulta seguido.
     """
-    # Verificar conexión a DB
     try:
-        from app.models.role import Role
-        role_count = db.query(Role).count()
-        user_count = db.query(User).count()
-
-        return {
-            "status": "healthy",
-            "service": "authentication",
-            "database": "connected",
-            "roles_count": role_count,
-            "users_count": user_count
-        }
+        # Verificar conexión a DB
+        db.execute(text("SELECT 1"))
     except Exception as e:
         return {
             "status": "unhealthy",
             "service": "authentication",
             "error": str(e)
         }
+
+    counts = cache_get("auth:health:counts")
+    if counts is None:
+        row = db.execute(select(
+            select(func.count()).select_from(Role).scalar_subquery().label("roles"),
+            select(func.count()).select_from(User).scalar_subquery().label("users")
+        )).one()
+        counts = dict(row._mapping)
+        cache_set("auth:health:counts", counts, AUTH_HEALTH_CACHE_TTL)
+
+    return {
+        "status": "healthy",
+        "service": "authentication",
+        "database": "connected",
+        "roles_count": counts.get("roles", 0),
+        "users_count": counts.get("users", 0)
+    }
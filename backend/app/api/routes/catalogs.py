@@ -1,28 +1,303 @@
 """
 Endpoints para consultar catálogos oficiales (EPS, CIE-10, CUPS)
 """
+import threading
+import time
+from collections import OrderedDict
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from typing import Optional, List
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import or_, func, case, select, tuple_, literal, union_all
+from typing import Optional, List, Dict
 from app.database import get_db
+from app.core.cache import cache_get, cache_set, cache_invalidate
+from app.dependencies.auth import require_admin
+from app.utils import paginate_with_total
 from app.models.eps import Eps
+from app.models.cie10 import Cie10
+from app.models.cups import Cups
 from app.schemas.catalogs import (
     EpsResponse,
     EpsListResponse,
     EpsSearchResponse,
-    EpsSearchMatch,
     Cie10Response,
     Cie10ListResponse,
     Cie10SearchResponse,
-    Cie10SearchMatch,
     CupsResponse,
     CupsListResponse,
     CupsSearchResponse,
-    CupsSearchMatch
+    CatalogCodesRequest
 )
 
-router = APIRouter(prefix="/catalogs", tags=["Catálogos"])
+router = APIRouter(
+    prefix="/catalogs",
+    tags=["Catálogos"]
+)
+
+
+# ============================================================================
+# CACHÉ EN MEMORIA DEL CATÁLOGO DE EPS
+# ============================================================================
+
+# El catálogo de EPS cambia muy poco (solo por migraciones), así que listado,
+# detalle y estadísticas se sirven desde una copia en memoria del proceso.
+EPS_CACHE_TTL = 300  # segundos
+
+_eps_cache: Optional[dict] = None
+_eps_cache_lock = threading.Lock()
+
+
+def _build_eps_stats(items: List[EpsResponse]) -> dict:
+    """Calcula las estadísticas del catálogo en una sola pasada."""
+    active = 0
+    nationwide = 0
+    by_regime = {}
+
+    for eps in items:
+        by_regime[eps.regime_type] = by_regime.get(eps.regime_type, 0) + 1
+        if eps.is_active:
+            active += 1
+            if eps.coverage_nationwide:
+                nationwide += 1
+
+    return {
+        "total_eps": len(items),
+        "active_eps": active,
+        "inactive_eps": len(items) - active,
+        "by_regime": by_regime,
+        "nationwide_coverage": nationwide
+    }
+
+
+def _load_eps(db: Session) -> dict:
+    """
+    Obtiene el catálogo de EPS en memoria, recargándolo cada EPS_CACHE_TTL.
+
+    Returns:
+        Dict con "all" (ordenadas por régimen y código), "by_id", "by_code"
+        y "stats"
+    """
+    global _eps_cache
+
+    cache = _eps_cache
+    if cache is not None and time.monotonic() - cache["loaded_at"] < EPS_CACHE_TTL:
+        return cache
+
+    with _eps_cache_lock:
+        cache = _eps_cache
+        if cache is not None and time.monotonic() - cache["loaded_at"] < EPS_CACHE_TTL:
+            return cache
+
+        items = [
+            EpsResponse.model_validate(eps)
+            for eps in db.query(Eps).order_by(Eps.regime_type, Eps.code).all()
+        ]
+        cache = {
+            "loaded_at": time.monotonic(),
+            "all": items,
+            "by_id": {eps.id: eps for eps in items},
+            "by_code": {eps.code: eps for eps in items},
+            "stats": _build_eps_stats(items)
+        }
+        _eps_cache = cache
+        return cache
+
+
+# ============================================================================
+# CACHÉ DE CONSULTAS CIE-10 Y CUPS
+# ============================================================================
+
+# CIE-10 y CUPS solo cambian con migraciones: capítulos, categorías,
+# estadísticas y detalle por código/ID se guardan en la caché compartida
+# (namespaces "cie10:" y "cups:").
+CATALOG_CACHE_TTL = 3600  # segundos
+
+# Resultados de búsqueda (autocompletado): muchas claves distintas, TTL corto
+CATALOG_SEARCH_CACHE_TTL = 300  # segundos
+
+# El detalle por código/ID se repite mucho sobre pocos códigos (autocompletado,
+# resolución de diagnósticos): además de la caché compartida, cada proceso
+# guarda los más usados en memoria (sin Redis ni DB). Acotado en tamaño y con
+# TTL corto para que /cache/clear llegue a todos los workers en segundos; los
+# no encontrados no se guardan.
+CATALOG_LOOKUP_CACHE_SIZE = 4096
+CATALOG_LOOKUP_CACHE_TTL = 60  # segundos
+
+_lookup_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_lookup_cache_lock = threading.Lock()
+
+# Columnas de Cie10Response (todas menos search_vector). Los listados las
+# consultan como columnas: filas livianas sin objetos ORM ni identity map,
+# que response_model lee por atributo igual que un modelo.
+CIE10_RESPONSE_COLUMNS = (
+    Cie10.id,
+    Cie10.code,
+    Cie10.short_description,
+    Cie10.full_description,
+    Cie10.chapter,
+    Cie10.chapter_code,
+    Cie10.category,
+    Cie10.is_subcategory,
+    Cie10.parent_code,
+    Cie10.is_common,
+    Cie10.notes,
+    Cie10.created_at,
+    Cie10.updated_at,
+)
+
+# Columnas de CupsResponse: contraindications y reference_cost no se publican,
+# así que no se traen de la base de datos en listados ni detalles
+CUPS_RESPONSE_COLUMNS = (
+    Cups.id,
+    Cups.code,
+    Cups.description,
+    Cups.chapter,
+    Cups.category,
+    Cups.subcategory,
+    Cups.procedure_type,
+    Cups.complexity_level,
+    Cups.ambulatory,
+    Cups.requires_hospitalization,
+    Cups.specialty,
+    Cups.estimated_duration_minutes,
+    Cups.is_active,
+    Cups.notes,
+    Cups.created_at,
+    Cups.updated_at,
+)
+
+
+def _local_lookup_get(key: str) -> Optional[dict]:
+    """Detalle guardado en memoria del proceso (None si no está o expiró)."""
+    with _lookup_cache_lock:
+        entry = _lookup_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _lookup_cache[key]
+            return None
+        _lookup_cache.move_to_end(key)
+        return value
+
+
+def _local_lookup_set(key: str, value: dict) -> None:
+    """Guarda un detalle en memoria, descartando el menos usado si está lleno."""
+    with _lookup_cache_lock:
+        _lookup_cache[key] = (time.monotonic() + CATALOG_LOOKUP_CACHE_TTL, value)
+        _lookup_cache.move_to_end(key)
+        if len(_lookup_cache) > CATALOG_LOOKUP_CACHE_SIZE:
+            _lookup_cache.popitem(last=False)
+
+
+def _cached_lookup(cache_key: str, load) -> Optional[dict]:
+    """
+    Detalle por código/ID: memoria del proceso, luego caché compartida y por
+    último load() (consulta a la DB). Los None (no encontrado) no se guardan.
+    """
+    value = _local_lookup_get(cache_key)
+    if value is not None:
+        return value
+
+    value = cache_get(cache_key)
+    if value is None:
+        value = load()
+        if value is None:
+            return None
+        cache_set(cache_key, value, CATALOG_CACHE_TTL)
+
+    _local_lookup_set(cache_key, value)
+    return value
+
+
+def _cie10_lookup(db: Session, code_upper: Optional[str] = None, cie10_id: Optional[int] = None) -> Optional[dict]:
+    """
+    Detalle CIE-10 serializado por código o ID (ver _cached_lookup).
+
+    Returns:
+        Dict de Cie10Response, o None si no existe (los no encontrados no se
+        guardan: un código agregado después se encuentra sin limpiar la caché)
+    """
+    def load() -> Optional[dict]:
+        query = db.query(Cie10)
+        if code_upper is not None:
+            cie10 = query.filter(func.upper(Cie10.code) == code_upper).first()
+        else:
+            cie10 = query.filter(Cie10.id == cie10_id).first()
+        return Cie10Response.model_validate(cie10).model_dump() if cie10 else None
+
+    cache_key = f"cie10:code:{code_upper}" if code_upper is not None else f"cie10:id:{cie10_id}"
+    return _cached_lookup(cache_key, load)
+
+
+def _cups_lookup(db: Session, code: Optional[str] = None, cups_id: Optional[int] = None) -> Optional[dict]:
+    """
+    Detalle CUPS serializado por código o ID (ver _cached_lookup).
+
+    Returns:
+        Dict de CupsResponse, o None si no existe (los no encontrados no se guardan)
+    """
+    def load() -> Optional[dict]:
+        query = db.query(Cups).options(load_only(*CUPS_RESPONSE_COLUMNS))
+        if code is not None:
+            cups = query.filter(Cups.code == code).first()
+        else:
+            cups = query.filter(Cups.id == cups_id).first()
+        return CupsResponse.model_validate(cups).model_dump() if cups else None
+
+    cache_key = f"cups:code:{code}" if code is not None else f"cups:id:{cups_id}"
+    return _cached_lookup(cache_key, load)
+
+
+def _scored_search(db: Session, model, columns: list, criteria: list, filters: list, order_column, limit: int):
+    """
+    Ejecuta una búsqueda puntuada en una sola sentencia.
+
+    Cada criterio es una rama de un UNION ALL, así PostgreSQL planifica cada
+    una con su propio índice (btree, trigram, texto completo) en lugar de un
+    único OR de LIKE que suele terminar en un recorrido secuencial. DISTINCT ON
+    deja cada fila una sola vez con su mejor score.
+
+    Cada rama trae como máximo `limit` filas (ordenadas por order_column): una
+    fila que entra al resultado final tiene delante, en su rama, solo filas que
+    también quedan delante en el resultado, así que el límite no cambia la
+    respuesta y un término muy amplio ("a") no trae miles de candidatos.
+
+    Args:
+        model: Modelo del catálogo (se une por id)
+        columns: Columnas a seleccionar
+        criteria: Lista (condición, score, campo) en orden de prioridad
+        filters: Condiciones adicionales (ej: solo activos)
+        order_column: Columna de desempate después del score
+        limit: Máximo de filas
+
+    Returns:
+        Filas con las columnas pedidas más "score" y "match_field"
+    """
+    candidates = union_all(*[
+        select(
+            model.id.label("id"),
+            literal(points).label("score"),
+            literal(field).label("match_field")
+        ).where(condition, *filters).order_by(order_column).limit(limit)
+        for condition, points, field in criteria
+    ]).cte("candidates")
+
+    # Mejor coincidencia por fila (los scores van de mayor a menor prioridad)
+    best = select(
+        candidates.c.id,
+        candidates.c.score,
+        candidates.c.match_field
+    ).distinct(candidates.c.id).order_by(
+        candidates.c.id, candidates.c.score.desc()
+    ).subquery("best")
+
+    stmt = select(
+        *columns,
+        best.c.score,
+        best.c.match_field
+    ).join_from(best, model, model.id == best.c.id)
+
+    return db.execute(stmt.order_by(best.c.score.desc(), order_column).limit(limit)).all()
 
 
 # ============================================================================
@@ -41,6 +316,8 @@ router = APIRouter(prefix="/catalogs", tags=["Catálogos"])
     - `is_active`: Filtrar por estado (true = activas, false = liquidadas/inactivas)
     - `coverage_nationwide`: Solo EPS con cobertura nacional
     - `limit` y `offset`: Para paginación
+    - `after_regime` y `after_code`: Paginación por cursor (usar `next_cursor`
+      de la respuesta anterior; tiene prioridad sobre `offset`)
 
     **Ejemplos:**
     - `/api/catalogs/eps` - Todas las EPS
@@ -74,35 +351,53 @@ def list_eps(
         ge=0,
         description="Número de registros a saltar (paginación)"
     ),
+    after_regime: Optional[str] = Query(
+        None,
+        description="Cursor: régimen de la última EPS de la página anterior"
+    ),
+    after_code: Optional[str] = Query(
+        None,
+        description="Cursor: código de la última EPS de la página anterior"
+    ),
     db: Session = Depends(get_db)
 ):
     """
     Lista todas las EPS del catálogo con filtros opcionales
     """
-    # Construir query base
-    query = db.query(Eps)
+    items = _load_eps(db)["all"]
 
     # Aplicar filtros
     if regime_type is not None:
-        query = query.filter(Eps.regime_type == regime_type)
+        items = [eps for eps in items if eps.regime_type == regime_type]
 
     if is_active is not None:
-        query = query.filter(Eps.is_active == is_active)
+        items = [eps for eps in items if eps.is_active == is_active]
 
     if coverage_nationwide is not None:
-        query = query.filter(Eps.coverage_nationwide == coverage_nationwide)
+        items = [eps for eps in items if eps.coverage_nationwide == coverage_nationwide]
 
     # Contar total
-    total = query.count()
+    total = len(items)
+
+    # Aplicar paginación (la caché ya está ordenada por régimen y código)
+    if after_regime is not None and after_code is not None:
+        cursor = (after_regime, after_code)
+        items = [eps for eps in items if (eps.regime_type, eps.code) > cursor][:limit + 1]
+    else:
+        items = items[offset:offset + limit + 1]
 
-    # Aplicar paginación y ordenar
-    items = query.order_by(Eps.regime_type, Eps.code).offset(offset).limit(limit).all()
+    # Se pide un registro extra para saber si hay página siguiente
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = {"regime_type": items[-1].regime_type, "code": items[-1].code}
 
     return {
         "total": total,
         "limit": limit,
         "offset": offset,
-        "items": items
+        "items": items,
+        "next_cursor": next_cursor
     }
 
 
@@ -158,102 +453,41 @@ def search_eps(
     search_term = q.strip()
     search_term_lower = search_term.lower()
 
-    # Query base
-    query = db.query(Eps)
+    # Criterios de coincidencia en orden de prioridad: (condición, score, campo)
+    criteria = [
+        (func.lower(Eps.code) == search_term_lower, 100, "code_exact"),
+        (Eps.nit == search_term, 90, "nit_exact"),
+        (func.lower(Eps.short_name).like(f"%{search_term_lower}%"), 80, "short_name"),
+        (func.lower(Eps.code).like(f"%{search_term_lower}%"), 70, "code_partial"),
+        (func.lower(Eps.name).like(f"%{search_term_lower}%"), 60, "name"),
+        (Eps.nit.like(f"%{search_term}%"), 50, "nit_partial"),
+    ]
+
+    # El CASE toma la primera condición que se cumple, igual que el orden de prioridad
+    score = case(*[(condition, points) for condition, points, _ in criteria], else_=0)
+    match_field = case(*[(condition, field) for condition, _, field in criteria])
+
+    # Una sola consulta: filtra, puntúa, ordena y limita en la base de datos.
+    # Solo se seleccionan las columnas de EpsSearchMatch (sin objetos ORM).
+    stmt = select(
+        Eps.id,
+        Eps.code,
+        Eps.name,
+        Eps.short_name,
+        Eps.regime_type,
+        Eps.is_active,
+        score.label("score"),
+        match_field.label("match_field")
+    ).where(or_(*[condition for condition, _, _ in criteria]))
 
     if only_active:
-        query = query.filter(Eps.is_active == True)
-
-    # Lista para almacenar resultados con score
-    results = []
-
-    # 1. Búsqueda por código EXACTO (100 puntos)
-    exact_code = query.filter(func.lower(Eps.code) == search_term_lower).all()
-    for eps in exact_code:
-        results.append({
-            "eps": eps,
-            "score": 100,
-            "match_field": "code_exact"
-        })
+        stmt = stmt.where(Eps.is_active == True)
 
-    # 2. Búsqueda por NIT EXACTO (90 puntos)
-    exact_nit = query.filter(Eps.nit == search_term).all()
-    for eps in exact_nit:
-        if not any(r["eps"].id == eps.id for r in results):
-            results.append({
-                "eps": eps,
-                "score": 90,
-                "match_field": "nit_exact"
-            })
-
-    # 3. Búsqueda por short_name (case-insensitive) (80 puntos)
-    short_name_match = query.filter(
-        func.lower(Eps.short_name).like(f"%{search_term_lower}%")
-    ).all()
-    for eps in short_name_match:
-        if not any(r["eps"].id == eps.id for r in results):
-            results.append({
-                "eps": eps,
-                "score": 80,
-                "match_field": "short_name"
-            })
-
-    # 4. Búsqueda por código PARCIAL (70 puntos)
-    partial_code = query.filter(
-        func.lower(Eps.code).like(f"%{search_term_lower}%")
-    ).all()
-    for eps in partial_code:
-        if not any(r["eps"].id == eps.id for r in results):
-            results.append({
-                "eps": eps,
-                "score": 70,
-                "match_field": "code_partial"
-            })
-
-    # 5. Búsqueda por nombre oficial (60 puntos)
-    name_match = query.filter(
-        func.lower(Eps.name).like(f"%{search_term_lower}%")
-    ).all()
-    for eps in name_match:
-        if not any(r["eps"].id == eps.id for r in results):
-            results.append({
-                "eps": eps,
-                "score": 60,
-                "match_field": "name"
-            })
-
-    # 6. Búsqueda por NIT PARCIAL (50 puntos)
-    partial_nit = query.filter(
-        Eps.nit.like(f"%{search_term}%")
-    ).all()
-    for eps in partial_nit:
-        if not any(r["eps"].id == eps.id for r in results):
-            results.append({
-                "eps": eps,
-                "score": 50,
-                "match_field": "nit_partial"
-            })
-
-    # Ordenar por score (descendente)
-    results.sort(key=lambda x: x["score"], reverse=True)
-
-    # Limitar resultados
-    results = results[:limit]
-
-    # Formatear respuesta
-    matches = []
-    for result in results:
-        eps = result["eps"]
-        matches.append(EpsSearchMatch(
-            id=eps.id,
-            code=eps.code,
-            name=eps.name,
-            short_name=eps.short_name,
-            regime_type=eps.regime_type,
-            is_active=eps.is_active,
-            score=result["score"],
-            match_field=result["match_field"]
-        ))
+    rows = db.execute(stmt.order_by(score.desc(), Eps.code).limit(limit)).all()
+
+    # Las filas ya traen exactamente los campos del schema: response_model las
+    # valida una sola vez al serializar
+    matches = [dict(row._mapping) for row in rows]
 
     return {
         "query": search_term,
@@ -281,7 +515,7 @@ def get_eps_by_code(
     """
     Obtiene una EPS específica por su código oficial
     """
-    eps = db.query(Eps).filter(Eps.code == code).first()
+    eps = _load_eps(db)["by_code"].get(code)
 
     if not eps:
         raise HTTPException(
@@ -305,7 +539,7 @@ def get_eps_by_id(
     """
     Obtiene una EPS específica por ID
     """
-    eps = db.query(Eps).filter(Eps.id == eps_id).first()
+    eps = _load_eps(db)["by_id"].get(eps_id)
 
     if not eps:
         raise HTTPException(
@@ -329,31 +563,7 @@ def get_eps_stats(db: Session = Depends(get_db)):
     """
     Obtiene estadísticas del catálogo de EPS
     """
-    total = db.query(Eps).count()
-    active = db.query(Eps).filter(Eps.is_active == True).count()
-    inactive = db.query(Eps).filter(Eps.is_active == False).count()
-
-    # Por régimen
-    by_regime = db.query(
-        Eps.regime_type,
-        func.count(Eps.id).label("count")
-    ).group_by(Eps.regime_type).all()
-
-    regime_stats = {regime: count for regime, count in by_regime}
-
-    # Con cobertura nacional
-    nationwide = db.query(Eps).filter(
-        Eps.coverage_nationwide == True,
-        Eps.is_active == True
-    ).count()
-
-    return {
-        "total_eps": total,
-        "active_eps": active,
-        "inactive_eps": inactive,
-        "by_regime": regime_stats,
-        "nationwide_coverage": nationwide
-    }
+    return _load_eps(db)["stats"]
 
 
 # ============================================================================
@@ -372,6 +582,9 @@ def get_eps_stats(db: Session = Depends(get_db)):
     - `is_common`: Filtrar por códigos comunes en atención primaria
     - `is_subcategory`: Filtrar por subcategorías (códigos con punto decimal)
     - `limit` y `offset`: Para paginación
+    - `after_chapter` y `after_code`: Paginación por cursor (usar `next_cursor`
+      de la respuesta anterior; tiene prioridad sobre `offset` y no recorre
+      las páginas previas)
 
     **Ejemplos:**
     - `/api/catalogs/cie10` - Todos los códigos
@@ -403,15 +616,21 @@ def list_cie10(
         ge=0,
         description="Número de registros a saltar (paginación)"
     ),
+    after_chapter: Optional[str] = Query(
+        None,
+        description="Cursor: capítulo del último código de la página anterior"
+    ),
+    after_code: Optional[str] = Query(
+        None,
+        description="Cursor: último código de la página anterior"
+    ),
     db: Session = Depends(get_db)
 ):
     """
     Lista todos los códigos CIE-10 del catálogo con filtros opcionales
     """
-    from app.models.cie10 import Cie10
-
     # Construir query base
-    query = db.query(Cie10)
+    query = db.query(*CIE10_RESPONSE_COLUMNS)
 
     # Aplicar filtros
     if chapter_code is not None:
@@ -423,17 +642,29 @@ def list_cie10(
     if is_subcategory is not None:
         query = query.filter(Cie10.is_subcategory == is_subcategory)
 
-    # Contar total
-    total = query.count()
-
-    # Aplicar paginación y ordenar
-    items = query.order_by(Cie10.chapter_code, Cie10.code).offset(offset).limit(limit).all()
+    # Aplicar paginación y ordenar (por cursor si se envía, usando el orden del índice).
+    # Se pide un registro extra para saber si hay página siguiente.
+    query = query.order_by(Cie10.chapter_code, Cie10.code)
+    if after_chapter is not None and after_code is not None:
+        # El total es del filtro completo, no de lo que queda después del cursor
+        total = query.order_by(None).count()
+        items = query.filter(
+            tuple_(Cie10.chapter_code, Cie10.code) > tuple_(after_chapter, after_code)
+        ).limit(limit + 1).all()
+    else:
+        items, total = paginate_with_total(query, offset, limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = {"chapter_code": items[-1].chapter_code, "code": items[-1].code}
 
     return {
         "total": total,
         "limit": limit,
         "offset": offset,
-        "items": items
+        "items": items,
+        "next_cursor": next_cursor
     }
 
 
@@ -455,6 +686,8 @@ def list_cie10(
     - 80 puntos: Palabra exacta en descripción corta
     - 70 puntos: Código contiene el término
     - 60 puntos: Palabra en descripción completa
+    - 50 puntos: Todas las palabras del término en las descripciones
+      (búsqueda de texto completo: cualquier orden, plurales y variantes)
 
     **Ejemplos:**
     - `/api/catalogs/cie10/search?q=I10` → Encuentra "I10 - Hipertensión esencial"
@@ -484,99 +717,43 @@ def search_cie10(
     """
     Búsqueda fuzzy de códigos CIE-10 por múltiples campos
     """
-    from app.models.cie10 import Cie10
-
     search_term = q.strip()
     search_term_upper = search_term.upper()
     search_term_lower = search_term.lower()
 
-    # Query base
-    query = db.query(Cie10)
-
-    if only_common:
-        query = query.filter(Cie10.is_common == True)
-
-    # Lista para almacenar resultados con score
-    results = []
+    # Todos los criterios de CIE-10 ignoran mayúsculas: la clave va en minúsculas
+    cache_key = f"cie10:search:{int(only_common)}:{limit}:{search_term_lower}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return {"query": search_term, "total_matches": len(cached), "matches": cached}
+
+    # Criterios de coincidencia en orden de prioridad: (condición, score, campo)
+    criteria = [
+        (func.upper(Cie10.code) == search_term_upper, 100, "code_exact"),
+        (func.upper(Cie10.code).like(f"{search_term_upper}%"), 90, "code_starts"),
+        (func.lower(Cie10.short_description).like(f"%{search_term_lower}%"), 80, "short_description"),
+        (func.upper(Cie10.code).like(f"%{search_term_upper}%"), 70, "code_contains"),
+        (func.lower(Cie10.full_description).like(f"%{search_term_lower}%"), 60, "full_description"),
+        (Cie10.search_vector.op("@@")(func.plainto_tsquery("spanish", search_term)), 50, "description_words"),
+    ]
+
+    columns = [
+        Cie10.id,
+        Cie10.code,
+        Cie10.short_description,
+        Cie10.chapter,
+        Cie10.chapter_code,
+        Cie10.is_common,
+    ]
+    filters = [Cie10.is_common == True] if only_common else []
 
-    # 1. Búsqueda por código EXACTO (100 puntos)
-    exact_code = query.filter(func.upper(Cie10.code) == search_term_upper).all()
-    for cie10 in exact_code:
-        results.append({
-            "cie10": cie10,
-            "score": 100,
-            "match_field": "code_exact"
-        })
+    # Una sola sentencia para todos los criterios: el LIMIT por rama de
+    # _scored_search ya acota el trabajo (también si el término es un código)
+    rows = _scored_search(db, Cie10, columns, criteria, filters, Cie10.code, limit)
 
-    # 2. Código INICIA CON el término (90 puntos)
-    starts_with_code = query.filter(
-        func.upper(Cie10.code).like(f"{search_term_upper}%")
-    ).all()
-    for cie10 in starts_with_code:
-        if not any(r["cie10"].id == cie10.id for r in results):
-            results.append({
-                "cie10": cie10,
-                "score": 90,
-                "match_field": "code_starts"
-            })
-
-    # 3. Palabra exacta en short_description (80 puntos)
-    short_desc_match = query.filter(
-        func.lower(Cie10.short_description).like(f"%{search_term_lower}%")
-    ).all()
-    for cie10 in short_desc_match:
-        if not any(r["cie10"].id == cie10.id for r in results):
-            results.append({
-                "cie10": cie10,
-                "score": 80,
-                "match_field": "short_description"
-            })
-
-    # 4. Código CONTIENE el término (70 puntos)
-    contains_code = query.filter(
-        func.upper(Cie10.code).like(f"%{search_term_upper}%")
-    ).all()
-    for cie10 in contains_code:
-        if not any(r["cie10"].id == cie10.id for r in results):
-            results.append({
-                "cie10": cie10,
-                "score": 70,
-                "match_field": "code_contains"
-            })
-
-    # 5. Búsqueda en full_description (60 puntos)
-    full_desc_match = query.filter(
-        func.lower(Cie10.full_description).like(f"%{search_term_lower}%")
-    ).all()
-    for cie10 in full_desc_match:
-        if not any(r["cie10"].id == cie10.id for r in results):
-            results.append({
-                "cie10": cie10,
-                "score": 60,
-                "match_field": "full_description"
-            })
-
-    # Ordenar por score (descendente)
-    results.sort(key=lambda x: x["score"], reverse=True)
-
-    # Limitar resultados
-    results = results[:limit]
-
-    # Formatear respuesta
-    from app.schemas.catalogs import Cie10SearchMatch
-    matches = []
-    for result in results:
-        cie10 = result["cie10"]
-        matches.append(Cie10SearchMatch(
-            id=cie10.id,
-            code=cie10.code,
-            short_description=cie10.short_description,
-            chapter=cie10.chapter,
-            chapter_code=cie10.chapter_code,
-            is_common=cie10.is_common,
-            score=result["score"],
-            match_field=result["match_field"]
-        ))
+    # Formatear respuesta (dicts; response_model valida una sola vez)
+    matches = [dict(row._mapping) for row in rows]
+    cache_set(cache_key, matches, CATALOG_SEARCH_CACHE_TTL)
 
     return {
         "query": search_term,
@@ -596,6 +773,9 @@ def search_cie10(
     - `/api/catalogs/cie10/code/I10` - Hipertensión esencial
     - `/api/catalogs/cie10/code/E11.9` - Diabetes tipo 2 sin complicaciones
     - `/api/catalogs/cie10/code/J44` - EPOC
+
+    **Nota:** para resolver varios códigos a la vez usar
+    `POST /api/catalogs/cie10/codes/batch` (una consulta en lugar de una por código).
     """
 )
 def get_cie10_by_code(
@@ -605,12 +785,8 @@ def get_cie10_by_code(
     """
     Obtiene un código CIE-10 específico por su código oficial
     """
-    from app.models.cie10 import Cie10
-
     # Normalizar código a mayúsculas
-    code_upper = code.upper()
-
-    cie10 = db.query(Cie10).filter(func.upper(Cie10.code) == code_upper).first()
+    cie10 = _cie10_lookup(db, code_upper=code.upper())
 
     if not cie10:
         raise HTTPException(
@@ -621,6 +797,33 @@ def get_cie10_by_code(
     return cie10
 
 
+@router.post(
+    "/cie10/codes/batch",
+    response_model=Dict[str, Cie10Response],
+    summary="Resolver varios códigos CIE-10",
+    description="""
+    Resuelve una lista de códigos CIE-10 en una sola consulta.
+
+    Retorna un diccionario `{código: detalle}`; los códigos que no existen
+    no aparecen en la respuesta.
+
+    **Ejemplo:** `{"codes": ["I10", "E11.9", "J44"]}`
+    """
+)
+def get_cie10_by_codes(
+    request: CatalogCodesRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Resuelve varios códigos CIE-10 con WHERE upper(code) IN (...)
+    """
+    codes_upper = list({code.strip().upper() for code in request.codes})
+
+    items = db.query(Cie10).filter(func.upper(Cie10.code).in_(codes_upper)).all()
+
+    return {cie10.code: cie10 for cie10 in items}
+
+
 @router.get(
     "/cie10/chapters",
     summary="Listar capítulos CIE-10",
@@ -630,8 +833,10 @@ def list_cie10_chapters(db: Session = Depends(get_db)):
     """
     Obtiene lista de capítulos CIE-10 con estadísticas
     """
-    from app.models.cie10 import Cie10
-    from app.schemas.catalogs import Cie10ChapterSummary
+    cache_key = "cie10:chapters"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
 
     # Obtener estadísticas por capítulo
     chapters_data = db.query(
@@ -653,10 +858,13 @@ def list_cie10_chapters(db: Session = Depends(get_db)):
             "common_codes": common
         })
 
-    return {
+    result = {
         "total_chapters": len(chapters),
         "chapters": chapters
     }
+    cache_set(cache_key, result, CATALOG_CACHE_TTL)
+
+    return result
 
 
 @router.get(
@@ -686,14 +894,12 @@ def get_cie10_by_chapter(
     """
     Obtiene códigos CIE-10 de un capítulo específico
     """
-    from app.models.cie10 import Cie10
-
     # Normalizar a mayúsculas
     chapter_code_upper = chapter_code.upper()
 
-    query = db.query(Cie10).filter(Cie10.chapter_code == chapter_code_upper)
+    query = db.query(*CIE10_RESPONSE_COLUMNS).filter(Cie10.chapter_code == chapter_code_upper)
 
-    total = query.count()
+    items, total = paginate_with_total(query.order_by(Cie10.code), offset, limit)
 
     if total == 0:
         raise HTTPException(
@@ -701,8 +907,6 @@ def get_cie10_by_chapter(
             detail=f"Capítulo '{chapter_code}' no encontrado"
         )
 
-    items = query.order_by(Cie10.code).offset(offset).limit(limit).all()
-
     return {
         "total": total,
         "limit": limit,
@@ -720,21 +924,28 @@ def get_cie10_stats(db: Session = Depends(get_db)):
     """
     Obtiene estadísticas del catálogo CIE-10
     """
-    from app.models.cie10 import Cie10
-
-    total = db.query(Cie10).count()
-    common = db.query(Cie10).filter(Cie10.is_common == True).count()
-    subcategories = db.query(Cie10).filter(Cie10.is_subcategory == True).count()
-
-    # Por capítulo
-    by_chapter = db.query(
-        Cie10.chapter_code,
-        func.count(Cie10.id).label("count")
-    ).group_by(Cie10.chapter_code).all()
+    cache_key = "cie10:stats"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Una sola consulta por capítulo con conteos condicionales (FILTER);
+    # los totales del catálogo son la suma de los capítulos
+    by_chapter = db.execute(
+        select(
+            Cie10.chapter_code,
+            func.count().label("total"),
+            func.count().filter(Cie10.is_common == True).label("common"),
+            func.count().filter(Cie10.is_subcategory == True).label("subcategories")
+        ).group_by(Cie10.chapter_code)
+    ).all()
 
-    chapter_stats = {chapter: count for chapter, count in by_chapter}
+    chapter_stats = {row.chapter_code: row.total for row in by_chapter}
+    total = sum(row.total for row in by_chapter)
+    common = sum(row.common for row in by_chapter)
+    subcategories = sum(row.subcategories for row in by_chapter)
 
-    return {
+    stats = {
         "total_codes": total,
         "common_codes": common,
         "subcategories": subcategories,
@@ -742,6 +953,9 @@ def get_cie10_stats(db: Session = Depends(get_db)):
         "chapters_count": len(chapter_stats),
         "by_chapter": chapter_stats
     }
+    cache_set(cache_key, stats, CATALOG_CACHE_TTL)
+
+    return stats
 
 
 @router.get(
@@ -757,9 +971,7 @@ def get_cie10_by_id(
     """
     Obtiene un código CIE-10 específico por ID
     """
-    from app.models.cie10 import Cie10
-
-    cie10 = db.query(Cie10).filter(Cie10.id == cie10_id).first()
+    cie10 = _cie10_lookup(db, cie10_id=cie10_id)
 
     if not cie10:
         raise HTTPException(
@@ -835,10 +1047,8 @@ def list_cups(
     """
     Lista todos los códigos CUPS del catálogo con filtros opcionales
     """
-    from app.models.cups import Cups
-
     # Construir query base
-    query = db.query(Cups)
+    query = db.query(*CUPS_RESPONSE_COLUMNS)
 
     # Aplicar filtros
     if category is not None:
@@ -856,11 +1066,10 @@ def list_cups(
     if complexity_level is not None:
         query = query.filter(Cups.complexity_level == complexity_level)
 
-    # Contar total
-    total = query.count()
-
-    # Aplicar paginación y ordenar
-    items = query.order_by(Cups.category, Cups.code).offset(offset).limit(limit).all()
+    # Aplicar paginación y ordenar (el total llega en la misma consulta)
+    items, total = paginate_with_total(
+        query.order_by(Cups.category, Cups.code), offset, limit
+    )
 
     return {
         "total": total,
@@ -890,6 +1099,8 @@ def list_cups(
     - 70 puntos: Código contiene el término
     - 60 puntos: Palabra en categoría
     - 50 puntos: Palabra en especialidad
+    - 40 puntos: Todas las palabras del término en descripción, categoría o
+      especialidad (búsqueda de texto completo: cualquier orden, plurales y variantes)
 
     **Ejemplos:**
     - `/api/catalogs/cups/search?q=890201` → Encuentra consulta medicina general
@@ -919,110 +1130,43 @@ def search_cups(
     """
     Búsqueda fuzzy de códigos CUPS por múltiples campos
     """
-    from app.models.cups import Cups
-
     search_term = q.strip()
     search_term_lower = search_term.lower()
 
-    # Query base
-    query = db.query(Cups)
+    # El código CUPS se compara tal cual: la clave conserva el término original
+    cache_key = f"cups:search:{int(only_active)}:{limit}:{search_term}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return {"query": search_term, "total_matches": len(cached), "matches": cached}
+
+    # Criterios de coincidencia en orden de prioridad: (condición, score, campo)
+    criteria = [
+        (Cups.code == search_term, 100, "code_exact"),
+        (Cups.code.like(f"{search_term}%"), 90, "code_starts"),
+        (func.lower(Cups.description).like(f"%{search_term_lower}%"), 80, "description"),
+        (Cups.code.like(f"%{search_term}%"), 70, "code_contains"),
+        (func.lower(Cups.category).like(f"%{search_term_lower}%"), 60, "category"),
+        (func.lower(Cups.specialty).like(f"%{search_term_lower}%"), 50, "specialty"),
+        (Cups.search_vector.op("@@")(func.plainto_tsquery("spanish", search_term)), 40, "description_words"),
+    ]
+
+    columns = [
+        Cups.id,
+        Cups.code,
+        Cups.description,
+        Cups.category,
+        Cups.procedure_type,
+        Cups.specialty,
+    ]
+    filters = [Cups.is_active == True] if only_active else []
 
-    if only_active:
-        query = query.filter(Cups.is_active == True)
-
-    # Lista para almacenar resultados con score
-    results = []
-
-    # 1. Búsqueda por código EXACTO (100 puntos)
-    exact_code = query.filter(Cups.code == search_term).all()
-    for cups in exact_code:
-        results.append({
-            "cups": cups,
-            "score": 100,
-            "match_field": "code_exact"
-        })
+    # Una sola sentencia para todos los criterios: el LIMIT por rama de
+    # _scored_search ya acota el trabajo (también si el término es un código)
+    rows = _scored_search(db, Cups, columns, criteria, filters, Cups.code, limit)
 
-    # 2. Código INICIA CON el término (90 puntos)
-    starts_with_code = query.filter(
-        Cups.code.like(f"{search_term}%")
-    ).all()
-    for cups in starts_with_code:
-        if not any(r["cups"].id == cups.id for r in results):
-            results.append({
-                "cups": cups,
-                "score": 90,
-                "match_field": "code_starts"
-            })
-
-    # 3. Palabra en descripción (80 puntos)
-    desc_match = query.filter(
-        func.lower(Cups.description).like(f"%{search_term_lower}%")
-    ).all()
-    for cups in desc_match:
-        if not any(r["cups"].id == cups.id for r in results):
-            results.append({
-                "cups": cups,
-                "score": 80,
-                "match_field": "description"
-            })
-
-    # 4. Código CONTIENE el término (70 puntos)
-    contains_code = query.filter(
-        Cups.code.like(f"%{search_term}%")
-    ).all()
-    for cups in contains_code:
-        if not any(r["cups"].id == cups.id for r in results):
-            results.append({
-                "cups": cups,
-                "score": 70,
-                "match_field": "code_contains"
-            })
-
-    # 5. Búsqueda en categoría (60 puntos)
-    category_match = query.filter(
-        func.lower(Cups.category).like(f"%{search_term_lower}%")
-    ).all()
-    for cups in category_match:
-        if not any(r["cups"].id == cups.id for r in results):
-            results.append({
-                "cups": cups,
-                "score": 60,
-                "match_field": "category"
-            })
-
-    # 6. Búsqueda en especialidad (50 puntos)
-    specialty_match = query.filter(
-        func.lower(Cups.specialty).like(f"%{search_term_lower}%")
-    ).all()
-    for cups in specialty_match:
-        if not any(r["cups"].id == cups.id for r in results):
-            results.append({
-                "cups": cups,
-                "score": 50,
-                "match_field": "specialty"
-            })
-
-    # Ordenar por score (descendente)
-    results.sort(key=lambda x: x["score"], reverse=True)
-
-    # Limitar resultados
-    results = results[:limit]
-
-    # Formatear respuesta
-    from app.schemas.catalogs import CupsSearchMatch
-    matches = []
-    for result in results:
-        cups = result["cups"]
-        matches.append(CupsSearchMatch(
-            id=cups.id,
-            code=cups.code,
-            description=cups.description,
-            category=cups.category,
-            procedure_type=cups.procedure_type,
-            specialty=cups.specialty,
-            score=result["score"],
-            match_field=result["match_field"]
-        ))
+    # Formatear respuesta (dicts; response_model valida una sola vez)
+    matches = [dict(row._mapping) for row in rows]
+    cache_set(cache_key, matches, CATALOG_SEARCH_CACHE_TTL)
 
     return {
         "query": search_term,
@@ -1042,6 +1186,9 @@ def search_cups(
     - `/api/catalogs/cups/code/890201` - Consulta medicina general
     - `/api/catalogs/cups/code/902215` - Glicemia en ayunas
     - `/api/catalogs/cups/code/893101` - Electrocardiograma
+
+    **Nota:** para resolver varios códigos a la vez usar
+    `POST /api/catalogs/cups/codes/batch` (una consulta en lugar de una por código).
     """
 )
 def get_cups_by_code(
@@ -1051,9 +1198,7 @@ def get_cups_by_code(
     """
     Obtiene un código CUPS específico por su código oficial
     """
-    from app.models.cups import Cups
-
-    cups = db.query(Cups).filter(Cups.code == code).first()
+    cups = _cups_lookup(db, code=code)
 
     if not cups:
         raise HTTPException(
@@ -1064,6 +1209,35 @@ def get_cups_by_code(
     return cups
 
 
+@router.post(
+    "/cups/codes/batch",
+    response_model=Dict[str, CupsResponse],
+    summary="Resolver varios códigos CUPS",
+    description="""
+    Resuelve una lista de códigos CUPS en una sola consulta.
+
+    Retorna un diccionario `{código: detalle}`; los códigos que no existen
+    no aparecen en la respuesta.
+
+    **Ejemplo:** `{"codes": ["890201", "902215", "893101"]}`
+    """
+)
+def get_cups_by_codes(
+    request: CatalogCodesRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Resuelve varios códigos CUPS con WHERE code IN (...)
+    """
+    codes = list({code.strip() for code in request.codes})
+
+    items = db.query(Cups).options(
+        load_only(*CUPS_RESPONSE_COLUMNS)
+    ).filter(Cups.code.in_(codes)).all()
+
+    return {cups.code: cups for cups in items}
+
+
 @router.get(
     "/cups/categories",
     summary="Listar categorías CUPS",
@@ -1073,7 +1247,10 @@ def list_cups_categories(db: Session = Depends(get_db)):
     """
     Obtiene lista de categorías CUPS con estadísticas
     """
-    from app.models.cups import Cups
+    cache_key = "cups:categories"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
 
     # Obtener estadísticas por categoría
     categories_data = db.query(
@@ -1094,10 +1271,13 @@ def list_cups_categories(db: Session = Depends(get_db)):
             "hospitalization_required": hospitalization
         })
 
-    return {
+    result = {
         "total_categories": len(categories),
         "categories": categories
     }
+    cache_set(cache_key, result, CATALOG_CACHE_TTL)
+
+    return result
 
 
 @router.get(
@@ -1127,11 +1307,9 @@ def get_cups_by_category(
     """
     Obtiene códigos CUPS de una categoría específica
     """
-    from app.models.cups import Cups
+    query = db.query(*CUPS_RESPONSE_COLUMNS).filter(Cups.category == category)
 
-    query = db.query(Cups).filter(Cups.category == category)
-
-    total = query.count()
+    items, total = paginate_with_total(query.order_by(Cups.code), offset, limit)
 
     if total == 0:
         raise HTTPException(
@@ -1139,8 +1317,6 @@ def get_cups_by_category(
             detail=f"Categoría '{category}' no encontrada"
         )
 
-    items = query.order_by(Cups.code).offset(offset).limit(limit).all()
-
     return {
         "total": total,
         "limit": limit,
@@ -1158,38 +1334,48 @@ def get_cups_stats(db: Session = Depends(get_db)):
     """
     Obtiene estadísticas del catálogo CUPS
     """
-    from app.models.cups import Cups
-
-    total = db.query(Cups).count()
-    active = db.query(Cups).filter(Cups.is_active == True).count()
-    ambulatory = db.query(Cups).filter(Cups.ambulatory == True).count()
-    hospitalization = db.query(Cups).filter(Cups.requires_hospitalization == True).count()
-
-    # Por categoría
-    by_category = db.query(
-        Cups.category,
-        func.count(Cups.id).label("count")
-    ).group_by(Cups.category).all()
-
-    category_stats = {category: count for category, count in by_category}
-
-    # Por tipo de procedimiento
-    by_type = db.query(
-        Cups.procedure_type,
-        func.count(Cups.id).label("count")
-    ).group_by(Cups.procedure_type).all()
-
-    type_stats = {proc_type: count for proc_type, count in by_type}
-
-    # Por complejidad
-    by_complexity = db.query(
-        Cups.complexity_level,
-        func.count(Cups.id).label("count")
-    ).group_by(Cups.complexity_level).all()
-
-    complexity_stats = {level: count for level, count in by_complexity}
+    cache_key = "cups:stats"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Conteos generales en una sola pasada (conteos condicionales con FILTER)
+    counts = db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(Cups.is_active == True).label("active"),
+            func.count().filter(Cups.ambulatory == True).label("ambulatory"),
+            func.count().filter(Cups.requires_hospitalization == True).label("hospitalization")
+        )
+    ).one()
+
+    # Las tres agrupaciones en una sola consulta con GROUPING SETS.
+    # GROUPING() indica a qué agrupación pertenece cada fila (las columnas
+    # pueden ser NULL, así que no basta con mirar cuál viene con valor).
+    grouped_columns = (Cups.category, Cups.procedure_type, Cups.complexity_level)
+    grouped = db.execute(
+        select(
+            *grouped_columns,
+            func.grouping(*grouped_columns).label("grouping_id"),
+            func.count().label("count")
+        ).group_by(func.grouping_sets(*grouped_columns))
+    ).all()
 
-    return {
+    # Bit en 1 = columna no agrupada: (category) -> 0b011, (procedure_type) -> 0b101...
+    category_stats, type_stats, complexity_stats = {}, {}, {}
+    targets = {0b011: (category_stats, 0), 0b101: (type_stats, 1), 0b110: (complexity_stats, 2)}
+    for row in grouped:
+        target, position = targets[row.grouping_id]
+        # Mismas claves que generaba json.dumps: None se publica como "null"
+        value = row[position]
+        target[value if value is not None else "null"] = row.count
+
+    total = counts.total
+    active = counts.active
+    ambulatory = counts.ambulatory
+    hospitalization = counts.hospitalization
+
+    stats = {
         "total_codes": total,
         "active_codes": active,
         "ambulatory_procedures": ambulatory,
@@ -1199,6 +1385,9 @@ def get_cups_stats(db: Session = Depends(get_db)):
         "by_procedure_type": type_stats,
         "by_complexity": complexity_stats
     }
+    cache_set(cache_key, stats, CATALOG_CACHE_TTL)
+
+    return stats
 
 
 @router.get(
@@ -1214,9 +1403,7 @@ def get_cups_by_id(
     """
     Obtiene un código CUPS específico por ID
     """
-    from app.models.cups import Cups
-
-    cups = db.query(Cups).filter(Cups.id == cups_id).first()
+    cups = _cups_lookup(db, cups_id=cups_id)
 
     if not cups:
         raise HTTPException(
@@ -1225,3 +1412,37 @@ def get_cups_by_id(
         )
 
     return cups
+
+
+# ============================================================================
+# ADMINISTRACIÓN DE CACHÉ
+# ============================================================================
+
+@router.post(
+    "/cache/clear",
+    summary="Limpiar caché de catálogos",
+    description="""
+    Descarta las copias en caché de los catálogos (EPS, CIE-10, CUPS).
+    Usar después de recargar un catálogo con una migración. Solo Admin.
+
+    **Nota:** las copias en memoria de los demás workers (detalle por
+    código/ID y EPS) se renuevan solas al vencer su TTL (60 s y 5 min).
+    """,
+    dependencies=[Depends(require_admin)]
+)
+def clear_catalog_cache():
+    """
+    Limpia la caché en memoria y la caché compartida de los catálogos
+    """
+    global _eps_cache
+
+    with _eps_cache_lock:
+        _eps_cache = None
+
+    with _lookup_cache_lock:
+        _lookup_cache.clear()
+
+    cache_invalidate("cie10")
+    cache_invalidate("cups")
+
+    return {"message": "Caché de catálogos limpiada exitosamente"}
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import case, func, literal, select, update
 from typing import List, Optional
 from datetime import date, datetime
 
 from app.database import get_db
 from app.models.control import Control, ControlStatusEnum, ControlTypeEnum
-from app.models.patient import Patient
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 
 router = APIRouter(tags=["controls"])
@@ -25,13 +24,23 @@ class ControlUpdate(BaseModel):
     notes: Optional[str] = Field(None, max_length=500)
 
 
+class ControlPatientInfo(BaseModel):
+    """Patient fields embedded in control responses"""
+    first_name: str
+    last_name: str
+    document_number: str
+
+    class Config:
+        from_attributes = True
+
+
 class ControlResponse(BaseModel):
     """Schema for control response"""
     id: int
     patient_id: int
-    control_type: str
+    control_type: ControlTypeEnum
     control_name: str
-    status: str
+    status: ControlStatusEnum
     last_date: Optional[date]
     due_date: Optional[date]
     scheduled_date: Optional[date]
@@ -42,12 +51,22 @@ class ControlResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    # Patient info
-    patient_name: Optional[str] = None
-    patient_document: Optional[str] = None
+    # Patient info (read from the control's patient relationship, not serialized)
+    patient: Optional[ControlPatientInfo] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def patient_name(self) -> Optional[str]:
+        return f"{self.patient.first_name} {self.patient.last_name}" if self.patient else None
+
+    @computed_field
+    @property
+    def patient_document(self) -> Optional[str]:
+        return self.patient.document_number if self.patient else None
 
     class Config:
         from_attributes = True
+        use_enum_values = True  # Store enum members as their plain string values
 
 
 class ControlStats(BaseModel):
@@ -63,7 +82,7 @@ class ControlStats(BaseModel):
 # ============================================================================
 
 @router.get("/controls/", response_model=List[ControlResponse])
-async def get_controls(
+def get_controls(
     control_type: Optional[ControlTypeEnum] = None,
     status: Optional[ControlStatusEnum] = None,
     urgent_only: bool = False,
@@ -82,7 +101,8 @@ async def get_controls(
     - **limit**: Maximum number of results
     - **offset**: Number of results to skip
     """
-    query = db.query(Control).join(Patient)
+    # Patient comes in the same SELECT (every control has a patient: inner join)
+    query = db.query(Control).options(joinedload(Control.patient, innerjoin=True))
 
     if control_type:
         query = query.filter(Control.control_type == control_type)
@@ -105,38 +125,15 @@ async def get_controls(
 
     controls = query.offset(offset).limit(limit).all()
 
-    # Add patient info to response
-    result = []
-    for control in controls:
-        control_dict = {
-            "id": control.id,
-            "patient_id": control.patient_id,
-            "control_type": control.control_type.value,
-            "control_name": control.control_name,
-            "status": control.status.value,
-            "last_date": control.last_date,
-            "due_date": control.due_date,
-            "scheduled_date": control.scheduled_date,
-            "completed_date": control.completed_date,
-            "is_urgent": control.is_urgent,
-            "priority_score": control.priority_score,
-            "notes": control.notes,
-            "created_at": control.created_at,
-            "updated_at": control.updated_at,
-            "patient_name": f"{control.patient.first_name} {control.patient.last_name}" if control.patient else None,
-            "patient_document": control.patient.document_number if control.patient else None
-        }
-        result.append(ControlResponse(**control_dict))
-
-    return result
+    return [ControlResponse.model_validate(control) for control in controls]
 
 
 @router.get("/controls/{control_id}", response_model=ControlResponse)
-async def get_control(control_id: int, db: Session = Depends(get_db)):
+def get_control(control_id: int, db: Session = Depends(get_db)):
     """
     Get a specific control by ID.
     """
-    control = db.query(Control).filter(Control.id == control_id).first()
+    control = db.query(Control).options(joinedload(Control.patient)).filter(Control.id == control_id).first()
 
     if not control:
         raise HTTPException(
@@ -144,30 +141,11 @@ async def get_control(control_id: int, db: Session = Depends(get_db)):
             detail=f"Control with id {control_id} not found"
         )
 
-    control_dict = {
-        "id": control.id,
-        "patient_id": control.patient_id,
-        "control_type": control.control_type.value,
-        "control_name": control.control_name,
-        "status": control.status.value,
-        "last_date": control.last_date,
-        "due_date": control.due_date,
-        "scheduled_date": control.scheduled_date,
-        "completed_date": control.completed_date,
-        "is_urgent": control.is_urgent,
-        "priority_score": control.priority_score,
-        "notes": control.notes,
-        "created_at": control.created_at,
-        "updated_at": control.updated_at,
-        "patient_name": f"{control.patient.first_name} {control.patient.last_name}" if control.patient else None,
-        "patient_document": control.patient.document_number if control.patient else None
-    }
-
-    return ControlResponse(**control_dict)
+    return ControlResponse.model_validate(control)
 
 
 @router.put("/controls/{control_id}", response_model=ControlResponse)
-async def update_control(
+def update_control(
     control_id: int,
     control_update: ControlUpdate,
     db: Session = Depends(get_db)
@@ -180,7 +158,25 @@ async def update_control(
     - **completed_date**: Date when the control was completed
     - **notes**: Additional notes about the control
     """
-    control = db.query(Control).filter(Control.id == control_id).first()
+    values = _control_update_values(control_update)
+
+    if values:
+        # One statement: UPDATE ... RETURNING in a CTE, joined to the patient.
+        # The status rules are evaluated by PostgreSQL on the current row, so
+        # there is no SELECT before the UPDATE and no read-modify-write race
+        updated = (
+            update(Control)
+            .where(Control.id == control_id)
+            .values(**values)
+            .returning(*Control.__table__.c)
+            .cte("updated_control")
+        )
+        updated_control = aliased(Control, updated)
+        stmt = select(updated_control).options(joinedload(updated_control.patient))
+    else:
+        stmt = select(Control).options(joinedload(Control.patient)).where(Control.id == control_id)
+
+    control = db.scalars(stmt).first()
 
     if not control:
         raise HTTPException(
@@ -188,84 +184,89 @@ async def update_control(
             detail=f"Control with id {control_id} not found"
         )
 
-    # Update fields if provided
-    if control_update.status is not None:
-        control.status = control_update.status
+    # Commit expires every attribute: build the response first
+    response = ControlResponse.model_validate(control)
+    db.commit()
+
+    return response
+
 
-        # Auto-set completed_date if marking as completed
-        if control_update.status == ControlStatusEnum.COMPLETADO and not control_update.completed_date:
-            control.completed_date = date.today()
+def _control_update_values(control_update: ControlUpdate) -> dict:
+    """
+    Translate a ControlUpdate into the column values for the UPDATE.
+
+    Auto-status rules:
+    - completed_date set -> status COMPLETADO
+    - status COMPLETADO without completed_date -> completed_date today
+    - scheduled_date set on a PENDIENTE control -> status PROGRAMADO
+    Only the last rule depends on the stored status; it becomes a CASE.
+    """
+    values = {}
+
+    if control_update.status == ControlStatusEnum.COMPLETADO and not control_update.completed_date:
+        values["completed_date"] = date.today()
 
     if control_update.scheduled_date is not None:
-        control.scheduled_date = control_update.scheduled_date
-        # Auto-change status to PROGRAMADO if setting a date
-        if control.status == ControlStatusEnum.PENDIENTE:
-            control.status = ControlStatusEnum.PROGRAMADO
+        values["scheduled_date"] = control_update.scheduled_date
 
     if control_update.completed_date is not None:
-        control.completed_date = control_update.completed_date
-        # Auto-change status to COMPLETADO if setting completion date
-        if control.status != ControlStatusEnum.COMPLETADO:
-            control.status = ControlStatusEnum.COMPLETADO
+        values["completed_date"] = control_update.completed_date
 
     if control_update.notes is not None:
-        control.notes = control_update.notes
+        values["notes"] = control_update.notes
 
-    db.commit()
-    db.refresh(control)
-
-    control_dict = {
-        "id": control.id,
-        "patient_id": control.patient_id,
-        "control_type": control.control_type.value,
-        "control_name": control.control_name,
-        "status": control.status.value,
-        "last_date": control.last_date,
-        "due_date": control.due_date,
-        "scheduled_date": control.scheduled_date,
-        "completed_date": control.completed_date,
-        "is_urgent": control.is_urgent,
-        "priority_score": control.priority_score,
-        "notes": control.notes,
-        "created_at": control.created_at,
-        "updated_at": control.updated_at,
-        "patient_name": f"{control.patient.first_name} {control.patient.last_name}" if control.patient else None,
-        "patient_document": control.patient.document_number if control.patient else None
-    }
-
-    return ControlResponse(**control_dict)
+    new_status = control_update.status
+    if control_update.completed_date is not None:
+        new_status = ControlStatusEnum.COMPLETADO
+    elif new_status == ControlStatusEnum.PENDIENTE and control_update.scheduled_date is not None:
+        new_status = ControlStatusEnum.PROGRAMADO
+
+    if new_status is not None:
+        values["status"] = new_status
+    elif control_update.scheduled_date is not None:
+        values["status"] = case(
+            (
+                Control.status == ControlStatusEnum.PENDIENTE,
+                literal(ControlStatusEnum.PROGRAMADO, Control.status.type)
+            ),
+            else_=Control.status
+        )
+
+    return values
 
 
 @router.get("/controls/stats/summary", response_model=ControlStats)
-async def get_controls_stats(db: Session = Depends(get_db)):
+def get_controls_stats(db: Session = Depends(get_db)):
     """
     Get statistics about controls.
     """
-    # Total controls
-    total = db.query(Control).count()
+    # One round-trip: GROUPING SETS returns the per-status and per-type counts,
+    # and the urgent count comes along as a conditional aggregate (FILTER).
+    # GROUPING() tells which set each row belongs to: (status) -> 0b01, (type) -> 0b10
+    grouped = db.execute(
+        select(
+            Control.status,
+            Control.control_type,
+            func.grouping(Control.status, Control.control_type).label("grouping_id"),
+            func.count().label("count"),
+            func.count().filter(Control.is_urgent == True).label("urgent")
+        ).group_by(func.grouping_sets(Control.status, Control.control_type))
+    ).all()
 
-    # By status
     by_status = {}
-    status_counts = db.query(
-        Control.status,
-        func.count(Control.id)
-    ).group_by(Control.status).all()
-
-    for status_enum, count in status_counts:
-        by_status[status_enum.value] = count
-
-    # By type
     by_type = {}
-    type_counts = db.query(
-        Control.control_type,
-        func.count(Control.id)
-    ).group_by(Control.control_type).all()
-
-    for type_enum, count in type_counts:
-        by_type[type_enum.value] = count
-
-    # Urgent count
-    urgent_count = db.query(Control).filter(Control.is_urgent == True).count()
+    total = 0
+    urgent_count = 0
+
+    for row in grouped:
+        if row.grouping_id == 0b01:
+            if row.status is not None:
+                by_status[row.status.value] = row.count
+            # Every control falls in exactly one status group
+            total += row.count
+            urgent_count += row.urgent
+        else:
+            by_type[row.control_type.value] = row.count
 
     return ControlStats(
         total=total,
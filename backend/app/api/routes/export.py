@@ -1,16 +1,198 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.orm import Query as SAQuery, Session, contains_eager
+from app.database import get_db, SessionLocal
 from app.models import Patient, Control, Alert
 from app.models.control import ControlTypeEnum, ControlStatusEnum
 from app.models.alert import AlertTypeEnum, AlertStatusEnum
-from typing import Optional
-import pandas as pd
+from typing import Any, Callable, Dict, Iterator, Optional
+from enum import Enum
+import xlsxwriter
+import csv
 import io
 
 router = APIRouter(prefix="/export", tags=["export"])
 
+# Rows fetched from the server-side cursor (and written to CSV) per batch
+EXPORT_BATCH_SIZE = 1000
+
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _cell(value: Any) -> Any:
+    """Enums are exported by value (same text shown in the UI)."""
+    return value.value if isinstance(value, Enum) else value
+
+
+def _stream_rows(query: SAQuery, to_row: Callable[[Any], Dict[str, Any]]) -> Optional[Iterator[Dict[str, Any]]]:
+    """
+    Run an export query in batches and return an iterator of row dicts,
+    or None when the query has no results.
+
+    The request session (get_db) is closed before a StreamingResponse body
+    is sent, so the rows are read from a dedicated session that stays open
+    until the body has been fully streamed.
+    """
+    stream_db = SessionLocal()
+    try:
+        results = iter(query.with_session(stream_db).yield_per(EXPORT_BATCH_SIZE))
+        first = next(results, None)
+    except Exception:
+        stream_db.close()
+        raise
+
+    if first is None:
+        stream_db.close()
+        return None
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        try:
+            yield to_row(first)
+            for item in results:
+                yield to_row(item)
+        finally:
+            stream_db.close()
+
+    return rows()
+
+
+def _csv_chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode rows as CSV (UTF-8 with BOM for Excel), one chunk per batch."""
+    buffer = io.StringIO()
+    writer = None
+    pending = 0
+    buffer.write('\ufeff')
+
+    for row in rows:
+        if writer is None:
+            writer = csv.writer(buffer)
+            writer.writerow(row.keys())
+        writer.writerow([_cell(value) for value in row.values()])
+        pending += 1
+
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_file(rows: Iterator[Dict[str, Any]], sheet_name: str) -> io.BytesIO:
+    """
+    Write rows to an XLSX workbook.
+
+    constant_memory makes xlsxwriter flush each row to disk as soon as the
+    next one starts, so only the compressed file is kept in memory.
+    """
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'remove_timezone': True,
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    header = workbook.add_format({'bold': True})
+
+    row_number = 0
+    for row in rows:
+        if row_number == 0:
+            worksheet.write_row(0, 0, list(row.keys()), header)
+            row_number = 1
+        worksheet.write_row(row_number, 0, [_cell(value) for value in row.values()])
+        row_number += 1
+
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+def _export_response(rows: Iterator[Dict[str, Any]], format: str, sheet_name: str, filename: str) -> StreamingResponse:
+    """Build the download response: CSV is streamed row by row, XLSX is written row by row."""
+    if format == 'xlsx':
+        content = _xlsx_file(rows, sheet_name)
+        media_type = XLSX_MEDIA_TYPE
+        filename = f'{filename}.xlsx'
+    else:  # csv
+        content = _csv_chunks(rows)
+        media_type = 'text/csv'
+        filename = f'{filename}.csv'
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+def _patient_row(patient: Patient) -> Dict[str, Any]:
+    return {
+        'Documento': patient.document_number,
+        'Tipo de Documento': patient.document_type,
+        'Nombre Completo': patient.full_name,
+        'Edad': patient.age,
+        'Sexo': patient.sex,
+        'Grupo Etario': patient.age_group,
+        'Teléfono': patient.phone,
+        'Email': patient.email,
+        'Dirección': patient.address,
+        'Barrio / Vereda': patient.neighborhood,
+        'Ciudad': patient.city,
+        'EPS': patient.eps,
+        'Tipo de Convenio': patient.tipo_convenio,
+        'Diagnósticos': patient.diagnoses,
+        'Hipertenso': 'Sí' if patient.is_hypertensive else 'No',
+        'Diabético': 'Sí' if patient.is_diabetic else 'No',
+        'Gestante': 'Sí' if patient.is_pregnant else 'No',
+        'Riesgo CV': 'Sí' if patient.has_cardiovascular_risk else 'No',
+        'Nivel Riesgo CV': patient.cardiovascular_risk_level,
+        'Último Control General': patient.last_general_control_date,
+        'Último Control 3280': patient.last_3280_control_date,
+        'Último Control HTA': patient.last_hta_control_date,
+        'Último Control DM': patient.last_dm_control_date,
+        'Contactado': 'Sí' if patient.is_contacted else 'No',
+        'Estado Contacto': patient.contact_status,
+        'Intentos Contacto': patient.contact_attempts,
+    }
+
+
+def _control_row(control: Control) -> Dict[str, Any]:
+    patient = control.patient
+    return {
+        'Documento': patient.document_number,
+        'Nombre Completo': patient.full_name,
+        'Edad': patient.age,
+        'Sexo': patient.sex,
+        'Teléfono': patient.phone,
+        'Email': patient.email,
+        'Dirección': patient.address,
+        'Control': control.control_name,
+        'Estado': control.status,
+        'Fecha Última': control.last_date,
+        'Fecha Vencimiento': control.due_date,
+        'Es Urgente': 'Sí' if control.is_urgent else 'No',
+    }
+
+
+def _alert_row(alert: Alert) -> Dict[str, Any]:
+    patient = alert.patient
+    return {
+        'Documento': patient.document_number,
+        'Nombre Completo': patient.full_name,
+        'Edad': patient.age,
+        'Sexo': patient.sex,
+        'Teléfono': patient.phone,
+        'Email': patient.email,
+        'Dirección': patient.address,
+        'Alerta': alert.alert_name,
+        'Prioridad': alert.priority,
+        'Razón': alert.reason,
+        'Criterios': alert.criteria,
+        'Fecha Límite': alert.due_date,
+    }
+
 
 @router.get("/patients")
 def export_patients(
@@ -46,70 +228,19 @@ def export_patients(
         query = query.filter(Patient.has_cardiovascular_risk == has_cardiovascular_risk)
     if is_contacted is not None:
         query = query.filter(Patient.is_contacted == is_contacted)
+    # EXISTS instead of joins: yield_per does not de-duplicate entities like
+    # .all() does, so a join would export a patient once per matching row
     if control_type:
-        query = query.join(Control).filter(Control.control_type == control_type)
+        query = query.filter(Patient.controls.any(Control.control_type == control_type))
     if alert_type:
-        query = query.join(Alert).filter(Alert.alert_type == alert_type)
+        query = query.filter(Patient.alerts.any(Alert.alert_type == alert_type))
 
-    patients = query.all()
+    rows = _stream_rows(query, _patient_row)
 
-    if not patients:
+    if rows is None:
         raise HTTPException(status_code=404, detail="No se encontraron pacientes con los filtros aplicados")
 
-    # Convert to DataFrame
-    data = []
-    for patient in patients:
-        data.append({
-            'Documento': patient.document_number,
-            'Tipo de Documento': patient.document_type,
-            'Nombre Completo': patient.full_name,
-            'Edad': patient.age,
-            'Sexo': patient.sex,
-            'Grupo Etario': patient.age_group,
-            'Teléfono': patient.phone,
-            'Email': patient.email,
-            'Dirección': patient.address,
-            'Barrio / Vereda': patient.neighborhood,
-            'Ciudad': patient.city,
-            'EPS': patient.eps,
-            'Tipo de Convenio': patient.tipo_convenio,
-            'Diagnósticos': patient.diagnoses,
-            'Hipertenso': 'Sí' if patient.is_hypertensive else 'No',
-            'Diabético': 'Sí' if patient.is_diabetic else 'No',
-            'Gestante': 'Sí' if patient.is_pregnant else 'No',
-            'Riesgo CV': 'Sí' if patient.has_cardiovascular_risk else 'No',
-            'Nivel Riesgo CV': patient.cardiovascular_risk_level,
-            'Último Control General': patient.last_general_control_date,
-            'Último Control 3280': patient.last_3280_control_date,
-            'Último Control HTA': patient.last_hta_control_date,
-            'Último Control DM': patient.last_dm_control_date,
-            'Contactado': 'Sí' if patient.is_contacted else 'No',
-            'Estado Contacto': patient.contact_status,
-            'Intentos Contacto': patient.contact_attempts,
-        })
-
-    df = pd.DataFrame(data)
-
-    # Create output file
-    output = io.BytesIO()
-
-    if format == 'xlsx':
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Pacientes')
-        media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = 'pacientes_sage3280.xlsx'
-    else:  # csv
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        media_type = 'text/csv'
-        filename = 'pacientes_sage3280.csv'
-
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type=media_type,
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
-    )
+    return _export_response(rows, format, 'Pacientes', 'pacientes_sage3280')
 
 
 @router.get("/controls")
@@ -122,7 +253,8 @@ def export_controls_by_type(
     """
     Export list of patients needing specific control type.
     """
-    query = db.query(Control).join(Patient).filter(
+    # The join to Patient also fills control.patient (no query per row)
+    query = db.query(Control).join(Patient).options(contains_eager(Control.patient)).filter(
         Patient.is_active == True,
         Control.control_type == control_type
     )
@@ -130,52 +262,12 @@ def export_controls_by_type(
     if status:
         query = query.filter(Control.status == status)
 
-    controls = query.all()
+    rows = _stream_rows(query, _control_row)
 
-    if not controls:
+    if rows is None:
         raise HTTPException(status_code=404, detail="No se encontraron controles con los filtros aplicados")
 
-    # Convert to DataFrame
-    data = []
-    for control in controls:
-        patient = control.patient
-        data.append({
-            'Documento': patient.document_number,
-            'Nombre Completo': patient.full_name,
-            'Edad': patient.age,
-            'Sexo': patient.sex,
-            'Teléfono': patient.phone,
-            'Email': patient.email,
-            'Dirección': patient.address,
-            'Control': control.control_name,
-            'Estado': control.status,
-            'Fecha Última': control.last_date,
-            'Fecha Vencimiento': control.due_date,
-            'Es Urgente': 'Sí' if control.is_urgent else 'No',
-        })
-
-    df = pd.DataFrame(data)
-
-    # Create output file
-    output = io.BytesIO()
-
-    if format == 'xlsx':
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Controles')
-        media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'controles_{control_type}_sage3280.xlsx'
-    else:  # csv
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        media_type = 'text/csv'
-        filename = f'controles_{control_type}_sage3280.csv'
-
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type=media_type,
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
-    )
+    return _export_response(rows, format, 'Controles', f'controles_{control_type}_sage3280')
 
 
 @router.get("/alerts")
@@ -188,7 +280,8 @@ def export_alerts_by_type(
     """
     Export list of patients with specific alert type.
     """
-    query = db.query(Alert).join(Patient).filter(
+    # The join to Patient also fills alert.patient (no query per row)
+    query = db.query(Alert).join(Patient).options(contains_eager(Alert.patient)).filter(
         Patient.is_active == True,
         Alert.alert_type == alert_type,
         Alert.status == AlertStatusEnum.ACTIVA
@@ -197,49 +290,9 @@ def export_alerts_by_type(
     if priority:
         query = query.filter(Alert.priority == priority)
 
-    alerts = query.all()
+    rows = _stream_rows(query, _alert_row)
 
-    if not alerts:
+    if rows is None:
         raise HTTPException(status_code=404, detail="No se encontraron alertas con los filtros aplicados")
 
-    # Convert to DataFrame
-    data = []
-    for alert in alerts:
-        patient = alert.patient
-        data.append({
-            'Documento': patient.document_number,
-            'Nombre Completo': patient.full_name,
-            'Edad': patient.age,
-            'Sexo': patient.sex,
-            'Teléfono': patient.phone,
-            'Email': patient.email,
-            'Dirección': patient.address,
-            'Alerta': alert.alert_name,
-            'Prioridad': alert.priority,
-            'Razón': alert.reason,
-            'Criterios': alert.criteria,
-            'Fecha Límite': alert.due_date,
-        })
-
-    df = pd.DataFrame(data)
-
-    # Create output file
-    output = io.BytesIO()
-
-    if format == 'xlsx':
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Alertas')
-        media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'alertas_{alert_type}_sage3280.xlsx'
-    else:  # csv
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        media_type = 'text/csv'
-        filename = f'alertas_{alert_type}_sage3280.csv'
-
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type=media_type,
-        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
-    )
+    return _export_response(rows, format, 'Alertas', f'alertas_{alert_type}_sage3280')
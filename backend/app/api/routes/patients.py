@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func
+from app import database
 from app.database import get_db
+from app.utils import paginate_with_total
 from app.models import Patient, Control, Alert
 from app.models.control import ControlTypeEnum
 from app.models.alert import AlertTypeEnum
 from app.schemas.patient import PatientResponse, PatientList, PatientFilter
 from typing import Optional, List
+from datetime import datetime
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
@@ -54,13 +57,16 @@ def get_patients(
     if is_contacted is not None:
         query = query.filter(Patient.is_contacted == is_contacted)
 
+    # EXISTS instead of joins: the rows come with a window count, so a join
+    # would repeat a patient once per matching control/alert (and inflate the total)
     if control_type:
-        query = query.join(Control).filter(Control.control_type == control_type)
+        query = query.filter(Patient.controls.any(Control.control_type == control_type))
 
     if alert_type:
-        query = query.join(Alert).filter(Alert.alert_type == alert_type)
+        query = query.filter(Patient.alerts.any(Alert.alert_type == alert_type))
 
     if search:
+        # ILIKE '%term%' is served by the pg_trgm GIN indexes on both columns
         search_term = f"%{search}%"
         query = query.filter(
             or_(
@@ -68,13 +74,25 @@ def get_patients(
                 Patient.document_number.ilike(search_term)
             )
         )
-
-    # Get total count
-    total = query.count()
-
-    # Apply pagination
+        if database.pg_trgm_available:
+            # Closest matches first (trigram similarity), then a stable order
+            query = query.order_by(
+                func.greatest(
+                    func.similarity(Patient.full_name, search),
+                    func.similarity(Patient.document_number, search)
+                ).desc(),
+                Patient.id
+            )
+        else:
+            # similarity() needs pg_trgm (created by init_db when allowed)
+            query = query.order_by(Patient.id)
+    else:
+        # Stable order so pages don't overlap (primary key index)
+        query = query.order_by(Patient.id)
+
+    # Apply pagination; the total comes from a window function in the same query
     offset = (page - 1) * page_size
-    patients = query.offset(offset).limit(page_size).all()
+    patients, total = paginate_with_total(query, offset, page_size)
 
     return PatientList(
         total=total,
@@ -137,7 +155,6 @@ def update_contact_status(
     patient.is_contacted = True
     patient.contact_attempts += 1
     patient.contact_status = contact_status
-    from datetime import datetime
     patient.last_contact_date = datetime.now()
 
     db.commit()
@@ -157,56 +174,30 @@ def get_priority_list(
     """
     from app.services.classifier import PatientClassifier
 
-    patients = db.query(Patient).filter(
+    # Score computed, filtered and sorted in SQL: only the top rows are loaded
+    priority_score = PatientClassifier.priority_score_expression().label("priority_score")
+
+    rows = db.query(
+        Patient.id,
+        Patient.document_number,
+        Patient.full_name,
+        Patient.age,
+        Patient.phone,
+        priority_score,
+        Patient.is_pregnant,
+        Patient.is_hypertensive,
+        Patient.is_diabetic,
+        Patient.has_cardiovascular_risk
+    ).filter(
         Patient.is_active == True,
-        Patient.is_contacted == False
-    ).all()
-
-    # Calculate priority for each patient
-    patient_priorities = []
-    for patient in patients:
-        priority = PatientClassifier.calculate_priority_score(
-            age=patient.age,
-            is_pregnant=patient.is_pregnant,
-            is_hypertensive=patient.is_hypertensive,
-            is_diabetic=patient.is_diabetic,
-            has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
-            has_copd=getattr(patient, 'has_copd', False),
-            has_asthma=getattr(patient, 'has_asthma', False),
-            has_ckd=getattr(patient, 'has_ckd', False),
-            has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
-            has_cardiovascular_risk=patient.has_cardiovascular_risk,
-            cardiovascular_risk_level=patient.cardiovascular_risk_level,
-            last_control_date=patient.last_control_date
-        )
-
-        if priority >= min_priority:
-            patient_priorities.append({
-                'patient': patient,
-                'priority_score': priority
-            })
-
-    # Sort by priority
-    patient_priorities.sort(key=lambda x: x['priority_score'], reverse=True)
-
-    # Limit results
-    patient_priorities = patient_priorities[:limit]
+        Patient.is_contacted == False,
+        priority_score >= min_priority
+    ).order_by(
+        priority_score.desc(),
+        Patient.id
+    ).limit(limit).all()
 
     return {
-        'total': len(patient_priorities),
-        'patients': [
-            {
-                'id': item['patient'].id,
-                'document_number': item['patient'].document_number,
-                'full_name': item['patient'].full_name,
-                'age': item['patient'].age,
-                'phone': item['patient'].phone,
-                'priority_score': item['priority_score'],
-                'is_pregnant': item['patient'].is_pregnant,
-                'is_hypertensive': item['patient'].is_hypertensive,
-                'is_diabetic': item['patient'].is_diabetic,
-                'has_cardiovascular_risk': item['patient'].has_cardiovascular_risk
-            }
-            for item in patient_priorities
-        ]
+        'total': len(rows),
+        'patients': [row._asdict() for row in rows]
     }
@@ -11,22 +11,38 @@ Endpoints:
 - PUT /roles/{role_id} - Actualizar rol
 - DELETE /roles/{role_id} - Eliminar rol personalizado
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from typing import Optional
+from datetime import datetime
+import hashlib
+import orjson
 
 from app.database import get_db
 from app.dependencies.auth import require_admin
-from app.models.user import User
+from app.models.user import User, user_roles
 from app.models.role import Role
 from app.models.audit_log import AuditLog
 from app.schemas.user import RoleResponse, RoleListResponse, RoleBase
+from app.services import auth_service
 
 
 # ============================================================================
 # ROUTER SETUP
 # ============================================================================
 
+# Usuarios asignados al rol, como subconsulta correlacionada: se lee en la
+# misma consulta que carga el rol
+ROLE_USER_COUNT = (
+    select(func.count())
+    .select_from(user_roles)
+    .where(user_roles.c.role_id == Role.id)
+    .correlate(Role)
+    .scalar_subquery()
+    .label("user_count")
+)
+
 router = APIRouter(
     prefix="/roles",
     tags=["Role Management"],
@@ -53,16 +69,18 @@ async def list_roles(
     db: Session = Depends(get_db)
 ):
     """Lista todos los roles."""
-    query = db.query(Role)
+    # Roles y usuarios por rol en la misma consulta (LEFT JOIN + GROUP BY)
+    query = (
+        db.query(Role, func.count(user_roles.c.user_id).label("user_count"))
+        .outerjoin(user_roles, user_roles.c.role_id == Role.id)
+        .group_by(Role.id)
+    )
 
     if not include_inactive:
         query = query.filter(Role.is_active == True)
 
-    roles = query.all()
-
     items = []
-    for role in roles:
-        user_count = db.query(User).join(User.roles).filter(Role.id == role.id).count()
+    for role, user_count in query.all():
         items.append({
             "id": role.id,
             "name": role.name,
@@ -97,15 +115,15 @@ async def get_role(
     db: Session = Depends(get_db)
 ):
     """Obtiene un rol por ID."""
-    role = db.query(Role).filter(Role.id == role_id).first()
+    row = db.query(Role, ROLE_USER_COUNT).filter(Role.id == role_id).first()
 
-    if not role:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rol no encontrado"
         )
 
-    user_count = db.query(User).join(User.roles).filter(Role.id == role.id).count()
+    role, user_count = row
 
     return {
         "id": role.id,
@@ -250,14 +268,17 @@ async def update_role(
     current_user: User = Depends(require_admin)
 ):
     """Actualiza un rol personalizado."""
-    role = db.query(Role).filter(Role.id == role_id).first()
+    # El conteo de usuarios no cambia con la actualización: se lee junto al rol
+    row = db.query(Role, ROLE_USER_COUNT).filter(Role.id == role_id).first()
 
-    if not role:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rol no encontrado"
         )
 
+    role, user_count = row
+
     # No permitir editar roles del sistema
     if role.is_system_role:
         raise HTTPException(
@@ -284,11 +305,11 @@ async def update_role(
     role.permissions = role_data.permissions
     role.is_active = role_data.is_active
 
-    from datetime import datetime
     role.updated_at = datetime.now()
 
     db.commit()
     db.refresh(role)
+    auth_service.invalidate_user_info()
 
     # Audit log
     AuditLog.log_action(
@@ -306,8 +327,6 @@ async def update_role(
         }
     )
 
-    user_count = db.query(User).join(User.roles).filter(Role.id == role.id).count()
-
     return {
         "id": role.id,
         "name": role.name,
@@ -338,14 +357,16 @@ async def delete_role(
     current_user: User = Depends(require_admin)
 ):
     """Elimina un rol personalizado."""
-    role = db.query(Role).filter(Role.id == role_id).first()
+    row = db.query(Role, ROLE_USER_COUNT).filter(Role.id == role_id).first()
 
-    if not role:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rol no encontrado"
         )
 
+    role, user_count = row
+
     # No permitir eliminar roles del sistema
     if role.is_system_role:
         raise HTTPException(
@@ -354,7 +375,6 @@ async def delete_role(
         )
 
     # Verificar si hay usuarios con este rol
-    user_count = db.query(User).join(User.roles).filter(Role.id == role_id).count()
     if user_count > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -389,75 +409,96 @@ async def delete_role(
 # GET AVAILABLE PERMISSIONS
 # ============================================================================
 
+# Permisos disponibles: estáticos, así que la respuesta se serializa una sola
+# vez al importar y se identifica con un ETag
+AVAILABLE_PERMISSIONS = {
+    "patients": [
+        "patients.create",
+        "patients.read",
+        "patients.update",
+        "patients.delete",
+        "patients.export",
+        "patients.contact"
+    ],
+    "consultations": [
+        "consultations.create",
+        "consultations.read",
+        "consultations.update"
+    ],
+    "controls": [
+        "controls.create",
+        "controls.read",
+        "controls.update"
+    ],
+    "alerts": [
+        "alerts.read",
+        "alerts.update",
+        "alerts.create"
+    ],
+    "reports": [
+        "reports.read",
+        "reports.create",
+        "reports.export"
+    ],
+    "upload": [
+        "upload.create",
+        "upload.read"
+    ],
+    "catalogs": [
+        "catalogs.read",
+        "catalogs.manage"
+    ],
+    "stats": [
+        "stats.read"
+    ],
+    "users": [
+        "users.create",
+        "users.read",
+        "users.update",
+        "users.delete"
+    ],
+    "roles": [
+        "roles.create",
+        "roles.read",
+        "roles.update",
+        "roles.delete"
+    ],
+    "audit": [
+        "audit.read"
+    ],
+    "admin": [
+        "*"
+    ]
+}
+
+_PERMISSIONS_RESPONSE = orjson.dumps({
+    "permissions": AVAILABLE_PERMISSIONS,
+    "total_permissions": sum(len(v) for v in AVAILABLE_PERMISSIONS.values()),
+    "categories": list(AVAILABLE_PERMISSIONS.keys())
+})
+_PERMISSIONS_ETAG = f'"{hashlib.md5(_PERMISSIONS_RESPONSE).hexdigest()}"'
+
+
 @router.get(
     "/permissions/list",
     summary="Listar permisos disponibles",
     description="Obtiene lista de permisos disponibles en el sistema. Solo Admin."
 )
-async def list_available_permissions():
-    """Lista todos los permisos disponibles."""
-    permissions = {
-        "patients": [
-            "patients.create",
-            "patients.read",
-            "patients.update",
-            "patients.delete",
-            "patients.export",
-            "patients.contact"
-        ],
-        "consultations": [
-            "consultations.create",
-            "consultations.read",
-            "consultations.update"
-        ],
-        "controls": [
-            "controls.create",
-            "controls.read",
-            "controls.update"
-        ],
-        "alerts": [
-            "alerts.read",
-            "alerts.update",
-            "alerts.create"
-        ],
-        "reports": [
-            "reports.read",
-            "reports.create",
-            "reports.export"
-        ],
-        "upload": [
-            "upload.create",
-            "upload.read"
-        ],
-        "catalogs": [
-            "catalogs.read",
-            "catalogs.manage"
-        ],
-        "stats": [
-            "stats.read"
-        ],
-        "users": [
-            "users.create",
-            "users.read",
-            "users.update",
-            "users.delete"
-        ],
-        "roles": [
-            "roles.create",
-            "roles.read",
-            "roles.update",
-            "roles.delete"
-        ],
-        "audit": [
-            "audit.read"
-        ],
-        "admin": [
-            "*"
-        ]
+async def list_available_permissions(
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Lista todos los permisos disponibles.
+
+    Responde 304 si el cliente ya tiene la versión actual (If-None-Match).
+    """
+    headers = {
+        "ETag": _PERMISSIONS_ETAG,
+        # Revalidar siempre: los permisos pueden cambiar con un despliegue
+        "Cache-Control": "private, no-cache"
     }
 
-    return {
-        "permissions": permissions,
-        "total_permissions": sum(len(v) for v in permissions.values()),
-        "categories": list(permissions.keys())
-    }
+    if if_none_match == _PERMISSIONS_ETAG:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=_PERMISSIONS_RESPONSE, media_type="application/json", headers=headers)
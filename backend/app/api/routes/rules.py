@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.utils import paginate_with_total
 from app.models import ControlRule, AlertRule, RiasGuideline
 from app.schemas.rules import (
     ControlRuleCreate, ControlRuleUpdate, ControlRuleResponse, ControlRuleList,
@@ -12,6 +14,30 @@ from typing import Optional
 router = APIRouter(prefix="/rules", tags=["rules"])
 
 
+def _insert_unique(db: Session, model, values: dict, code_column: str, response_model):
+    """
+    INSERT ... ON CONFLICT (code) DO NOTHING RETURNING *: one round-trip and
+    atomic under concurrent creates (no SELECT-then-INSERT race).
+
+    Returns:
+        The response model for the new row, or None if the code already exists
+    """
+    created = db.scalars(
+        pg_insert(model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[code_column])
+        .returning(model)
+    ).first()
+
+    if created is None:
+        return None
+
+    # Built before commit: commit expires the row and reading it would SELECT again
+    response = response_model.model_validate(created)
+    db.commit()
+    return response
+
+
 # =========================================================
 # Control Rules Endpoints
 # =========================================================
@@ -21,16 +47,10 @@ def create_control_rule(rule: ControlRuleCreate, db: Session = Depends(get_db)):
     """
     Create a new control rule.
     """
-    # Check if rule_code already exists
-    existing = db.query(ControlRule).filter(ControlRule.rule_code == rule.rule_code).first()
-    if existing:
+    created = _insert_unique(db, ControlRule, rule.model_dump(), "rule_code", ControlRuleResponse)
+    if created is None:
         raise HTTPException(status_code=400, detail=f"Regla con código '{rule.rule_code}' ya existe")
-
-    db_rule = ControlRule(**rule.model_dump())
-    db.add(db_rule)
-    db.commit()
-    db.refresh(db_rule)
-    return db_rule
+    return created
 
 
 @router.get("/controls", response_model=ControlRuleList)
@@ -54,8 +74,7 @@ def list_control_rules(
     if control_type:
         query = query.filter(ControlRule.control_type == control_type)
 
-    total = query.count()
-    rules = query.offset(skip).limit(limit).all()
+    rules, total = paginate_with_total(query.order_by(ControlRule.id), skip, limit)
 
     return ControlRuleList(total=total, rules=rules)
 
@@ -112,16 +131,10 @@ def create_alert_rule(rule: AlertRuleCreate, db: Session = Depends(get_db)):
     """
     Create a new alert rule.
     """
-    # Check if rule_code already exists
-    existing = db.query(AlertRule).filter(AlertRule.rule_code == rule.rule_code).first()
-    if existing:
+    created = _insert_unique(db, AlertRule, rule.model_dump(), "rule_code", AlertRuleResponse)
+    if created is None:
         raise HTTPException(status_code=400, detail=f"Regla con código '{rule.rule_code}' ya existe")
-
-    db_rule = AlertRule(**rule.model_dump())
-    db.add(db_rule)
-    db.commit()
-    db.refresh(db_rule)
-    return db_rule
+    return created
 
 
 @router.get("/alerts", response_model=AlertRuleList)
@@ -145,8 +158,7 @@ def list_alert_rules(
     if priority:
         query = query.filter(AlertRule.priority == priority)
 
-    total = query.count()
-    rules = query.offset(skip).limit(limit).all()
+    rules, total = paginate_with_total(query.order_by(AlertRule.id), skip, limit)
 
     return AlertRuleList(total=total, rules=rules)
 
@@ -203,16 +215,10 @@ def create_rias_guideline(guideline: RiasGuidelineCreate, db: Session = Depends(
     """
     Create a new RIAS guideline.
     """
-    # Check if guideline_code already exists
-    existing = db.query(RiasGuideline).filter(RiasGuideline.guideline_code == guideline.guideline_code).first()
-    if existing:
+    created = _insert_unique(db, RiasGuideline, guideline.model_dump(), "guideline_code", RiasGuidelineResponse)
+    if created is None:
         raise HTTPException(status_code=400, detail=f"Guía con código '{guideline.guideline_code}' ya existe")
-
-    db_guideline = RiasGuideline(**guideline.model_dump())
-    db.add(db_guideline)
-    db.commit()
-    db.refresh(db_guideline)
-    return db_guideline
+    return created
 
 
 @router.get("/rias", response_model=RiasGuidelineList)
@@ -233,8 +239,7 @@ def list_rias_guidelines(
     if life_stage:
         query = query.filter(RiasGuideline.life_stage == life_stage)
 
-    total = query.count()
-    guidelines = query.offset(skip).limit(limit).all()
+    guidelines, total = paginate_with_total(query.order_by(RiasGuideline.id), skip, limit)
 
     return RiasGuidelineList(total=total, guidelines=guidelines)
 
@@ -1,32 +1,38 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import Patient, Upload, Control, Alert, Exam, User
 from app.models.upload import UploadStatusEnum
 from app.models.control import ControlStatusEnum
 from app.models.alert import AlertStatusEnum
-from app.services import ExcelProcessor, PatientClassifier, AlertGenerator
+from app.services import ExcelProcessor, PatientClassifier, AlertGenerator, upload_queue
 from app.schemas import UploadResponse, UploadStats
-from app.dependencies.auth import require_permission, get_current_active_user
+from app.dependencies.auth import require_token_permission, get_current_active_user
 from datetime import datetime, date
 import os
+import shutil
+import traceback
 import uuid
 from typing import List, Dict
 
 router = APIRouter(
     prefix="/upload",
     tags=["upload"],
-    dependencies=[Depends(require_permission("upload.create"))]  # Requiere permiso upload.create
+    dependencies=[Depends(require_token_permission("upload.create"))]  # Requiere permiso upload.create
 )
 
 # Directory for storing uploaded files
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB per read when saving uploads
+UPLOAD_COMMIT_BATCH_SIZE = 1000  # Patients per transaction when processing uploads
+
 
 @router.post("/", response_model=UploadResponse)
 async def upload_file(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
@@ -46,36 +52,126 @@ async def upload_file(
     unique_filename = f"{uuid.uuid4()}.{file_extension}"
     file_path = os.path.join(UPLOAD_DIR, unique_filename)
 
-    # Save file
+    # Save file: copied in chunks from the spooled upload (never held whole
+    # in memory), in the threadpool so the blocking I/O stays off the event loop
     try:
         with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            await run_in_threadpool(shutil.copyfileobj, file.file, buffer, UPLOAD_CHUNK_SIZE)
+            file_size = buffer.tell()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al guardar archivo: {str(e)}")
 
-    # Create upload record
+    # Create upload record (sync session: run it off the event loop)
     upload = Upload(
         filename=unique_filename,
         original_filename=file.filename,
-        file_size=len(content),
+        file_size=file_size,
         file_path=file_path,
         status=UploadStatusEnum.PENDING
     )
-    db.add(upload)
-    db.commit()
-    db.refresh(upload)
+    await run_in_threadpool(_save_upload, db, upload)
 
-    # Process file in background
-    background_tasks.add_task(process_upload, upload.id, file_path, db)
+    # Process file in the upload worker processes
+    upload_queue.submit(process_upload, upload.id, file_path)
 
     return upload
 
 
-def process_upload(upload_id: int, file_path: str, db: Session):
+def _save_upload(db: Session, upload: Upload) -> None:
+    """Insert the upload record and load its generated fields."""
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+
+def process_upload(upload_id: int, file_path: str):
     """
     Background task to process uploaded file.
+
+    Runs in an upload worker process (see upload_queue), so it opens its
+    own session instead of using the request's.
     """
+    db = SessionLocal()
+    try:
+        _process_upload(upload_id, file_path, db)
+    finally:
+        db.close()
+
+
+def _save_processed_patients(db: Session, processed: Dict, today: date) -> None:
+    """Write a chunk of classified patients with their controls and alerts (no commit)."""
+    # Insert/update every patient in batched statements and get the new IDs
+    db.flush()
+    patient_ids = [patient.id for patient, *_ in processed.values()]
+
+    # Replace controls and alerts of the processed patients: one DELETE each
+    if patient_ids:
+        db.query(Control).filter(Control.patient_id.in_(patient_ids)).delete(synchronize_session=False)
+        db.query(Alert).filter(Alert.patient_id.in_(patient_ids)).delete(synchronize_session=False)
+
+    # Most recent exam date per (patient, exam type) for the whole chunk,
+    # in one grouped query (instead of loading each patient's exams)
+    last_exam_dates_by_patient = {}
+    if patient_ids:
+        exam_dates = db.query(
+            Exam.patient_id,
+            Exam.exam_type,
+            func.max(Exam.exam_date)
+        ).filter(
+            Exam.patient_id.in_(patient_ids)
+        ).group_by(Exam.patient_id, Exam.exam_type)
+
+        for patient_id, exam_type, last_date in exam_dates:
+            # e.g., "citologia", "mamografia"
+            last_exam_dates_by_patient.setdefault(patient_id, {})[exam_type.value] = last_date
+
+    control_rows = []
+    alert_rows = []
+
+    for patient, required_controls, has_cv_risk, cv_risk_level in processed.values():
+        for control_data in required_controls:
+            control_rows.append({
+                'patient_id': patient.id,
+                'status': ControlStatusEnum.PENDIENTE,
+                **control_data
+            })
+
+        # Patient's exam history to calculate due dates
+        last_exam_dates = last_exam_dates_by_patient.get(patient.id, {})
+
+        # Generate alerts with exam history context
+        alerts_data = AlertGenerator.generate_alerts(
+            age=patient.age,
+            sex=patient.sex,
+            is_pregnant=patient.is_pregnant,
+            is_hypertensive=patient.is_hypertensive,
+            is_diabetic=patient.is_diabetic,
+            has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
+            has_copd=getattr(patient, 'has_copd', False),
+            has_asthma=getattr(patient, 'has_asthma', False),
+            has_ckd=getattr(patient, 'has_ckd', False),
+            has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
+            has_cardiovascular_risk=has_cv_risk,
+            cardiovascular_risk_level=cv_risk_level,
+            last_exam_dates=last_exam_dates
+        )
+
+        for alert_data in alerts_data:
+            alert_rows.append({
+                'patient_id': patient.id,
+                'created_date': today,
+                'status': AlertStatusEnum.ACTIVA,
+                **alert_data
+            })
+
+    # Bulk INSERT (executemany, batched by insertmanyvalues)
+    if control_rows:
+        db.execute(insert(Control), control_rows)
+    if alert_rows:
+        db.execute(insert(Alert), alert_rows)
+
+
+def _process_upload(upload_id: int, file_path: str, db: Session):
     print(f"\n{'='*80}")
     print(f"🚀 INICIANDO PROCESAMIENTO DE UPLOAD ID: {upload_id}")
     print(f"{'='*80}")
@@ -120,154 +216,145 @@ def process_upload(upload_id: int, file_path: str, db: Session):
         created_count = 0
         duplicate_docs = []
 
+        # One timestamp for the whole upload instead of one call per row
+        now = datetime.now()
+        today = now.date()
+
+        # Row counts are saved before the patients, in their own transaction,
+        # so a failed chunk does not roll them back
+        db.commit()
+
         # Process each patient
+        total_patients = len(patients_data)
         print(f"\n{'='*80}")
-        print(f"👥 PROCESANDO {len(patients_data)} PACIENTES...")
+        print(f"👥 PROCESANDO {total_patients} PACIENTES...")
         print(f"{'='*80}")
 
-        for idx, patient_data in enumerate(patients_data, 1):
-            try:
-                if idx % 5 == 1 or idx == len(patients_data):
-                    print(f"  📌 Procesando paciente {idx}/{len(patients_data)}: {patient_data.get('document_number')} - {patient_data.get('full_name')}")
-
-                # Check if patient already exists by document number
-                existing_patient = db.query(Patient).filter(
-                    Patient.document_number == patient_data['document_number']
-                ).first()
-
-                if existing_patient:
-                    # Log duplicate for statistics
-                    duplicate_docs.append(patient_data['document_number'])
-
-                    # Update existing patient with new data
-                    for key, value in patient_data.items():
-                        # Only update if new value is not None/empty
-                        if value is not None and value != '':
-                            setattr(existing_patient, key, value)
-
-                    existing_patient.upload_id = upload_id
-                    existing_patient.updated_at = datetime.now()
-                    patient = existing_patient
-                    updated_count += 1
-                else:
-                    # Create new patient
-                    patient = Patient(**patient_data, upload_id=upload_id)
-                    db.add(patient)
-                    created_count += 1
-
-                db.flush()  # Get patient ID
-
-                # Classify patient by age group
-                age_group = PatientClassifier.classify_age_group(patient.age)
-                patient.age_group = age_group
-
-                # Calculate cardiovascular risk (advanced algorithms)
-                has_cv_risk, cv_risk_level, cv_detailed = PatientClassifier.calculate_cardiovascular_risk(
-                    age=patient.age,
-                    sex=patient.sex,
-                    is_hypertensive=patient.is_hypertensive,
-                    is_diabetic=patient.is_diabetic,
-                    is_smoker=getattr(patient, 'is_smoker', False),
-                    systolic_bp=getattr(patient, 'last_systolic_bp', None),
-                    diastolic_bp=getattr(patient, 'last_diastolic_bp', None),
-                    cholesterol_total=getattr(patient, 'last_cholesterol', None),
-                    hdl=getattr(patient, 'last_hdl', None),
-                    ldl=getattr(patient, 'last_ldl', None),
-                    glucose=getattr(patient, 'last_glucose', None)
-                )
-                patient.has_cardiovascular_risk = has_cv_risk
-                patient.cardiovascular_risk_level = cv_risk_level
-                # cv_detailed contains Framingham/ASCVD/Ausangate results if calculated
-
-                # Classify patient by attention type (Grupo A/B/C)
-                attention_type_str = PatientClassifier.classify_attention_type(
-                    is_hypertensive=patient.is_hypertensive,
-                    is_diabetic=patient.is_diabetic,
-                    has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
-                    has_copd=getattr(patient, 'has_copd', False),
-                    has_asthma=getattr(patient, 'has_asthma', False),
-                    has_ckd=getattr(patient, 'has_ckd', False),
-                    has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
-                    has_cardiovascular_risk=has_cv_risk
-                )
-                # Assign the string value directly (SQLAlchemy will handle enum conversion)
-                patient.attention_type = attention_type_str
-
-                # Generate controls
-                required_controls = PatientClassifier.determine_required_controls(
-                    age=patient.age,
-                    sex=patient.sex,
-                    is_pregnant=patient.is_pregnant,
-                    is_hypertensive=patient.is_hypertensive,
-                    is_diabetic=patient.is_diabetic,
-                    has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
-                    has_copd=getattr(patient, 'has_copd', False),
-                    has_asthma=getattr(patient, 'has_asthma', False),
-                    has_ckd=getattr(patient, 'has_ckd', False),
-                    has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
-                    has_cardiovascular_risk=has_cv_risk,
-                    last_control_date=patient.last_control_date
-                )
-
-                # Delete existing controls for this patient (to avoid duplicates)
-                db.query(Control).filter(Control.patient_id == patient.id).delete()
-
-                # Create control records
-                for control_data in required_controls:
-                    control = Control(
-                        patient_id=patient.id,
-                        status=ControlStatusEnum.PENDIENTE,
-                        **control_data
+        # Patients are saved and committed in chunks: the session and the
+        # transaction only hold one chunk at a time
+        for chunk_start in range(0, total_patients, UPLOAD_COMMIT_BATCH_SIZE):
+            chunk = patients_data[chunk_start:chunk_start + UPLOAD_COMMIT_BATCH_SIZE]
+
+            # Existing patients for every document in the chunk, in one query
+            # (instead of one SELECT per row)
+            document_numbers = list({p['document_number'] for p in chunk})
+            patients_by_document = {
+                patient.document_number: patient
+                for patient in db.query(Patient).filter(Patient.document_number.in_(document_numbers))
+            }
+
+            # Classified patients, keyed by document (a repeated document keeps its last row)
+            processed = {}
+            chunk_success = 0
+            chunk_created = 0
+            chunk_updated = 0
+
+            for idx, patient_data in enumerate(chunk, chunk_start + 1):
+                try:
+                    if idx % 5 == 1 or idx == total_patients:
+                        print(f"  📌 Procesando paciente {idx}/{total_patients}: {patient_data.get('document_number')} - {patient_data.get('full_name')}")
+
+                    # Check if patient already exists by document number
+                    existing_patient = patients_by_document.get(patient_data['document_number'])
+
+                    if existing_patient:
+                        # Log duplicate for statistics
+                        duplicate_docs.append(patient_data['document_number'])
+
+                        # Update existing patient with new data
+                        for key, value in patient_data.items():
+                            # Only update if new value is not None/empty
+                            if value is not None and value != '':
+                                setattr(existing_patient, key, value)
+
+                        existing_patient.upload_id = upload_id
+                        existing_patient.updated_at = now
+                        patient = existing_patient
+                        chunk_updated += 1
+                    else:
+                        # Create new patient (inserted with the rest of the chunk on flush)
+                        patient = Patient(**patient_data, upload_id=upload_id)
+                        db.add(patient)
+                        patients_by_document[patient.document_number] = patient
+                        chunk_created += 1
+
+                    # Classify patient by age group
+                    age_group = PatientClassifier.classify_age_group(patient.age)
+                    patient.age_group = age_group
+
+                    # Calculate cardiovascular risk (advanced algorithms)
+                    has_cv_risk, cv_risk_level, cv_detailed = PatientClassifier.calculate_cardiovascular_risk(
+                        age=patient.age,
+                        sex=patient.sex,
+                        is_hypertensive=patient.is_hypertensive,
+                        is_diabetic=patient.is_diabetic,
+                        is_smoker=getattr(patient, 'is_smoker', False),
+                        systolic_bp=getattr(patient, 'last_systolic_bp', None),
+                        diastolic_bp=getattr(patient, 'last_diastolic_bp', None),
+                        cholesterol_total=getattr(patient, 'last_cholesterol', None),
+                        hdl=getattr(patient, 'last_hdl', None),
+                        ldl=getattr(patient, 'last_ldl', None),
+                        glucose=getattr(patient, 'last_glucose', None)
                     )
-                    db.add(control)
-
-                # Get patient's exam history to calculate due dates
-                last_exam_dates = {}
-                patient_exams = db.query(Exam).filter(Exam.patient_id == patient.id).all()
-                for exam in patient_exams:
-                    exam_type_key = exam.exam_type.value  # e.g., "citologia", "mamografia"
-                    # Keep only the most recent exam date for each type
-                    if exam_type_key not in last_exam_dates or exam.exam_date > last_exam_dates[exam_type_key]:
-                        last_exam_dates[exam_type_key] = exam.exam_date
-
-                # Generate alerts with exam history context
-                alerts_data = AlertGenerator.generate_alerts(
-                    age=patient.age,
-                    sex=patient.sex,
-                    is_pregnant=patient.is_pregnant,
-                    is_hypertensive=patient.is_hypertensive,
-                    is_diabetic=patient.is_diabetic,
-                    has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
-                    has_copd=getattr(patient, 'has_copd', False),
-                    has_asthma=getattr(patient, 'has_asthma', False),
-                    has_ckd=getattr(patient, 'has_ckd', False),
-                    has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
-                    has_cardiovascular_risk=has_cv_risk,
-                    cardiovascular_risk_level=cv_risk_level,
-                    last_exam_dates=last_exam_dates
-                )
-
-                # Delete existing alerts for this patient
-                db.query(Alert).filter(Alert.patient_id == patient.id).delete()
-
-                # Create alert records
-                for alert_data in alerts_data:
-                    alert = Alert(
-                        patient_id=patient.id,
-                        created_date=date.today(),
-                        status=AlertStatusEnum.ACTIVA,
-                        **alert_data
+                    patient.has_cardiovascular_risk = has_cv_risk
+                    patient.cardiovascular_risk_level = cv_risk_level
+                    # cv_detailed contains Framingham/ASCVD/Ausangate results if calculated
+
+                    # Classify patient by attention type (Grupo A/B/C)
+                    attention_type_str = PatientClassifier.classify_attention_type(
+                        is_hypertensive=patient.is_hypertensive,
+                        is_diabetic=patient.is_diabetic,
+                        has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
+                        has_copd=getattr(patient, 'has_copd', False),
+                        has_asthma=getattr(patient, 'has_asthma', False),
+                        has_ckd=getattr(patient, 'has_ckd', False),
+                        has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
+                        has_cardiovascular_risk=has_cv_risk
                     )
-                    db.add(alert)
+                    # Assign the string value directly (SQLAlchemy will handle enum conversion)
+                    patient.attention_type = attention_type_str
+
+                    # Generate controls
+                    required_controls = PatientClassifier.determine_required_controls(
+                        age=patient.age,
+                        sex=patient.sex,
+                        is_pregnant=patient.is_pregnant,
+                        is_hypertensive=patient.is_hypertensive,
+                        is_diabetic=patient.is_diabetic,
+                        has_hypothyroidism=getattr(patient, 'has_hypothyroidism', False),
+                        has_copd=getattr(patient, 'has_copd', False),
+                        has_asthma=getattr(patient, 'has_asthma', False),
+                        has_ckd=getattr(patient, 'has_ckd', False),
+                        has_cardiovascular_disease=getattr(patient, 'has_cardiovascular_disease', False),
+                        has_cardiovascular_risk=has_cv_risk,
+                        last_control_date=patient.last_control_date
+                    )
+
+                    processed[patient.document_number] = (patient, required_controls, has_cv_risk, cv_risk_level)
+                    chunk_success += 1
 
-                success_count += 1
+                except Exception as e:
+                    error_count += 1
+                    print(f"  ❌ ERROR procesando paciente {patient_data.get('document_number')}: {str(e)}")
+                    traceback.print_exc()
+                    continue
 
+            try:
+                _save_processed_patients(db, processed, today)
+                db.commit()
             except Exception as e:
-                error_count += 1
-                print(f"  ❌ ERROR procesando paciente {patient_data.get('document_number')}: {str(e)}")
-                import traceback
+                # The whole chunk is lost: count its rows as errors and go on
+                db.rollback()
+                error_count += chunk_success
+                print(f"  ❌ ERROR guardando pacientes {chunk_start + 1}-{chunk_start + len(chunk)}: {str(e)}")
                 traceback.print_exc()
-                continue
+            else:
+                success_count += chunk_success
+                created_count += chunk_created
+                updated_count += chunk_updated
+
+            # Drop the committed chunk from the session before the next one
+            db.expire_all()
 
         # Update upload record with detailed statistics
         print(f"\n{'='*80}")
@@ -308,10 +395,11 @@ def process_upload(upload_id: int, file_path: str, db: Session):
         print(f"❌ ❌ ❌ ERROR CRÍTICO EN UPLOAD {upload_id}")
         print(f"{'='*80}")
         print(f"Error: {str(e)}")
-        import traceback
         traceback.print_exc()
         print(f"{'='*80}\n")
 
+        # Discard whatever was pending and record the failure on its own
+        db.rollback()
         upload.status = UploadStatusEnum.FAILED
         upload.error_message = str(e)
         db.commit()
@@ -337,10 +425,26 @@ def get_upload_stats(upload_id: int, db: Session = Depends(get_db)):
     if not upload:
         raise HTTPException(status_code=404, detail="Upload no encontrado")
 
-    # Get patients from this upload
-    patients = db.query(Patient).filter(Patient.upload_id == upload_id).all()
+    # One round-trip for every patient aggregate: GROUPING SETS returns the
+    # per-age-group and per-sex counts, and the risk counts come along as
+    # conditional aggregates (FILTER).
+    # GROUPING() tells which set each row belongs to: (age_group) -> 0b01, (sex) -> 0b10
+    grouped = db.execute(
+        select(
+            Patient.age_group,
+            Patient.sex,
+            func.grouping(Patient.age_group, Patient.sex).label("grouping_id"),
+            func.count().label("count"),
+            func.count().filter(Patient.is_hypertensive == True).label("hypertensive"),
+            func.count().filter(Patient.is_diabetic == True).label("diabetic"),
+            func.count().filter(Patient.is_pregnant == True).label("pregnant"),
+            func.count().filter(Patient.has_cardiovascular_risk == True).label("cardiovascular")
+        )
+        .where(Patient.upload_id == upload_id)
+        .group_by(func.grouping_sets(Patient.age_group, Patient.sex))
+    ).all()
 
-    # Calculate stats
+    total_patients = 0
     patients_by_age_group = {}
     patients_by_sex = {}
     patients_with_risks = {
@@ -350,28 +454,32 @@ def get_upload_stats(upload_id: int, db: Session = Depends(get_db)):
         'cardiovascular': 0
     }
 
-    for patient in patients:
-        # Age group
-        if patient.age_group:
-            patients_by_age_group[patient.age_group] = patients_by_age_group.get(patient.age_group, 0) + 1
-
-        # Sex
-        if patient.sex:
-            patients_by_sex[patient.sex] = patients_by_sex.get(patient.sex, 0) + 1
-
-        # Risks
-        if patient.is_hypertensive:
-            patients_with_risks['hypertensive'] += 1
-        if patient.is_diabetic:
-            patients_with_risks['diabetic'] += 1
-        if patient.is_pregnant:
-            patients_with_risks['pregnant'] += 1
-        if patient.has_cardiovascular_risk:
-            patients_with_risks['cardiovascular'] += 1
-
-    # Count controls and alerts
-    controls_count = db.query(Control).join(Patient).filter(Patient.upload_id == upload_id).count()
-    alerts_count = db.query(Alert).join(Patient).filter(Patient.upload_id == upload_id).count()
+    for row in grouped:
+        if row.grouping_id == 0b01:
+            if row.age_group is not None:
+                patients_by_age_group[row.age_group.value] = row.count
+            # Every patient falls in exactly one age group row
+            total_patients += row.count
+            for risk in patients_with_risks:
+                patients_with_risks[risk] += getattr(row, risk)
+        elif row.sex is not None:
+            patients_by_sex[row.sex.value] = row.count
+
+    # Count controls and alerts (both in one statement)
+    generated = db.execute(
+        select(
+            select(func.count(Control.id))
+            .join(Patient, Control.patient_id == Patient.id)
+            .where(Patient.upload_id == upload_id)
+            .scalar_subquery()
+            .label("controls"),
+            select(func.count(Alert.id))
+            .join(Patient, Alert.patient_id == Patient.id)
+            .where(Patient.upload_id == upload_id)
+            .scalar_subquery()
+            .label("alerts")
+        )
+    ).one()
 
     # Processing time
     processing_time = 0
@@ -380,11 +488,11 @@ def get_upload_stats(upload_id: int, db: Session = Depends(get_db)):
 
     return UploadStats(
         upload_id=upload_id,
-        total_patients=len(patients),
+        total_patients=total_patients,
         patients_by_age_group=patients_by_age_group,
         patients_by_sex=patients_by_sex,
         patients_with_risks=patients_with_risks,
-        controls_generated=controls_count,
-        alerts_generated=alerts_count,
+        controls_generated=generated.controls,
+        alerts_generated=generated.alerts,
         processing_time_seconds=processing_time
     )
@@ -16,6 +16,7 @@ Endpoints:
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import datetime
 
 from app.database import get_db
 from app.dependencies.auth import require_admin, get_current_active_user
@@ -30,6 +31,8 @@ from app.schemas.user import (
     UserListResponse
 )
 from app.core.security import get_password_hash
+from app.services import auth_service
+from app.utils import paginate_with_total
 
 
 # ============================================================================
@@ -57,7 +60,7 @@ router = APIRouter(
     summary="Listar usuarios",
     description="Obtiene lista paginada de usuarios del sistema. Solo Admin."
 )
-async def list_users(
+def list_users(
     offset: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(50, ge=1, le=100, description="Número de registros a retornar"),
     search: Optional[str] = Query(None, description="Buscar por username, email o nombre"),
@@ -86,11 +89,9 @@ async def list_users(
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
 
-    # Total count
-    total = query.count()
-
-    # Paginación
-    users = query.offset(offset).limit(limit).all()
+    # Paginación (orden estable); el total viene en la misma consulta
+    # con count(*) OVER()
+    users, total = paginate_with_total(query.order_by(User.id), offset, limit)
 
     # Convertir a respuesta
     items = []
@@ -129,7 +130,7 @@ async def list_users(
     summary="Crear usuario",
     description="Crea un nuevo usuario en el sistema. Solo Admin."
 )
-async def create_user(
+def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -219,12 +220,12 @@ async def create_user(
     summary="Obtener usuario",
     description="Obtiene información detallada de un usuario. Solo Admin."
 )
-async def get_user(
+def get_user(
     user_id: int,
     db: Session = Depends(get_db)
 ):
     """Obtiene un usuario por ID."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -261,14 +262,14 @@ async def get_user(
     summary="Actualizar usuario",
     description="Actualiza información de un usuario. Solo Admin."
 )
-async def update_user(
+def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Actualiza un usuario."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -306,12 +307,12 @@ async def update_user(
             )
         user.roles = roles
 
-    from datetime import datetime
     user.updated_at = datetime.now()
     user.updated_by_id = current_user.id
 
     db.commit()
     db.refresh(user)
+    auth_service.invalidate_user_info(user.id)
 
     # Audit log
     AuditLog.log_action(
@@ -355,13 +356,13 @@ async def update_user(
     summary="Eliminar usuario",
     description="Elimina un usuario del sistema. Solo Admin."
 )
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Elimina un usuario."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -400,6 +401,7 @@ async def delete_user(
 
     db.delete(user)
     db.commit()
+    auth_service.invalidate_user_info(user_id)
 
     return {
         "message": f"Usuario {username} eliminado exitosamente",
@@ -417,14 +419,14 @@ async def delete_user(
     summary="Resetear contraseña",
     description="Resetea la contraseña de un usuario. Solo Admin."
 )
-async def reset_user_password(
+def reset_user_password(
     user_id: int,
     new_password: str = Query(..., min_length=8, description="Nueva contraseña"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Resetea la contraseña de un usuario."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -433,14 +435,15 @@ async def reset_user_password(
         )
 
     # Actualizar contraseña
-    from datetime import datetime
     user.hashed_password = get_password_hash(new_password)
     user.password_changed_at = datetime.now()
     user.refresh_token = None  # Invalidar refresh token
     user.failed_login_attempts = 0  # Resetear intentos fallidos
     user.locked_until = None  # Desbloquear cuenta
+    user.token_version += 1  # Invalidar todos los tokens emitidos
 
     db.commit()
+    auth_service.invalidate_user_info(user.id)
 
     # Audit log
     AuditLog.log_action(
@@ -471,14 +474,14 @@ async def reset_user_password(
     summary="Activar/Desactivar usuario",
     description="Activa o desactiva un usuario. Solo Admin."
 )
-async def toggle_user_activation(
+def toggle_user_activation(
     user_id: int,
     activate: bool = Query(..., description="True para activar, False para desactivar"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Activa o desactiva un usuario."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -495,12 +498,12 @@ async def toggle_user_activation(
 
     user.is_active = activate
 
-    from datetime import datetime
     user.updated_at = datetime.now()
     user.updated_by_id = current_user.id
 
     db.commit()
     db.refresh(user)
+    auth_service.invalidate_user_info(user.id)
 
     # Audit log
     AuditLog.log_action(
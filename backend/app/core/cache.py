@@ -0,0 +1,132 @@
+"""
+Cache Utilities - Caché de respuestas con TTL
+
+Guarda respuestas serializables a JSON con tiempo de expiración.
+Usa Redis si REDIS_URL está configurado; si no está configurado, o si Redis
+no responde, usa un diccionario en memoria del proceso.
+
+Las claves se organizan por namespace ("alerts:stats", "audit:stats:7")
+para poder invalidar grupos completos con cache_invalidate("alerts").
+"""
+import json
+import threading
+import time
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # Redis es opcional: sin el paquete se usa la caché local
+    redis = None
+
+# Excepción a capturar alrededor de llamadas a Redis
+RedisError = redis.RedisError if redis is not None else ConnectionError
+
+
+_redis_client = None
+_local_cache: dict = {}
+_local_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Obtiene el cliente Redis compartido (creado en el primer uso).
+
+    Returns:
+        Cliente Redis, o None si no hay REDIS_URL o el paquete no está instalado
+    """
+    global _redis_client
+
+    if _redis_client is None and settings.REDIS_URL and redis is not None:
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+            decode_responses=True
+        )
+    return _redis_client
+
+
+def _full_key(key: str) -> str:
+    return f"{settings.CACHE_PREFIX}:{key}"
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """
+    Obtiene un valor de la caché.
+
+    Args:
+        key: Clave (ej: "audit:stats:7")
+
+    Returns:
+        Valor almacenado, o None si no existe o expiró
+    """
+    full_key = _full_key(key)
+
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = client.get(full_key)
+            return json.loads(raw) if raw is not None else None
+        except RedisError:
+            pass
+
+    with _local_lock:
+        entry = _local_cache.get(full_key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _local_cache[full_key]
+            return None
+        return value
+
+
+def cache_set(key: str, value: Any, ttl: int) -> None:
+    """
+    Guarda un valor en la caché.
+
+    Args:
+        key: Clave (ej: "audit:stats:7")
+        value: Valor serializable (dict, list, modelos Pydantic, fechas...)
+        ttl: Segundos de vida del valor
+    """
+    full_key = _full_key(key)
+    value = jsonable_encoder(value)
+
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(full_key, json.dumps(value), ex=ttl)
+            return
+        except RedisError:
+            pass
+
+    with _local_lock:
+        _local_cache[full_key] = (time.monotonic() + ttl, value)
+
+
+def cache_invalidate(namespace: str) -> None:
+    """
+    Elimina todas las claves de un namespace.
+
+    Args:
+        namespace: Prefijo de las claves a eliminar (ej: "alerts")
+    """
+    prefix = _full_key(namespace)
+
+    client = get_redis()
+    if client is not None:
+        try:
+            keys = list(client.scan_iter(match=f"{prefix}*"))
+            if keys:
+                client.delete(*keys)
+        except RedisError:
+            pass
+
+    with _local_lock:
+        for key in [k for k in _local_cache if k.startswith(prefix)]:
+            del _local_cache[key]
@@ -8,13 +8,15 @@ Sistema completo de manejo de JWT tokens para autenticación:
 - Validación y decodificación de tokens
 """
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import time
 import uuid
 
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.core.cache import get_redis, RedisError
 from app.models.token_blacklist import TokenBlacklist
 from app.schemas.auth import TokenPayload
 
@@ -29,6 +31,7 @@ def create_access_token(
     email: str,
     roles: list,
     permissions: list,
+    token_version: int = 0,
     expires_delta: Optional[timedelta] = None
 ) -> str:
     """
@@ -40,6 +43,7 @@ def create_access_token(
         email: Email del usuario
         roles: Lista de roles del usuario
         permissions: Lista de permisos del usuario
+        token_version: Versión de tokens del usuario (User.token_version)
         expires_delta: Tiempo de expiración personalizado (opcional)
 
     Returns:
@@ -74,6 +78,7 @@ def create_access_token(
         "email": email,
         "roles": roles,
         "permissions": permissions,
+        "ver": token_version,  # Token version - revoked when the user's version changes
         "exp": int(expire.timestamp()),  # Expiration time (Unix timestamp)
         "iat": int(datetime.utcnow().timestamp()),  # Issued at (Unix timestamp)
         "jti": str(uuid.uuid4()),  # JWT ID - unique identifier
@@ -94,6 +99,7 @@ def create_refresh_token(
     user_id: int,
     username: str,
     email: str,
+    token_version: int = 0,
     expires_delta: Optional[timedelta] = None
 ) -> str:
     """
@@ -103,6 +109,7 @@ def create_refresh_token(
         user_id: ID del usuario
         username: Username del usuario
         email: Email del usuario
+        token_version: Versión de tokens del usuario (User.token_version)
         expires_delta: Tiempo de expiración personalizado (opcional)
 
     Returns:
@@ -133,6 +140,7 @@ def create_refresh_token(
         "sub": str(user_id),  # Subject - User ID (must be string for JWT spec)
         "username": username,
         "email": email,
+        "ver": token_version,
         "exp": int(expire.timestamp()),  # Expiration time (Unix timestamp)
         "iat": int(datetime.utcnow().timestamp()),  # Issued at (Unix timestamp)
         "jti": str(uuid.uuid4()),
@@ -210,10 +218,53 @@ def verify_token_type(payload: Dict[str, Any], expected_type: str) -> bool:
     return payload.get("type") == expected_type
 
 
+def verify_token_version(payload: Dict[str, Any], token_version: int) -> bool:
+    """
+    Verifica que el token pertenezca a la versión vigente del usuario.
+
+    Args:
+        payload: Payload decodificado del token
+        token_version: Versión actual del usuario (User.token_version)
+
+    Returns:
+        True si la versión coincide, False si el token fue revocado
+
+    Notes:
+        - Tokens emitidos antes de existir el claim "ver" se tratan como versión 0
+    """
+    return payload.get("ver", 0) == token_version
+
+
 # ============================================================================
 # TOKEN BLACKLIST
 # ============================================================================
 
+def _revoked_key(jti: str) -> str:
+    return f"{settings.CACHE_PREFIX}:auth:revoked:{jti}"
+
+
+def _blacklist_loaded_key() -> str:
+    # Marca de que Redis tiene toda la blacklist vigente (la pone
+    # load_blacklist_into_redis; desaparece con un flush o reinicio de Redis)
+    return f"{settings.CACHE_PREFIX}:auth:revoked-loaded"
+
+
+def _check_revoked_in_redis(client, jti: str) -> Tuple[bool, bool]:
+    """Retorna (blacklist cargada, jti revocado) en un solo viaje a Redis."""
+    pipe = client.pipeline(transaction=False)
+    pipe.exists(_blacklist_loaded_key())
+    pipe.exists(_revoked_key(jti))
+    loaded, revoked = pipe.execute()
+    return bool(loaded), bool(revoked)
+
+
+def _revoke_in_redis(client, jti: str, expires_at: datetime) -> None:
+    """Marca el JTI como revocado en Redis hasta que el token expire."""
+    ttl = int(expires_at.timestamp() - time.time())
+    if ttl > 0:
+        client.set(_revoked_key(jti), "1", ex=ttl)
+
+
 def is_token_blacklisted(db: Session, jti: str) -> bool:
     """
     Verifica si un token está en la blacklist.
@@ -233,8 +284,24 @@ def is_token_blacklisted(db: Session, jti: str) -> bool:
 
     Notes:
         - Solo verifica tokens no expirados
-        - Limpia automáticamente tokens expirados antes de verificar
+        - Con Redis configurado y la blacklist cargada (marca auth:revoked-loaded),
+          Redis es la fuente de verdad: la clave auth:revoked:{jti} decide y no
+          se consulta la DB
+        - Si falta la marca (flush o reinicio de Redis) se recarga la blacklist
+          una vez; la tabla se consulta solo si Redis no responde
     """
+    client = get_redis()
+    if client is not None:
+        try:
+            loaded, revoked = _check_revoked_in_redis(client, jti)
+            if not loaded:
+                load_blacklist_into_redis(db)
+                loaded, revoked = _check_revoked_in_redis(client, jti)
+            if loaded:
+                return revoked
+        except RedisError:
+            pass
+
     return TokenBlacklist.is_blacklisted(db, jti)
 
 
@@ -300,9 +367,56 @@ def blacklist_token(
     db.commit()
     db.refresh(blacklist_entry)
 
+    client = get_redis()
+    if client is not None:
+        try:
+            _revoke_in_redis(client, jti, expires_at)
+        except RedisError:
+            # Redis ya no tiene la blacklist completa: sin la marca, las
+            # verificaciones vuelven a la tabla hasta la próxima recarga
+            try:
+                client.delete(_blacklist_loaded_key())
+            except RedisError:
+                pass
+
     return blacklist_entry
 
 
+def load_blacklist_into_redis(db: Session) -> int:
+    """
+    Copia a Redis los tokens blacklisted que aún no expiran.
+
+    Se ejecuta al iniciar la aplicación (y si falta la marca de carga) para
+    que Redis tenga todas las revocaciones aunque se haya reiniciado sin
+    persistencia. Al terminar pone la marca auth:revoked-loaded, en la misma
+    transacción que las claves.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Número de tokens cargados (0 si Redis no está configurado)
+    """
+    client = get_redis()
+    if client is None:
+        return 0
+
+    entries = db.query(TokenBlacklist.jti, TokenBlacklist.expires_at).filter(
+        TokenBlacklist.expires_at > datetime.now()
+    ).all()
+
+    try:
+        pipe = client.pipeline(transaction=True)
+        for jti, expires_at in entries:
+            _revoke_in_redis(pipe, jti, expires_at)
+        pipe.set(_blacklist_loaded_key(), "1")
+        pipe.execute()
+    except RedisError:
+        return 0
+
+    return len(entries)
+
+
 def blacklist_all_user_tokens(
     db: Session,
     user_id: int,
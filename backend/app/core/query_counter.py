@@ -0,0 +1,81 @@
+"""
+Query Counter - Conteo de consultas SQL
+
+Cuenta las sentencias que ejecuta la base de datos para detectar regresiones
+N+1 (una consulta por fila) en los endpoints. Presupuesto esperado para los
+endpoints de catálogos: búsqueda = 1, estadísticas <= 2, listado = 1.
+
+Uso en scripts o pruebas (cuenta todo lo que ejecute el engine en el bloque):
+
+    with count_queries() as counter:
+        client.get("/api/catalogs/cie10/search?q=diabetes")
+    assert counter.count <= 1
+
+Por request: con QUERY_COUNT_HEADER=True cada respuesta incluye el header
+X-Query-Count con las consultas que ejecutó ese request. El listener se
+registra solo en ese caso (enable_request_counting): con el flag apagado las
+consultas no pagan ningún evento.
+
+Los presupuestos de los endpoints se verifican en tests/test_query_budgets.py.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database import engine
+
+
+class QueryCounter:
+    """Acumulador de sentencias ejecutadas."""
+
+    def __init__(self):
+        self.count = 0
+
+    def increment(self, *args) -> None:
+        self.count += 1
+
+
+@contextmanager
+def count_queries(bind: Engine = engine) -> Iterator[QueryCounter]:
+    """
+    Cuenta las consultas ejecutadas por el engine mientras dura el bloque.
+
+    Args:
+        bind: Engine a observar (por defecto el de la aplicación)
+
+    Returns:
+        QueryCounter con el total en .count
+    """
+    counter = QueryCounter()
+    event.listen(bind, "before_cursor_execute", counter.increment)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", counter.increment)
+
+
+# Contador del request en curso. Los endpoints síncronos corren en hilos de
+# AnyIO, que copian el contexto del request y comparten el mismo objeto.
+_request_counter: ContextVar[Optional[QueryCounter]] = ContextVar("request_query_counter", default=None)
+
+
+def _count_request_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_counter.get()
+    if counter is not None:
+        counter.increment()
+
+
+def enable_request_counting(bind: Engine = engine) -> None:
+    """Registra el conteo por request en el engine (idempotente)."""
+    if not event.contains(bind, "before_cursor_execute", _count_request_query):
+        event.listen(bind, "before_cursor_execute", _count_request_query)
+
+
+def start_request_count() -> QueryCounter:
+    """Empieza a contar las consultas del request actual."""
+    counter = QueryCounter()
+    _request_counter.set(counter)
+    return counter
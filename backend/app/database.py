@@ -1,15 +1,35 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.config import settings
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+if settings.DB_USE_PGBOUNCER:
+    # PgBouncer already multiplexes server connections; a local pool on top
+    # would only hold idle client connections open
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE
+    )
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        # Discard dead connections before handing them out; can be turned off
+        # when pool_recycle already retires connections before the server does
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        # Compiled SQL is reused across requests; sized to hold every statement
+        # shape the routes generate (one per filter combination)
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -17,6 +37,12 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for models
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+# Set by init_db: whether pg_trgm (similarity(), trigram indexes) is installed.
+# Read it as database.pg_trgm_available (it is rebound at startup)
+pg_trgm_available = False
+
 
 def get_db():
     """Dependency for getting database session"""
@@ -27,6 +53,24 @@ def get_db():
         db.close()
 
 
+def _ensure_pg_trgm() -> bool:
+    """Create pg_trgm if the role is allowed to, and report whether it exists"""
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.commit()
+        except DBAPIError as e:
+            conn.rollback()
+            logger.warning("Could not create extension pg_trgm: %s", e)
+
+        return bool(conn.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        ).scalar())
+
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and the pg_trgm extension"""
+    global pg_trgm_available
+
     Base.metadata.create_all(bind=engine)
+    pg_trgm_available = _ensure_pg_trgm()
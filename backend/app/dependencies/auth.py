@@ -6,8 +6,10 @@ Dependencias para autenticación y autorización:
 - get_current_active_user: Obtiene usuario activo
 - require_role: Verifica rol específico
 - require_permission: Verifica permiso específico
+- get_token_claims / require_token_role / require_token_permission:
+  validan con los claims del token y el estado cacheado del usuario
 """
-from typing import Optional, List
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from fastapi import Depends, HTTPException, status
@@ -15,7 +17,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.core.jwt import decode_token, is_token_blacklisted, verify_token_type
+from app.core.cache import cache_get, cache_set
+from app.core.jwt import decode_token, is_token_blacklisted, verify_token_type, verify_token_version
 from app.models.user import User
 from app.models.role import Role
 
@@ -35,35 +38,18 @@ security = HTTPBearer(
 # CORE DEPENDENCIES
 # ============================================================================
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Obtiene el usuario actual desde el JWT token.
+USER_STATE_CACHE_TTL = 60  # segundos
 
-    Args:
-        credentials: Credenciales HTTP Bearer (token JWT)
-        db: Sesión de base de datos
+
+def _decode_access_token(token: str, db: Session) -> Tuple[Dict[str, Any], int]:
+    """
+    Decodifica y valida un access token (firma, expiración, tipo y blacklist).
 
     Returns:
-        Usuario autenticado
+        Tupla (payload, user_id)
 
     Raises:
-        HTTPException 401: Si el token es inválido, expiró o está blacklisted
-        HTTPException 404: Si el usuario no existe
-
-    Examples:
-        @app.get("/me")
-        async def get_me(current_user: User = Depends(get_current_user)):
-            return current_user.to_dict()
-
-    Notes:
-        - Verifica firma del token
-        - Verifica expiración
-        - Verifica que sea access token (no refresh)
-        - Verifica blacklist
-        - Actualiza last_login del usuario
+        HTTPException 401: Si el token es inválido, no es de acceso o está blacklisted
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,9 +57,6 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Extraer token
-    token = credentials.credentials
-
     # Decodificar token
     payload = decode_token(token)
     if payload is None:
@@ -87,7 +70,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Verificar blacklist
+    # Verificar blacklist (con Redis cargado se resuelve en Redis, sin la DB)
     jti = payload.get("jti")
     if jti and is_token_blacklisted(db, jti):
         raise HTTPException(
@@ -106,14 +89,62 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
 
-    # Buscar usuario en DB
-    user = db.query(User).filter(User.id == user_id).first()
+    return payload, user_id
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Obtiene el usuario actual desde el JWT token.
+
+    Args:
+        credentials: Credenciales HTTP Bearer (token JWT)
+        db: Sesión de base de datos
+
+    Returns:
+        Usuario autenticado
+
+    Raises:
+        HTTPException 401: Si el token es inválido, expiró o está blacklisted
+        HTTPException 404: Si el usuario no existe
+
+    Examples:
+        @app.get("/me")
+        async def get_me(current_user: User = Depends(get_current_user)):
+            return current_user.to_dict()
+
+    Notes:
+        - Verifica firma del token
+        - Verifica expiración
+        - Verifica que sea access token (no refresh)
+        - Verifica blacklist
+        - Verifica la versión de tokens del usuario (claim "ver")
+        - Actualiza last_login del usuario
+        - Es síncrona a propósito: consulta la DB con la sesión bloqueante,
+          así FastAPI la ejecuta en el threadpool sin detener el event loop
+    """
+    payload, user_id = _decode_access_token(credentials.credentials, db)
+
+    # Buscar usuario en DB (roles vienen en el mismo SELECT: User.roles es lazy='joined').
+    # db.get deja el usuario en el identity map: las búsquedas del mismo id
+    # durante el request (ej: logout) no vuelven a consultar la DB.
+    user = db.get(User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
 
+    # Verificar versión de tokens (cambio de contraseña = logout global)
+    if not verify_token_version(payload, user.token_version):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token invalidado (sesión cerrada)",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     # Actualizar last_login (opcional, solo en login exitoso)
     # user.last_login = datetime.now()
     # db.commit()
@@ -121,7 +152,7 @@ async def get_current_user(
     return user
 
 
-async def get_current_active_user(
+def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """
@@ -163,6 +194,105 @@ async def get_current_active_user(
     return current_user
 
 
+def _get_user_auth_state(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Obtiene (cacheado) el estado del usuario que invalida tokens vigentes.
+
+    Returns:
+        Dict con token_version, is_active, locked_until, roles y permissions;
+        None si no existe
+
+    Notes:
+        - Roles y permisos se leen de la DB (no del token), así revocar un rol
+          o un permiso aplica en máximo USER_STATE_CACHE_TTL segundos
+        - Se invalida con auth_service.invalidate_user_info
+    """
+    cache_key = f"auth:user:{user_id}:state"
+    state = cache_get(cache_key)
+    if state is not None:
+        return state
+
+    # Roles vienen en el mismo SELECT (User.roles es lazy='joined')
+    user = db.get(User, user_id)
+    if user is None:
+        return None
+
+    state = {
+        "token_version": user.token_version,
+        "is_active": user.is_active,
+        "locked_until": user.locked_until.isoformat() if user.locked_until else None,
+        "roles": [role.name for role in user.roles],
+        "permissions": user.get_permissions()
+    }
+    cache_set(cache_key, state, USER_STATE_CACHE_TTL)
+    return state
+
+
+def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Valida el access token sin cargar el usuario y retorna sus claims.
+
+    Args:
+        credentials: Credenciales HTTP Bearer (token JWT)
+        db: Sesión de base de datos (solo si el estado no está en caché o
+            Redis no está disponible para la blacklist)
+
+    Returns:
+        Payload del token (sub, username, roles, permissions, ver, ...)
+
+    Raises:
+        HTTPException 401: Si el token es inválido, está blacklisted o fue revocado
+        HTTPException 403: Si el usuario está inactivo o bloqueado
+
+    Examples:
+        @app.get("/audit/metadata")
+        def metadata(claims: dict = Depends(require_token_role(["admin"]))):
+            ...
+
+    Notes:
+        - Para endpoints que solo necesitan identidad, roles o permisos
+        - Roles y permisos del payload se reemplazan por los vigentes del
+          usuario (estado cacheado USER_STATE_CACHE_TTL segundos): un cambio
+          de rol o de permisos aplica sin esperar a que expire el token
+        - Camino normal sin consultas a PostgreSQL: blacklist en Redis
+          (is_token_blacklisted) y estado del usuario en la caché
+    """
+    payload, user_id = _decode_access_token(credentials.credentials, db)
+
+    state = _get_user_auth_state(db, user_id)
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+
+    if not verify_token_version(payload, state["token_version"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token invalidado (sesión cerrada)",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not state["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario inactivo"
+        )
+
+    if state["locked_until"]:
+        locked_until = datetime.fromisoformat(state["locked_until"])
+        if datetime.now(locked_until.tzinfo) < locked_until:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Cuenta bloqueada hasta {locked_until.strftime('%Y-%m-%d %H:%M:%S')} por intentos fallidos"
+            )
+
+    return {**payload, "roles": state["roles"], "permissions": state["permissions"]}
+
+
 # ============================================================================
 # ROLE-BASED DEPENDENCIES
 # ============================================================================
@@ -323,6 +453,76 @@ def require_permission(permission: str):
     return PermissionChecker(permission)
 
 
+# ============================================================================
+# TOKEN-BASED DEPENDENCIES (SIN CARGAR EL USUARIO)
+# ============================================================================
+
+def _claims_have_permission(permissions: List[str], permission: str) -> bool:
+    """Misma regla de wildcards que Role.has_permission ("*", "recurso.*")."""
+    if "*" in permissions or permission in permissions:
+        return True
+    resource = permission.split('.')[0] if '.' in permission else permission
+    return f"{resource}.*" in permissions
+
+
+class TokenRoleChecker:
+    """
+    Igual que RoleChecker, pero verifica los roles de get_token_claims.
+
+    Examples:
+        @router.get("/metadata")
+        def metadata(claims: dict = Depends(require_token_role(["admin", "medico"]))):
+            ...
+    """
+
+    def __init__(self, allowed_roles: List[str]):
+        self.allowed_roles = allowed_roles
+
+    def __call__(self, claims: Dict[str, Any] = Depends(get_token_claims)) -> Dict[str, Any]:
+        # Superuser (permiso "*") siempre pasa
+        if "*" in claims.get("permissions", []):
+            return claims
+
+        if not any(role in self.allowed_roles for role in claims.get("roles", [])):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Requiere uno de estos roles: {', '.join(self.allowed_roles)}"
+            )
+
+        return claims
+
+
+class TokenPermissionChecker:
+    """
+    Igual que PermissionChecker, pero verifica los permisos de get_token_claims.
+
+    Examples:
+        router = APIRouter(dependencies=[Depends(require_token_permission("upload.create"))])
+    """
+
+    def __init__(self, required_permission: str):
+        self.required_permission = required_permission
+
+    def __call__(self, claims: Dict[str, Any] = Depends(get_token_claims)) -> Dict[str, Any]:
+        if not _claims_have_permission(claims.get("permissions", []), self.required_permission):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Permiso requerido: {self.required_permission}"
+            )
+
+        return claims
+
+
+def require_token_role(allowed_roles: List[str]):
+    """Factory de TokenRoleChecker (roles del estado cacheado, sin cargar el usuario por request)."""
+    return TokenRoleChecker(allowed_roles)
+
+
+def require_token_permission(permission: str):
+    """Factory de TokenPermissionChecker (permisos del estado cacheado)."""
+    return TokenPermissionChecker(permission)
+
+
 # ============================================================================
 # CONVENIENCE DEPENDENCIES (PRE-CONFIGURED)
 # ============================================================================
@@ -336,4 +536,7 @@ require_medical_staff = RoleChecker(["admin", "medico"])
 # Admin, Médico o Auxiliar
 require_healthcare_staff = RoleChecker(["admin", "medico", "auxiliar"])
 
+# Admin o Médico, validado con get_token_claims (endpoints de solo lectura)
+require_medical_staff_token = TokenRoleChecker(["admin", "medico"])
+
 # Cualquier usuario autenticado y activo (ya existe: get_current_active_user)
@@ -1,7 +1,12 @@
-from fastapi import FastAPI
+import anyio.to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, SessionLocal
+from app.core.jwt import load_blacklist_into_redis
+from app.core.query_counter import enable_request_counting, start_request_count
+from app.services import audit_queue, upload_queue
 from app.api.routes import upload, patients, stats, export, controls, alerts, admin, rules, catalogs, auth, users, roles, audit
 
 # Create FastAPI app
@@ -11,7 +16,8 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse  # orjson encodes responses (dates included) natively
 )
 
 # Configure CORS
@@ -23,6 +29,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Expose per-request SQL query counts to catch N+1 regressions
+if settings.QUERY_COUNT_HEADER:
+    enable_request_counting()
+
+    @app.middleware("http")
+    async def add_query_count_header(request: Request, call_next):
+        counter = start_request_count()
+        response = await call_next(request)
+        response.headers["X-Query-Count"] = str(counter.count)
+        return response
+
 # Include routers
 app.include_router(auth.router, prefix="/api")  # Authentication (login, logout, refresh, me)
 app.include_router(users.router, prefix="/api")  # User management (CRUD, only Admin)
@@ -42,15 +59,37 @@ app.include_router(catalogs.router, prefix="/api")  # Official catalogs (EPS, CI
 @app.on_event("startup")
 async def startup_event():
     """
-    Initialize database on startup.
+    Initialize database and background services on startup.
     """
     init_db()
+    audit_queue.start()
+    upload_queue.start()
+
+    # Sync (def) endpoints run in AnyIO's worker threads; size them to the DB pool
+    if settings.THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+    db = SessionLocal()
+    try:
+        load_blacklist_into_redis(db)
+    finally:
+        db.close()
+
     print(f"✅ {settings.APP_NAME} v{settings.VERSION} iniciado")
     print(f"📊 Base de datos: {settings.DATABASE_URL.split('@')[-1] if '@' in settings.DATABASE_URL else 'SQLite'}")
     print(f"🔗 Documentación API: http://{settings.API_HOST}:{settings.API_PORT}/api/docs")
     print(f"🌐 CORS Origins: {settings.CORS_ORIGINS}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Flush pending audit log entries and finish running uploads on shutdown.
+    """
+    upload_queue.stop()
+    audit_queue.stop()
+
+
 @app.get("/")
 async def root():
     """
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -91,7 +91,7 @@ class Alert(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Patient reference
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
 
     # Alert info
     alert_type = Column(Enum(AlertTypeEnum), nullable=False, index=True)
@@ -123,3 +123,9 @@ class Alert(Base):
 
     def __repr__(self):
         return f"<Alert {self.alert_type} for Patient {self.patient_id} - {self.priority}>"
+
+
+# Composite indexes matching the filters/ordering of GET /alerts/
+Index('idx_alerts_patient_id', Alert.patient_id)
+# Same order as the listing: priority DESC (enum declaration order), then created_date
+Index('idx_alerts_priority_desc_created', Alert.priority.desc().nulls_last(), Alert.created_date)
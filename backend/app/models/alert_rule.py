@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, JSON, Float
+from sqlalchemy import Column, Integer, String, Boolean, Text, JSON, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy import DateTime
 from app.database import Base
@@ -75,3 +75,10 @@ class AlertRule(Base):
 
     def __repr__(self):
         return f"<AlertRule {self.rule_code} - {self.rule_name}>"
+
+
+# Filtros de GET /rules/alerts (igualdad) + orden por id de la paginación
+Index(
+    'idx_alert_rules_active_type_priority',
+    AlertRule.is_active, AlertRule.alert_type, AlertRule.priority, AlertRule.id
+)
@@ -333,3 +333,8 @@ Index('idx_audit_user_timestamp', AuditLog.user_id, AuditLog.timestamp)
 Index('idx_audit_action_timestamp', AuditLog.action, AuditLog.timestamp)
 Index('idx_audit_category_timestamp', AuditLog.category, AuditLog.timestamp)
 Index('idx_audit_resource', AuditLog.resource_type, AuditLog.resource_id)
+Index('idx_audit_status_timestamp', AuditLog.status, AuditLog.timestamp)
+Index('idx_audit_resource_type_timestamp', AuditLog.resource_type, AuditLog.timestamp)
+
+# El filtro ILIKE '%...%' sobre action usa el índice GIN trigram idx_audit_action_trgm,
+# creado en la migración 012 (requiere la extensión pg_trgm, por eso no se declara aquí)
@@ -3,7 +3,9 @@ CIE-10 (Clasificación Internacional de Enfermedades, 10ª Revisión) Model
 
 Official diagnosis codes catalog for Colombian health system.
 """
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -64,6 +66,17 @@ class Cie10(Base):
     notes = Column(Text, nullable=True)
     # Clinical notes, special considerations, relationships
 
+    # Full-text search (generated by PostgreSQL, never loaded with the row)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('spanish', coalesce(short_description, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(full_description, '')), 'B')",
+            persisted=True
+        )
+    ))
+    # Matches multi-word and inflected terms ("diabetes insulinodependiente")
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
@@ -88,3 +101,16 @@ class Cie10(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+# Orden del listado y paginación por cursor: (chapter_code, code) > (:chapter, :code)
+Index('idx_cie10_chapter_code_code', Cie10.chapter_code, Cie10.code)
+
+# Búsqueda por código normalizado: upper(code) = :code (GET /cie10/code/{code})
+Index('idx_cie10_code_upper', func.upper(Cie10.code))
+
+# Filtro is_common = true: índice parcial sobre los pocos códigos comunes
+Index('idx_cie10_common_code', Cie10.code, postgresql_where=Cie10.is_common == True)
+
+# Búsqueda por palabras en las descripciones (search_vector @@ plainto_tsquery)
+Index('idx_cie10_search_vector', Cie10.search_vector, postgresql_using='gin')
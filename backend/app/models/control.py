@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -56,7 +56,7 @@ class Control(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Patient reference
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
 
     # Control info
     control_type = Column(Enum(ControlTypeEnum), nullable=False, index=True)
@@ -89,3 +89,18 @@ class Control(Base):
 
     def __repr__(self):
         return f"<Control {self.control_type} for Patient {self.patient_id} - {self.status}>"
+
+
+# Composite indexes matching the ordering/filters of GET /controls/
+# (is_urgent DESC, priority_score DESC, due_date ASC)
+Index('idx_controls_priority', Control.is_urgent.desc(), Control.priority_score.desc(), Control.due_date.asc())
+Index(
+    'idx_controls_type_priority',
+    Control.control_type, Control.is_urgent.desc(), Control.priority_score.desc(), Control.due_date.asc()
+)
+Index(
+    'idx_controls_urgent_priority',
+    Control.priority_score.desc(), Control.due_date.asc(),
+    postgresql_where=Control.is_urgent == True
+)
+Index('idx_controls_patient_id', Control.patient_id)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy import DateTime
 from app.database import Base
@@ -62,3 +62,10 @@ class ControlRule(Base):
 
     def __repr__(self):
         return f"<ControlRule {self.rule_code} - {self.rule_name}>"
+
+
+# Filtros de GET /rules/controls (igualdad) + orden por id de la paginación
+Index(
+    'idx_control_rules_active_stage_type',
+    ControlRule.is_active, ControlRule.rias_stage, ControlRule.control_type, ControlRule.id
+)
@@ -1,6 +1,8 @@
 from sqlalchemy import Column, Integer, String, Text, Boolean, Float
 from sqlalchemy.sql import func
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from app.database import Base
 
 
@@ -54,5 +56,23 @@ class Cups(Base):
     notes = Column(Text, nullable=True)  # Notas técnicas
     contraindications = Column(Text, nullable=True)  # Contraindicaciones
 
+    # Búsqueda de texto completo (generada por PostgreSQL, no se carga con la fila)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('spanish', coalesce(description, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(category, '')), 'B') || "
+            "setweight(to_tsvector('spanish', coalesce(specialty, '')), 'C')",
+            persisted=True
+        )
+    ))
+
     def __repr__(self):
         return f"<CUPS {self.code} - {self.description[:50]}>"
+
+
+# Listado ordenado por (category, code) y filtro por categoría ordenado por code
+Index('idx_cups_category_code', Cups.category, Cups.code)
+
+# Búsqueda por palabras en descripción, categoría y especialidad
+Index('idx_cups_search_vector', Cups.search_vector, postgresql_using='gin')
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -49,3 +49,8 @@ class Eps(Base):
 
     def __repr__(self):
         return f"<Eps {self.code} - {self.name}>"
+
+
+# Listado filtrado por régimen/estado y ordenado por (regime_type, code).
+# Los índices trigram para la búsqueda se crean en la migración 014.
+Index('idx_eps_regime_active_code', Eps.regime_type, Eps.is_active, Eps.code)
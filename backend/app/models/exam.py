@@ -65,7 +65,7 @@ class Exam(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Patient reference
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
 
     # Exam info
     exam_type = Column(Enum(ExamTypeEnum), nullable=False, index=True)
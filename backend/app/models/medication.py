@@ -24,7 +24,7 @@ class Medication(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Patient reference
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
 
     # Medication info
     medication_name = Column(String(200), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Text, Float, Enum
+from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Text, Float, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -136,10 +136,39 @@ class Patient(Base):
 
     # Relationships
     upload = relationship("Upload", back_populates="patients")
-    controls = relationship("Control", back_populates="patient", cascade="all, delete-orphan")
-    alerts = relationship("Alert", back_populates="patient", cascade="all, delete-orphan")
-    exams = relationship("Exam", back_populates="patient", cascade="all, delete-orphan")
-    medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan")
+    controls = relationship("Control", back_populates="patient", cascade="all, delete-orphan", passive_deletes=True)
+    alerts = relationship("Alert", back_populates="patient", cascade="all, delete-orphan", passive_deletes=True)
+    exams = relationship("Exam", back_populates="patient", cascade="all, delete-orphan", passive_deletes=True)
+    medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Patient {self.document_number} - {self.full_name}>"
+
+
+# Índices parciales (solo pacientes activos) para los filtros de GET /patients/
+# y GET /export/patients
+Index('idx_patients_active_age_sex', Patient.age_group, Patient.sex, postgresql_where=Patient.is_active == True)
+Index('idx_patients_active_contacted', Patient.is_contacted, postgresql_where=Patient.is_active == True)
+Index(
+    'idx_patients_active_pregnant', Patient.id,
+    postgresql_where=(Patient.is_active == True) & (Patient.is_pregnant == True)
+)
+Index(
+    'idx_patients_active_hypertensive', Patient.id,
+    postgresql_where=(Patient.is_active == True) & (Patient.is_hypertensive == True)
+)
+Index(
+    'idx_patients_active_diabetic', Patient.id,
+    postgresql_where=(Patient.is_active == True) & (Patient.is_diabetic == True)
+)
+Index(
+    'idx_patients_active_cv_risk', Patient.id,
+    postgresql_where=(Patient.is_active == True) & (Patient.has_cardiovascular_risk == True)
+)
+
+# Pacientes de una carga (estadísticas de GET /upload/{id}/stats)
+Index('idx_patients_upload_id', Patient.upload_id)
+
+# La búsqueda ILIKE '%term%' sobre full_name y document_number usa los índices GIN
+# trigram idx_patients_full_name_trgm / idx_patients_document_number_trgm, creados en
+# la migración 020 (requieren la extensión pg_trgm, por eso no se declaran aquí)
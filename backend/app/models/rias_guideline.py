@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Text, JSON
 from sqlalchemy.sql import func
-from sqlalchemy import DateTime, Boolean
+from sqlalchemy import DateTime, Boolean, Index
 from app.database import Base
 
 
@@ -79,3 +79,7 @@ class RiasGuideline(Base):
 
     def __repr__(self):
         return f"<RiasGuideline {self.guideline_code} - {self.guideline_name}>"
+
+
+# Filtros de GET /rules/rias (igualdad) + orden por id de la paginación
+Index('idx_rias_guidelines_active_stage', RiasGuideline.is_active, RiasGuideline.life_stage, RiasGuideline.id)
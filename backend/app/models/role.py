@@ -10,8 +10,9 @@ Roles predefinidos:
 - Auxiliar: Visualización de pacientes y marcado de contactos
 - Operador: Solo carga de archivos Excel
 """
+from functools import cached_property
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from app.database import Base
 from app.models.user import user_roles
@@ -134,25 +135,43 @@ class Role(Base):
         if not self.is_active:
             return False
 
-        if not self.permissions:
+        permission_set = self.permission_set
+        if not permission_set:
             return False
 
         # Wildcard completo
-        if "*" in self.permissions:
+        if "*" in permission_set:
             return True
 
         # Permiso exacto
-        if permission in self.permissions:
+        if permission in permission_set:
             return True
 
         # Wildcard de recurso (ej: "patients.*" permite "patients.create")
         resource = permission.split('.')[0] if '.' in permission else permission
         resource_wildcard = f"{resource}.*"
-        if resource_wildcard in self.permissions:
+        if resource_wildcard in permission_set:
             return True
 
         return False
 
+    @cached_property
+    def permission_set(self) -> frozenset:
+        """
+        Permisos del rol como conjunto, calculado una vez por instancia.
+
+        has_permission se llama varias veces por request (una por rol del
+        usuario y permiso verificado); con el conjunto cada búsqueda es O(1)
+        en lugar de recorrer la lista.
+        """
+        return frozenset(self.permissions or ())
+
+    @validates('permissions')
+    def _reset_permission_set(self, key, value):
+        """Descarta el conjunto memorizado cuando se reasignan los permisos."""
+        self.__dict__.pop('permission_set', None)
+        return value
+
     def get_permissions(self) -> list:
         """
         Obtiene la lista de permisos del rol.
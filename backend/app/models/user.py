@@ -71,6 +71,15 @@ class User(Base):
         comment="Fecha hasta la cual la cuenta está bloqueada"
     )
 
+    # Versión de tokens: incrementarla invalida todos los tokens emitidos
+    token_version = Column(
+        Integer,
+        default=0,
+        server_default='0',
+        nullable=False,
+        comment="Versión de los tokens JWT del usuario (claim 'ver')"
+    )
+
     # Refresh token (opcional: guardar en DB para invalidación)
     refresh_token = Column(
         String(500),
@@ -2,7 +2,7 @@
 Schemas Pydantic para catálogos (EPS, CIE-10, CUPS)
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -42,6 +42,10 @@ class EpsListResponse(BaseModel):
     limit: int = Field(..., description="Cantidad de registros por página")
     offset: int = Field(..., description="Desplazamiento para paginación")
     items: List[EpsResponse] = Field(..., description="Lista de EPS")
+    next_cursor: Optional[Dict[str, str]] = Field(
+        None,
+        description="Cursor de la siguiente página ({regime_type, code}); None si no hay más"
+    )
 
 
 class EpsSearchMatch(BaseModel):
@@ -100,6 +104,10 @@ class Cie10ListResponse(BaseModel):
     limit: int = Field(..., description="Cantidad de registros por página")
     offset: int = Field(..., description="Desplazamiento para paginación")
     items: List[Cie10Response] = Field(..., description="Lista de códigos CIE-10")
+    next_cursor: Optional[Dict[str, str]] = Field(
+        None,
+        description="Cursor de la siguiente página ({chapter_code, code}); None si no hay más"
+    )
 
 
 class Cie10SearchMatch(BaseModel):
@@ -199,3 +207,17 @@ class CupsCategorySummary(BaseModel):
     total_codes: int = Field(..., description="Total de códigos en la categoría")
     ambulatory: int = Field(..., description="Códigos ambulatorios")
     hospitalization_required: int = Field(..., description="Códigos que requieren hospitalización")
+
+
+# ============================================================================
+# SCHEMAS PARA RESOLUCIÓN DE CÓDIGOS POR LOTES
+# ============================================================================
+
+class CatalogCodesRequest(BaseModel):
+    """Schema para resolver varios códigos en una sola consulta"""
+    codes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Códigos a resolver (máximo 500)"
+    )
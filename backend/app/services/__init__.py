@@ -1,6 +1,6 @@
 from app.services.excel_processor import ExcelProcessor
 from app.services.classifier import PatientClassifier
 from app.services.alert_generator import AlertGenerator
-from app.services import auth_service
+from app.services import auth_service, audit_queue, upload_queue
 
-__all__ = ["ExcelProcessor", "PatientClassifier", "AlertGenerator", "auth_service"]
+__all__ = ["ExcelProcessor", "PatientClassifier", "AlertGenerator", "auth_service", "audit_queue", "upload_queue"]
@@ -0,0 +1,146 @@
+"""
+Audit Queue - Registro de auditoría fuera del request
+
+Los endpoints encolan los registros de auditoría y un hilo en segundo plano
+los inserta por lotes, en una sola transacción por lote. Así el request no
+paga un INSERT + COMMIT por cada acción auditada.
+
+Si el worker no está corriendo o la cola está llena, el registro se escribe
+de forma síncrona para no perder auditoría.
+"""
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.audit_log import AuditLog
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_MAX_SIZE = 10_000  # registros pendientes antes de escribir en línea
+BATCH_SIZE = settings.AUDIT_QUEUE_BATCH_SIZE
+FLUSH_INTERVAL = settings.AUDIT_QUEUE_FLUSH_INTERVAL
+
+# Columnas que puede traer un registro encolado (mismos campos que log_action)
+AUDIT_FIELDS = (
+    "user_id",
+    "username",
+    "action",
+    "category",
+    "resource_type",
+    "resource_id",
+    "resource_name",
+    "ip_address",
+    "user_agent",
+    "details",
+    "status",
+    "error_message",
+    "timestamp",
+)
+
+_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+_worker: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _normalize(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Completa todas las columnas para que el lote sea un único executemany."""
+    row = {field: entry.get(field) for field in AUDIT_FIELDS}
+    if row["status"] is None:
+        row["status"] = "success"
+    if row["timestamp"] is None:
+        row["timestamp"] = datetime.now(timezone.utc)
+    return row
+
+
+def _write(rows: List[Dict[str, Any]]) -> None:
+    """Inserta un lote de registros en una sola transacción."""
+    db = SessionLocal()
+    try:
+        # Un solo INSERT ... VALUES (...), (...) por lote (insertmanyvalues)
+        db.execute(
+            AuditLog.__table__.insert().execution_options(
+                insertmanyvalues_page_size=BATCH_SIZE
+            ),
+            rows
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("No se pudieron escribir %d registros de auditoría", len(rows))
+    finally:
+        db.close()
+
+
+def enqueue(entry: Dict[str, Any]) -> None:
+    """
+    Encola un registro de auditoría.
+
+    Args:
+        entry: Campos del registro (mismos argumentos que AuditLog.log_action,
+            sin db)
+
+    Examples:
+        >>> enqueue({
+        ...     "user_id": 1,
+        ...     "username": "admin",
+        ...     "action": "auth.password.changed",
+        ...     "category": "authentication",
+        ... })
+    """
+    # La hora del evento se fija al encolar, no al insertar el lote
+    row = _normalize(entry)
+
+    if _worker is None or not _worker.is_alive():
+        _write([row])
+        return
+
+    try:
+        _queue.put_nowait(row)
+    except queue.Full:
+        _write([row])
+
+
+def _drain() -> None:
+    """Bucle del worker: junta hasta BATCH_SIZE registros o espera FLUSH_INTERVAL."""
+    while not _stop.is_set() or not _queue.empty():
+        try:
+            batch = [_queue.get(timeout=FLUSH_INTERVAL)]
+        except queue.Empty:
+            continue
+
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        _write(batch)
+
+
+def start() -> None:
+    """Inicia el worker de auditoría (idempotente)."""
+    global _worker
+
+    if _worker is not None and _worker.is_alive():
+        return
+
+    _stop.clear()
+    _worker = threading.Thread(target=_drain, name="audit-queue", daemon=True)
+    _worker.start()
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Detiene el worker después de escribir los registros pendientes."""
+    global _worker
+
+    if _worker is None:
+        return
+
+    _stop.set()
+    _worker.join(timeout)
+    _worker = None
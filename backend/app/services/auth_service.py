@@ -14,18 +14,45 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.models.user import User
-from app.models.audit_log import AuditLog
 from app.core.security import verify_password
 from app.core.jwt import (
     create_access_token,
     create_refresh_token,
     decode_token,
     verify_token_type,
+    verify_token_version,
     blacklist_token,
     is_token_blacklisted,
     get_token_expires_at
 )
 from app.config import settings
+from app.core.cache import cache_invalidate
+from app.services import audit_queue
+
+
+USER_INFO_CACHE_TTL = 300  # segundos
+
+
+def user_info_cache_key(user: User) -> str:
+    """Clave de caché de /auth/me (incluye la versión de tokens del usuario)."""
+    return f"auth:me:{user.id}:v{user.token_version}"
+
+
+def invalidate_user_info(user_id: Optional[int] = None) -> None:
+    """
+    Invalida la respuesta cacheada de /auth/me y el estado del usuario.
+
+    Args:
+        user_id: Usuario a invalidar (None = todos, ej: al editar un rol)
+    """
+    # auth:user:* es el estado usado por get_token_claims (versión, activo,
+    # bloqueo, roles y permisos)
+    if user_id is None:
+        cache_invalidate("auth:me:")
+        cache_invalidate("auth:user:")
+    else:
+        cache_invalidate(f"auth:me:{user_id}:")
+        cache_invalidate(f"auth:user:{user_id}:")
 
 
 # ============================================================================
@@ -65,35 +92,33 @@ def authenticate_user(
     # Usuario no existe
     if not user:
         # Registrar intento fallido (sin revelar si el usuario existe)
-        AuditLog.log_action(
-            db=db,
-            user_id=None,
-            username=username,
-            action="auth.login.failed",
-            category="authentication",
-            status="failed",
-            details={"reason": "user_not_found"},
-            ip_address=ip_address
-        )
+        audit_queue.enqueue({
+            "user_id": None,
+            "username": username,
+            "action": "auth.login.failed",
+            "category": "authentication",
+            "status": "failed",
+            "details": {"reason": "user_not_found"},
+            "ip_address": ip_address
+        })
         return None
 
     # Verificar si la cuenta está bloqueada
     if user.is_locked():
         locked_until_str = user.locked_until.strftime("%Y-%m-%d %H:%M:%S")
-        AuditLog.log_action(
-            db=db,
-            user_id=user.id,
-            username=user.username,
-            action="auth.login.blocked",
-            category="authentication",
-            status="blocked",
-            details={
+        audit_queue.enqueue({
+            "user_id": user.id,
+            "username": user.username,
+            "action": "auth.login.blocked",
+            "category": "authentication",
+            "status": "blocked",
+            "details": {
                 "reason": "account_locked",
                 "locked_until": locked_until_str,
                 "failed_attempts": user.failed_login_attempts
             },
-            ip_address=ip_address
-        )
+            "ip_address": ip_address
+        })
         return None
 
     # Verificar contraseña
@@ -102,35 +127,37 @@ def authenticate_user(
         user.increment_failed_login()
         db.commit()
 
+        # Si la cuenta quedó bloqueada, los tokens vigentes deben dejar de valer
+        if user.is_locked():
+            invalidate_user_info(user.id)
+
         # Registrar intento fallido
-        AuditLog.log_action(
-            db=db,
-            user_id=user.id,
-            username=user.username,
-            action="auth.login.failed",
-            category="authentication",
-            status="failed",
-            details={
+        audit_queue.enqueue({
+            "user_id": user.id,
+            "username": user.username,
+            "action": "auth.login.failed",
+            "category": "authentication",
+            "status": "failed",
+            "details": {
                 "reason": "invalid_password",
                 "failed_attempts": user.failed_login_attempts,
                 "locked": user.is_locked()
             },
-            ip_address=ip_address
-        )
+            "ip_address": ip_address
+        })
         return None
 
     # Verificar si está activo
     if not user.is_active:
-        AuditLog.log_action(
-            db=db,
-            user_id=user.id,
-            username=user.username,
-            action="auth.login.failed",
-            category="authentication",
-            status="failed",
-            details={"reason": "user_inactive"},
-            ip_address=ip_address
-        )
+        audit_queue.enqueue({
+            "user_id": user.id,
+            "username": user.username,
+            "action": "auth.login.failed",
+            "category": "authentication",
+            "status": "failed",
+            "details": {"reason": "user_inactive"},
+            "ip_address": ip_address
+        })
         return None
 
     # Login exitoso - resetear intentos fallidos
@@ -139,16 +166,15 @@ def authenticate_user(
     db.commit()
 
     # Registrar login exitoso
-    AuditLog.log_action(
-        db=db,
-        user_id=user.id,
-        username=user.username,
-        action="auth.login.success",
-        category="authentication",
-        status="success",
-        details={"roles": [role.name for role in user.roles]},
-        ip_address=ip_address
-    )
+    audit_queue.enqueue({
+        "user_id": user.id,
+        "username": user.username,
+        "action": "auth.login.success",
+        "category": "authentication",
+        "status": "success",
+        "details": {"roles": [role.name for role in user.roles]},
+        "ip_address": ip_address
+    })
 
     return user
 
@@ -219,19 +245,24 @@ def login(
         username=user.username,
         email=user.email,
         roles=roles,
-        permissions=permissions
+        permissions=permissions,
+        token_version=user.token_version
     )
 
     refresh_token = create_refresh_token(
         user_id=user.id,
         username=user.username,
-        email=user.email
+        email=user.email,
+        token_version=user.token_version
     )
 
     # Guardar refresh token en usuario (opcional, para invalidación)
     user.refresh_token = refresh_token
     db.commit()
 
+    # last_login y failed_login_attempts cambiaron
+    invalidate_user_info(user.id)
+
     # Retornar respuesta completa
     return {
         "access_token": access_token,
@@ -283,7 +314,7 @@ def refresh_access_token(
     Notes:
         - NO genera un nuevo refresh token (mantiene el actual)
         - Verifica que el token sea tipo "refresh"
-        - Verifica blacklist
+        - Verifica blacklist y versión de tokens del usuario
         - Registra en audit log
     """
     # Decodificar token
@@ -323,7 +354,7 @@ def refresh_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -337,6 +368,14 @@ def refresh_access_token(
             detail="Usuario inactivo"
         )
 
+    # Verificar que el refresh token no haya sido revocado globalmente
+    if not verify_token_version(payload, user.token_version):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token invalidado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     # Obtener roles y permisos actualizados
     roles = [role.name for role in user.roles]
     permissions = user.get_permissions()
@@ -347,19 +386,19 @@ def refresh_access_token(
         username=user.username,
         email=user.email,
         roles=roles,
-        permissions=permissions
+        permissions=permissions,
+        token_version=user.token_version
     )
 
     # Registrar en audit log
-    AuditLog.log_action(
-        db=db,
-        user_id=user.id,
-        username=user.username,
-        action="auth.token.refreshed",
-        category="authentication",
-        status="success",
-        ip_address=ip_address
-    )
+    audit_queue.enqueue({
+        "user_id": user.id,
+        "username": user.username,
+        "action": "auth.token.refreshed",
+        "category": "authentication",
+        "status": "success",
+        "ip_address": ip_address
+    })
 
     return {
         "access_token": access_token,
@@ -443,22 +482,21 @@ def logout(
 
     # Limpiar refresh token del usuario
     if user_id:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if user:
             user.refresh_token = None
             db.commit()
 
         # Registrar logout en audit log
-        AuditLog.log_action(
-            db=db,
-            user_id=user_id,
-            username=user.username if user else None,
-            action="auth.logout",
-            category="authentication",
-            status="success",
-            details={"tokens_invalidated": tokens_invalidated},
-            ip_address=ip_address
-        )
+        audit_queue.enqueue({
+            "user_id": user_id,
+            "username": user.username if user else None,
+            "action": "auth.logout",
+            "category": "authentication",
+            "status": "success",
+            "details": {"tokens_invalidated": tokens_invalidated},
+            "ip_address": ip_address
+        })
 
     return {
         "message": "Logout exitoso",
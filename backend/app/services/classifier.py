@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
-from app.models.patient import AgeGroupEnum, AttentionTypeEnum
+from sqlalchemy import case, func
+from app.models.patient import Patient, AgeGroupEnum, AttentionTypeEnum, RiskLevelEnum
 from app.models.control import ControlTypeEnum
 from app.services.risk_calculator import RiskCalculator
 from datetime import date, timedelta
@@ -640,3 +641,57 @@ class PatientClassifier:
 
         # Cap at 100
         return min(score, 100)
+
+    @staticmethod
+    def priority_score_expression():
+        """
+        SQL version of calculate_priority_score over the Patient columns.
+
+        Lets the database compute, filter and sort the score so only the
+        requested top rows are loaded. Keep both formulas in sync.
+        """
+        def flag(column, points):
+            return case((column == True, points), else_=0)
+
+        age_points = case(
+            (Patient.age == 0, 0),  # Same as `if age:` above: 0 adds nothing
+            (Patient.age < 1, 20),
+            (Patient.age >= 65, 15),
+            (Patient.age.between(1, 5), 10),
+            else_=0
+        )
+
+        cv_risk_points = case(
+            (Patient.has_cardiovascular_risk.is_not(True), 0),  # IS NOT TRUE: NULL adds nothing, like Python
+            (Patient.cardiovascular_risk_level == RiskLevelEnum.MUY_ALTO, 20),
+            (Patient.cardiovascular_risk_level == RiskLevelEnum.ALTO, 15),
+            (Patient.cardiovascular_risk_level == RiskLevelEnum.MEDIO, 10),
+            else_=5
+        )
+
+        days_since = func.current_date() - Patient.last_control_date
+        last_control_points = case(
+            (Patient.last_control_date.is_(None), 20),  # Never had a control
+            (days_since > 730, 15),
+            (days_since > 365, 10),
+            (days_since > 180, 5),
+            else_=0
+        )
+
+        score = (
+            50
+            + age_points
+            + flag(Patient.is_pregnant, 25)
+            + flag(Patient.is_diabetic, 15)
+            + flag(Patient.is_hypertensive, 15)
+            + flag(Patient.has_ckd, 20)
+            + flag(Patient.has_cardiovascular_disease, 18)
+            + flag(Patient.has_copd, 12)
+            + flag(Patient.has_asthma, 8)
+            + flag(Patient.has_hypothyroidism, 5)
+            + cv_risk_points
+            + last_control_points
+        )
+
+        # Cap at 100
+        return func.least(score, 100)
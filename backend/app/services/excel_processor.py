@@ -76,7 +76,8 @@ class ExcelProcessor:
             if file_path.endswith('.csv'):
                 self.df = pd.read_csv(file_path)
             elif file_path.endswith(('.xlsx', '.xls')):
-                self.df = pd.read_excel(file_path)
+                # calamine (Rust) parses xlsx/xls several times faster than openpyxl/xlrd
+                self.df = pd.read_excel(file_path, engine='calamine')
             else:
                 return False, "Formato de archivo no soportado", 0
 
@@ -112,7 +113,7 @@ class ExcelProcessor:
             return ExcelValidator.generate_validation_report(self.validation_result)
         return None
 
-    def _get_column_value(self, row: pd.Series, field: str, default=None):
+    def _get_column_value(self, row: Dict, field: str, default=None):
         """
         Get value from row using mapped column name.
         """
@@ -139,6 +140,9 @@ class ExcelProcessor:
         try:
             if isinstance(date_value, (datetime, pd.Timestamp)):
                 return date_value.date()
+            elif isinstance(date_value, date):
+                # calamine returns date-only cells as datetime.date
+                return date_value
             elif isinstance(date_value, str):
                 # Try common date formats
                 for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y']:
@@ -377,7 +381,12 @@ class ExcelProcessor:
 
         patients = []
 
-        for idx, row in self.df.iterrows():
+        # Plain dicts with only the mapped columns: iterrows() builds a
+        # pandas Series (and upcasts dtypes) for every row
+        columns = list(dict.fromkeys(self.column_map.values()))
+        records = self.df[columns].to_dict('records')
+
+        for idx, row in enumerate(records):
             try:
                 # Extract basic info
                 document = str(self._get_column_value(row, 'document', '')).strip()
@@ -0,0 +1,133 @@
+"""
+Upload Queue - Procesamiento de cargas fuera de los workers HTTP
+
+El procesamiento de una carga (lectura del Excel, clasificación y escritura
+en BD) es pesado en CPU. Con BackgroundTasks corre en el mismo proceso que
+atiende los requests y compite por el GIL y por los hilos de AnyIO.
+
+Aquí se ejecuta en un pool de procesos dedicado: cada worker importa la
+aplicación por su cuenta (contexto "spawn") y usa su propio engine y pool de
+conexiones.
+
+Si el pool no está corriendo (UPLOAD_WORKERS=0 o antes del startup), la tarea
+se ejecuta en un hilo del proceso actual, como antes.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.upload import Upload, UploadStatusEnum
+
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=settings.UPLOAD_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _mark_failed(upload_id: int, message: str) -> None:
+    """Marca como FAILED una carga que el worker no pudo terminar."""
+    db = SessionLocal()
+    try:
+        db.query(Upload).filter(
+            Upload.id == upload_id,
+            Upload.status.in_([UploadStatusEnum.PENDING, UploadStatusEnum.PROCESSING])
+        ).update({
+            Upload.status: UploadStatusEnum.FAILED,
+            Upload.error_message: message,
+            Upload.completed_at: datetime.now()
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _on_done(upload_id: int, future: Future) -> None:
+    """
+    Registra errores que escapen de la tarea (el worker no tiene request).
+
+    Si el proceso del worker murió (ej: sin memoria con un Excel grande) la
+    tarea no alcanzó a marcar la carga: queda FAILED aquí, no en PROCESSING.
+    """
+    error = future.exception()
+    if error is None:
+        return
+
+    logger.error("Falló el procesamiento de la carga %s: %s", upload_id, error)
+    try:
+        _mark_failed(upload_id, f"Error en el procesamiento: {error}")
+    except Exception:
+        logger.exception("No se pudo marcar la carga %s como fallida", upload_id)
+
+
+def submit(task: Callable[..., Any], upload_id: int, *args: Any) -> None:
+    """
+    Ejecuta una tarea de procesamiento de carga en segundo plano.
+
+    Args:
+        task: Función de nivel de módulo (se importa por nombre en el worker),
+            llamada como task(upload_id, *args)
+        upload_id: Carga a procesar (se marca FAILED si el worker muere)
+        *args: Argumentos serializables adicionales (ej: file_path)
+
+    Examples:
+        >>> submit(process_upload, upload.id, file_path)
+
+    Notes:
+        - Si un worker murió, el pool queda roto (BrokenProcessPool): se
+          crea uno nuevo y se reenvía la tarea
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            try:
+                future = _executor.submit(task, upload_id, *args)
+            except BrokenProcessPool:
+                logger.warning("Pool de cargas roto, se crea uno nuevo")
+                _executor.shutdown(wait=False)
+                _executor = _new_executor()
+                future = _executor.submit(task, upload_id, *args)
+
+            future.add_done_callback(partial(_on_done, upload_id))
+            return
+
+    threading.Thread(target=task, args=(upload_id, *args), name="upload-task", daemon=True).start()
+
+
+def start() -> None:
+    """Inicia el pool de procesos de carga (idempotente)."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None or settings.UPLOAD_WORKERS <= 0:
+            return
+
+        _executor = _new_executor()
+
+
+def stop() -> None:
+    """Detiene el pool después de terminar las cargas en curso."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            return
+
+        executor, _executor = _executor, None
+
+    executor.shutdown(wait=True)
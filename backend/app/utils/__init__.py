@@ -1,3 +1,4 @@
 from app.utils.stats import calculate_statistics
+from app.utils.pagination import paginate_with_total
 
-__all__ = ["calculate_statistics"]
+__all__ = ["calculate_statistics", "paginate_with_total"]
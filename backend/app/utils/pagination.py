@@ -0,0 +1,28 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+from typing import List, Tuple
+
+
+def paginate_with_total(query: Query, offset: int, limit: int) -> Tuple[List, int]:
+    """
+    Fetch one page and the total in a single round-trip: count(*) OVER()
+    is evaluated before OFFSET/LIMIT.
+
+    The query must already be ordered (stable pages). Rows come back as a
+    plain row query, so there is no entity de-duplication: filter on
+    related tables with EXISTS (.any()/.has()), not joins, or rows repeat.
+
+    Returns:
+        Tuple (items, total). Items are entities for a single-entity query
+        (db.query(User)); for column queries they are the rows, which also
+        carry the "total" column.
+    """
+    single_entity = query.is_single_entity
+
+    rows = query.add_columns(func.count().over().label("total")).offset(offset).limit(limit).all()
+    if rows:
+        items = [row[0] for row in rows] if single_entity else rows
+        return items, rows[0].total
+
+    # Empty page: no row to read the total from, count separately
+    return [], (query.order_by(None).count() if offset else 0)
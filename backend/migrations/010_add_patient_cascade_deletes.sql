@@ -0,0 +1,53 @@
+-- Migration: Cascade deletes from patients to their related rows
+-- Date: 2026-10-16
+-- Description: Declares ON DELETE CASCADE on every foreign key to patients(id)
+--   - alerts and controls were created by SQLAlchemy without ON DELETE
+--   - exams and medications are recreated so databases built with create_all match
+--   - Lets admin endpoints delete patients with a single DELETE statement
+
+BEGIN;
+
+-- =========================================================
+-- 1. alerts.patient_id
+-- =========================================================
+
+ALTER TABLE alerts DROP CONSTRAINT IF EXISTS alerts_patient_id_fkey;
+ALTER TABLE alerts
+ADD CONSTRAINT alerts_patient_id_fkey
+FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE;
+
+-- =========================================================
+-- 2. controls.patient_id
+-- =========================================================
+
+ALTER TABLE controls DROP CONSTRAINT IF EXISTS controls_patient_id_fkey;
+ALTER TABLE controls
+ADD CONSTRAINT controls_patient_id_fkey
+FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE;
+
+-- =========================================================
+-- 3. exams.patient_id
+-- =========================================================
+
+ALTER TABLE exams DROP CONSTRAINT IF EXISTS exams_patient_id_fkey;
+ALTER TABLE exams
+ADD CONSTRAINT exams_patient_id_fkey
+FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE;
+
+-- =========================================================
+-- 4. medications.patient_id
+-- =========================================================
+
+ALTER TABLE medications DROP CONSTRAINT IF EXISTS medications_patient_id_fkey;
+ALTER TABLE medications
+ADD CONSTRAINT medications_patient_id_fkey
+FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE;
+
+-- =========================================================
+-- 5. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- SELECT conrelid::regclass, conname, confdeltype FROM pg_constraint
+-- WHERE confrelid = 'patients'::regclass AND contype = 'f';
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- Migration: Indexes for the audit log and alerts listings
+-- Date: 2026-10-16
+-- Description: Adds composite indexes matching the hot filter/order patterns
+--   - audit_logs: status and resource_type filters ordered by timestamp
+--     (user_id, action and category already have (col, timestamp) indexes)
+--   - alerts: patient_id lookups and priority filter ordered by created_date
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. audit_logs
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_status_timestamp
+    ON audit_logs(status, timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_resource_type_timestamp
+    ON audit_logs(resource_type, timestamp);
+
+-- =========================================================
+-- 2. alerts
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_patient_id
+    ON alerts(patient_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_priority_created
+    ON alerts(priority, created_date);
+
+-- =========================================================
+-- 3. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- SELECT indexname FROM pg_indexes WHERE tablename IN ('audit_logs', 'alerts');
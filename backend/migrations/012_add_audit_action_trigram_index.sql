@@ -0,0 +1,27 @@
+-- Migration: Trigram index for the audit log action search
+-- Date: 2026-10-16
+-- Description: GET /audit/logs filters with action ILIKE '%term%', which a
+--   btree index cannot serve. A pg_trgm GIN index lets PostgreSQL answer
+--   substring ILIKE searches without a sequential scan.
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Enable pg_trgm
+-- =========================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =========================================================
+-- 2. Trigram index on audit_logs.action
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_action_trgm
+    ON audit_logs USING GIN (action gin_trgm_ops);
+
+-- =========================================================
+-- 3. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM audit_logs WHERE action ILIKE '%login%';
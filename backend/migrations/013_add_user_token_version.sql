@@ -0,0 +1,24 @@
+-- Migration: Add token version to users
+-- Date: 2026-10-16
+-- Description: Adds users.token_version, emitted as the "ver" claim in JWTs
+--   - Incrementing it revokes every access/refresh token issued to the user
+--   - Used by change-password and admin password reset (global logout)
+
+BEGIN;
+
+-- =========================================================
+-- 1. Add token_version to users table
+-- =========================================================
+
+ALTER TABLE users
+ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN users.token_version IS 'Versión de los tokens JWT del usuario (claim ''ver'')';
+
+-- =========================================================
+-- 2. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- SELECT id, username, token_version FROM users;
+
+COMMIT;
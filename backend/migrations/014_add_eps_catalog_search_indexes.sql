@@ -0,0 +1,46 @@
+-- Migration: Search and listing indexes for the EPS catalog
+-- Date: 2026-10-16
+-- Description: Supports the EPS catalog endpoints
+--   - GET /catalogs/eps filters by regime_type/is_active and orders by
+--     (regime_type, code): composite btree index
+--   - GET /catalogs/eps/search matches lower(code|name|short_name) and nit
+--     with LIKE '%term%': pg_trgm GIN indexes on the same expressions
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Enable pg_trgm
+-- =========================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =========================================================
+-- 2. Listing index (filters + ORDER BY regime_type, code)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eps_regime_active_code
+    ON eps_catalog (regime_type, is_active, code);
+
+-- =========================================================
+-- 3. Trigram indexes for substring search
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eps_code_trgm
+    ON eps_catalog USING GIN (lower(code) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eps_name_trgm
+    ON eps_catalog USING GIN (lower(name) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eps_short_name_trgm
+    ON eps_catalog USING GIN (lower(short_name) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eps_nit_trgm
+    ON eps_catalog USING GIN (nit gin_trgm_ops);
+
+-- =========================================================
+-- 4. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM eps_catalog WHERE lower(name) LIKE '%salud%';
+-- EXPLAIN SELECT * FROM eps_catalog WHERE regime_type = 'contributivo' ORDER BY regime_type, code;
@@ -0,0 +1,22 @@
+-- Migration: Listing index for the CIE-10 catalog
+-- Date: 2026-10-16
+-- Description: GET /catalogs/cie10 orders by (chapter_code, code) and pages
+--   with a row-value cursor (chapter_code, code) > (:chapter, :code). A
+--   composite index serves both without scanning the skipped pages.
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Composite index (chapter_code, code)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_chapter_code_code
+    ON cie10_catalog (chapter_code, code);
+
+-- =========================================================
+-- 2. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM cie10_catalog
+-- WHERE (chapter_code, code) > ('IX', 'I10') ORDER BY chapter_code, code LIMIT 101;
@@ -0,0 +1,51 @@
+-- Migration: Trigram indexes for the CIE-10 and CUPS catalog search
+-- Date: 2026-10-16
+-- Description: Supports GET /catalogs/cie10/search and /catalogs/cups/search
+--   - Both endpoints match LIKE '%term%' on the same expressions used below
+--   - A btree cannot serve a leading wildcard; pg_trgm GIN indexes can, so
+--     PostgreSQL prunes non-matching rows instead of scanning the catalog
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Enable pg_trgm
+-- =========================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =========================================================
+-- 2. CIE-10: code and descriptions
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_code_trgm
+    ON cie10_catalog USING GIN (upper(code) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_short_description_trgm
+    ON cie10_catalog USING GIN (lower(short_description) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_full_description_trgm
+    ON cie10_catalog USING GIN (lower(full_description) gin_trgm_ops);
+
+-- =========================================================
+-- 3. CUPS: code, description, category and specialty
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cups_code_trgm
+    ON cups_catalog USING GIN (code gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cups_description_trgm
+    ON cups_catalog USING GIN (lower(description) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cups_category_trgm
+    ON cups_catalog USING GIN (lower(category) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cups_specialty_trgm
+    ON cups_catalog USING GIN (lower(specialty) gin_trgm_ops);
+
+-- =========================================================
+-- 4. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT id FROM cie10_catalog WHERE lower(short_description) LIKE '%diabetes%';
+-- EXPLAIN SELECT id FROM cups_catalog WHERE lower(description) LIKE '%ecografia%';
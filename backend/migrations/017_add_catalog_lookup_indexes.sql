@@ -0,0 +1,42 @@
+-- Migration: Expression and partial indexes for CIE-10 and CUPS lookups
+-- Date: 2026-10-16
+-- Description: Indexes matching the predicates the catalog endpoints use
+--   - GET /catalogs/cie10/code/{code} filters upper(code) = :code; the plain
+--     code index cannot serve the expression, so add one on upper(code)
+--   - only_common / is_common=true filters: partial index over the few
+--     common codes
+--   - GET /catalogs/cups orders by (category, code) and
+--     /catalogs/cups/category/{category} filters category ordered by code
+--   - No partial index on cups.is_active: almost every procedure is active,
+--     so it would be as large as the table and never chosen
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. CIE-10: upper(code) lookups
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_code_upper
+    ON cie10_catalog (upper(code));
+
+-- =========================================================
+-- 2. CIE-10: common codes (partial)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cie10_common_code
+    ON cie10_catalog (code) WHERE is_common = true;
+
+-- =========================================================
+-- 3. CUPS: listing by (category, code)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cups_category_code
+    ON cups_catalog (category, code);
+
+-- =========================================================
+-- 4. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM cie10_catalog WHERE upper(code) = 'I10';
+-- EXPLAIN SELECT * FROM cups_catalog WHERE category = 'Laboratorio' ORDER BY code LIMIT 100;
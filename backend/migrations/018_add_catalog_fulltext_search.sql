@@ -0,0 +1,47 @@
+-- Migration: Full-text search columns for the CIE-10 and CUPS catalogs
+-- Date: 2026-10-16
+-- Description: Adds a generated tsvector column plus GIN index per catalog
+--   - CIE-10: short_description (weight A) + full_description (weight B)
+--   - CUPS: description (A) + category (B) + specialty (C)
+--   - The search endpoints match search_vector @@ plainto_tsquery('spanish', :q)
+--     so multi-word and inflected terms are found regardless of word order
+--   - unaccent is not used: it is not IMMUTABLE, so it cannot appear in a
+--     generated column expression
+
+BEGIN;
+
+-- =========================================================
+-- 1. cie10_catalog.search_vector
+-- =========================================================
+
+ALTER TABLE cie10_catalog
+ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish', coalesce(short_description, '')), 'A') ||
+    setweight(to_tsvector('spanish', coalesce(full_description, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_cie10_search_vector
+    ON cie10_catalog USING GIN (search_vector);
+
+-- =========================================================
+-- 2. cups_catalog.search_vector
+-- =========================================================
+
+ALTER TABLE cups_catalog
+ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish', coalesce(description, '')), 'A') ||
+    setweight(to_tsvector('spanish', coalesce(category, '')), 'B') ||
+    setweight(to_tsvector('spanish', coalesce(specialty, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_cups_search_vector
+    ON cups_catalog USING GIN (search_vector);
+
+-- =========================================================
+-- 3. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT id FROM cie10_catalog
+-- WHERE search_vector @@ plainto_tsquery('spanish', 'diabetes insulinodependiente');
+
+COMMIT;
@@ -0,0 +1,47 @@
+-- Migration: Indexes for the controls listing
+-- Date: 2026-10-16
+-- Description: GET /controls/ orders by
+--   (is_urgent DESC, priority_score DESC, due_date ASC) and pages with LIMIT
+--   - Composite index in that exact order: index scan that stops at LIMIT
+--     instead of sorting every control
+--   - control_type filter + same order (also used by /export/controls)
+--   - Partial index for urgent_only=true
+--   - patient_id lookups (controls of one patient)
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Listing order
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_controls_priority
+    ON controls (is_urgent DESC, priority_score DESC, due_date ASC);
+
+-- =========================================================
+-- 2. control_type filter with the listing order
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_controls_type_priority
+    ON controls (control_type, is_urgent DESC, priority_score DESC, due_date ASC);
+
+-- =========================================================
+-- 3. urgent_only=true (partial)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_controls_urgent_priority
+    ON controls (priority_score DESC, due_date ASC) WHERE is_urgent = true;
+
+-- =========================================================
+-- 4. patient_id
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_controls_patient_id
+    ON controls (patient_id);
+
+-- =========================================================
+-- 5. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM controls
+-- ORDER BY is_urgent DESC, priority_score DESC, due_date ASC LIMIT 100;
@@ -0,0 +1,61 @@
+-- Migration: Indexes for the patient filters
+-- Date: 2026-10-16
+-- Description: GET /patients/ and GET /export/patients always filter
+--   is_active = true plus any of age_group, sex, the risk flags and
+--   is_contacted, and search with ILIKE '%term%' on full_name/document_number
+--   - Partial indexes (WHERE is_active) so inactive patients never enter them
+--   - One small partial index per risk flag: only the true rows are indexed
+--   - pg_trgm GIN indexes for the ILIKE search (a btree cannot serve a
+--     leading wildcard)
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Enable pg_trgm
+-- =========================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =========================================================
+-- 2. Demographic filters
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_age_sex
+    ON patients (age_group, sex) WHERE is_active = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_contacted
+    ON patients (is_contacted) WHERE is_active = true;
+
+-- =========================================================
+-- 3. Risk flags (partial, only true rows)
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_pregnant
+    ON patients (id) WHERE is_active = true AND is_pregnant = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_hypertensive
+    ON patients (id) WHERE is_active = true AND is_hypertensive = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_diabetic
+    ON patients (id) WHERE is_active = true AND is_diabetic = true;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_active_cv_risk
+    ON patients (id) WHERE is_active = true AND has_cardiovascular_risk = true;
+
+-- =========================================================
+-- 4. Search: full_name and document_number
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_full_name_trgm
+    ON patients USING GIN (full_name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_document_number_trgm
+    ON patients USING GIN (document_number gin_trgm_ops);
+
+-- =========================================================
+-- 5. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM patients WHERE is_active AND age_group = 'ADULTEZ' AND sex = 'F';
+-- EXPLAIN SELECT * FROM patients WHERE is_active AND full_name ILIKE '%garcia%';
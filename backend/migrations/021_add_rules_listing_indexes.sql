@@ -0,0 +1,47 @@
+-- Migration: Composite indexes for the rules listings and uploads
+-- Date: 2026-10-16
+-- Description: GET /rules/controls, /rules/alerts and /rules/rias filter on
+--   equality columns and page ORDER BY id with OFFSET/LIMIT
+--   - One composite index per listing with the filters first and id last,
+--     so filtered pages come out of the index already ordered
+--   - patients.upload_id for the upload stats (GET /upload/{id}/stats)
+--   - rule_code / guideline_code are already UNIQUE (migration 004)
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Control rules: is_active, rias_stage, control_type
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_control_rules_active_stage_type
+    ON control_rules (is_active, rias_stage, control_type, id);
+
+-- =========================================================
+-- 2. Alert rules: is_active, alert_type, priority
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alert_rules_active_type_priority
+    ON alert_rules (is_active, alert_type, priority, id);
+
+-- =========================================================
+-- 3. RIAS guidelines: is_active, life_stage
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rias_guidelines_active_stage
+    ON rias_guidelines (is_active, life_stage, id);
+
+-- =========================================================
+-- 4. Patients by upload
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_upload_id
+    ON patients (upload_id);
+
+-- =========================================================
+-- 5. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM control_rules
+-- WHERE is_active AND rias_stage = 'adultez' ORDER BY id LIMIT 100;
+-- EXPLAIN SELECT count(*) FROM patients WHERE upload_id = 1;
@@ -0,0 +1,32 @@
+-- Migration: Alert priority index matching the listing order
+-- Date: 2026-10-16
+-- Description: GET /alerts/ orders by (priority DESC NULLS LAST, created_date)
+--   - PostgreSQL sorts enum values by declaration order
+--     (baja < media < alta < urgente), so priority DESC is urgente first
+--   - idx_alerts_priority_created (migration 011) was (priority, created_date):
+--     the listing used to sort by a CASE over priority, which no index covers
+--   - New index in the exact listing order: index scan that stops at LIMIT,
+--     with or without the priority filter
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this file has no BEGIN/COMMIT. Run it with autocommit (plain psql).
+
+-- =========================================================
+-- 1. Listing order
+-- =========================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_priority_desc_created
+    ON alerts (priority DESC NULLS LAST, created_date ASC);
+
+-- =========================================================
+-- 2. Drop the index that did not match the order
+-- =========================================================
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_alerts_priority_created;
+
+-- =========================================================
+-- 3. Verification queries (optional - comment out for production)
+-- =========================================================
+
+-- EXPLAIN SELECT * FROM alerts
+-- ORDER BY priority DESC NULLS LAST, created_date ASC LIMIT 100;
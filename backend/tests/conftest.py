@@ -0,0 +1,16 @@
+"""
+Fixtures compartidas de las pruebas.
+
+Las pruebas usan la base de datos configurada en DATABASE_URL (PostgreSQL con
+las migraciones y los catálogos cargados), igual que la aplicación.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    """Cliente HTTP de la aplicación (sin ejecutar los eventos de startup)."""
+    return TestClient(app)
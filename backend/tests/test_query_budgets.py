@@ -0,0 +1,42 @@
+"""
+Presupuestos de consultas SQL por endpoint.
+
+Fallan si un cambio agrega consultas por fila (N+1) o etapas extra a los
+endpoints de catálogos. Presupuesto: búsqueda = 1, estadísticas <= 2,
+listado = 1 (total con count(*) OVER()).
+"""
+import pytest
+
+from app.core.cache import cache_invalidate
+from app.core.query_counter import count_queries
+
+
+QUERY_BUDGETS = [
+    # Búsquedas: una sola sentencia (también cuando el término es un código)
+    ("/api/catalogs/cie10/search?q=diabetes", 1),
+    ("/api/catalogs/cie10/search?q=I10", 1),
+    ("/api/catalogs/cups/search?q=glicemia", 1),
+    ("/api/catalogs/cups/search?q=890201", 1),
+    # Estadísticas
+    ("/api/catalogs/cie10/stats/summary", 2),
+    ("/api/catalogs/cups/stats/summary", 2),
+    # Listados paginados
+    ("/api/catalogs/cie10?limit=20", 1),
+    ("/api/catalogs/cups?limit=20", 1),
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_catalog_cache():
+    """Sin caché: se mide lo que el endpoint consulta a la base de datos."""
+    cache_invalidate("cie10")
+    cache_invalidate("cups")
+
+
+@pytest.mark.parametrize("path, budget", QUERY_BUDGETS)
+def test_catalog_query_budget(client, path, budget):
+    with count_queries() as counter:
+        response = client.get(path)
+
+    assert response.status_code == 200
+    assert counter.count <= budget, f"{path}: {counter.count} consultas (presupuesto {budget})"